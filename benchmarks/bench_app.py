@@ -0,0 +1,301 @@
+"""Replay a request log against the app with fake yt-dlp and OpenAI backends.
+
+Each line of the log is a JSON object with ``method``, ``path`` and
+optionally ``json`` or ``form``; ``{video_id}`` anywhere in it is replaced
+by one of ``--videos`` distinct IDs, so a small number exercises the caches
+and a large one the full pipeline. ``"follow": "result_url"`` waits for the
+job a 202 response started. Lines without a ``path`` are skipped.
+
+The fake yt-dlp (benchmarks/fake_ytdlp.py) is put first on PATH and the app
+talks to the fake OpenAI server (benchmarks/fake_openai.py) over HTTP, so the
+real subprocess, client and HTTP code is exercised.
+
+For each concurrency level the report gives latency percentiles,
+requests/sec, errors and memory. With ``--baseline`` the exit status is 1
+when p95 latency or throughput regressed by more than ``--tolerance``:
+
+    python benchmarks/bench_app.py --concurrency 1,4,16 -n 200 --output report.json
+    python benchmarks/bench_app.py --baseline report.json
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+os.environ.setdefault('OPENAI_API_KEY', 'sk-fake-benchmark-key')
+
+import openai  # pylint: disable=wrong-import-position
+from fake_openai import serve  # pylint: disable=wrong-import-position
+from website import create_app  # pylint: disable=wrong-import-position
+
+DEFAULT_LOG = os.path.join(BENCH_DIR, 'sample_requests.jsonl')
+
+
+def load_log(path):
+    """Return the replayable entries of a JSONL request log."""
+    entries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, dict) and entry.get('path'):
+                entries.append(entry)
+    return entries
+
+
+@contextmanager
+def fake_backends(ytdlp_latency, openai_latency, openai_error_rate):
+    """Put the fake yt-dlp on PATH and serve the fake OpenAI API for the block."""
+    bin_dir = tempfile.mkdtemp(prefix='bench_bin_')
+    shim = os.path.join(bin_dir, 'yt-dlp')
+    script = os.path.join(BENCH_DIR, 'fake_ytdlp.py')
+    with open(shim, 'w', encoding='utf-8') as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n')
+    os.chmod(shim, 0o755)
+
+    saved = {name: os.environ.get(name) for name in ('PATH', 'FAKE_YTDLP_LATENCY')}
+    os.environ['PATH'] = bin_dir + os.pathsep + os.environ.get('PATH', '')
+    os.environ['FAKE_YTDLP_LATENCY'] = str(ytdlp_latency)
+    server = serve(0, openai_latency, openai_error_rate)
+    openai.api_key = os.environ['OPENAI_API_KEY']
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/v1/"
+    finally:
+        server.shutdown()
+        shutil.rmtree(bin_dir, ignore_errors=True)
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def _fill(value, video_id):
+    """Replace ``{video_id}`` in every string of a log entry."""
+    if isinstance(value, str):
+        return value.replace('{video_id}', video_id)
+    if isinstance(value, dict):
+        return {key: _fill(item, video_id) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_fill(item, video_id) for item in value]
+    return value
+
+
+def send(client, entry):
+    """Issue one logged request, following it to its job result if asked; return the status."""
+    response = client.open(entry['path'], method=entry.get('method', 'GET'),
+                           json=entry.get('json'), data=entry.get('form'))
+    follow = entry.get('follow')
+    if follow and response.status_code == 202:
+        response = client.get(response.get_json()[follow] + "?wait=300")
+    response.close()
+    return response.status_code
+
+
+def percentile(sorted_values, fraction):
+    """Return the value below which ``fraction`` of the sorted values fall."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def rss_mb():
+    """Current resident set size of this process in MB, where /proc is available."""
+    try:
+        with open('/proc/self/statm', encoding='ascii') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        return None
+
+
+def run_level(app, entries, concurrency, total, video_ids): #pylint: disable=too-many-locals
+    """Replay ``total`` requests on ``concurrency`` threads; return the level's results."""
+    rng = random.Random(concurrency)
+    plan = [_fill(entries[i % len(entries)], rng.choice(video_ids)) for i in range(total)]
+    latencies, statuses, lock = [], {}, threading.Lock()
+    cursor = iter(plan)
+
+    def worker():
+        with app.test_client() as client:
+            while True:
+                with lock:
+                    entry = next(cursor, None)
+                if entry is None:
+                    return
+                start = time.perf_counter()
+                try:
+                    status = send(client, entry)
+                except Exception: #pylint: disable=broad-except
+                    status = 'exception'
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items()
+                 if not status.isdigit() or int(status) >= 500)
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'statuses': statuses,
+        'wall_s': round(wall, 3),
+        'rps': round(len(latencies) / wall, 2) if wall else None,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99': round(percentile(latencies, 0.99) * 1000, 2),
+            'mean': round(statistics.mean(latencies) * 1000, 2),
+            'max': round(latencies[-1] * 1000, 2)
+        },
+        'rss_mb': {'before': rss_before, 'after': rss_mb(),
+                   'max': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Return a description of every level whose p95 or throughput regressed."""
+    previous = {level['concurrency']: level for level in baseline.get('levels', [])}
+    regressions = []
+    for level in report['levels']:
+        old = previous.get(level['concurrency'])
+        if not old:
+            continue
+        p95, old_p95 = level['latency_ms']['p95'], old['latency_ms']['p95']
+        if old_p95 and p95 > old_p95 * (1 + tolerance):
+            regressions.append(f"c={level['concurrency']}: p95 {old_p95}ms -> {p95}ms")
+        if old['rps'] and level['rps'] < old['rps'] * (1 - tolerance):
+            regressions.append(f"c={level['concurrency']}: rps {old['rps']} -> {level['rps']}")
+    return regressions
+
+
+def git_commit():
+    """Return the current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=BENCH_DIR).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args():
+    """Parse the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--log', default=DEFAULT_LOG, help='JSONL request log to replay')
+    parser.add_argument('--concurrency', default='1,4,16',
+                        help='comma-separated numbers of concurrent clients')
+    parser.add_argument('-n', '--requests', type=int, default=100,
+                        help='requests replayed per concurrency level')
+    parser.add_argument('--videos', type=int, default=20,
+                        help='distinct video IDs substituted for {video_id}')
+    parser.add_argument('--ytdlp-latency', type=float, default=0.05)
+    parser.add_argument('--openai-latency', type=float, default=0.05)
+    parser.add_argument('--openai-error-rate', type=float, default=0.0)
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help='override an app config value (JSON values are parsed)')
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help='also report peak Python heap usage (slows the run)')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed relative regression before failing')
+    return parser.parse_args()
+
+
+def app_config(data_dir, base_url, overrides):
+    """Return the app config for one level: quiet, unthrottled and on the fake backends."""
+    config = {
+        'DATA_DIR': data_dir,
+        'OPENAI_BASE_URL': base_url,
+        'OPENAI_RATE_LIMITS': '',
+        'METRICS_LOG_REQUESTS': False,
+        'AUDIO_SWEEP_INTERVAL': 0
+    }
+    for override in overrides:
+        key, _, value = override.partition('=')
+        try:
+            config[key] = json.loads(value)
+        except ValueError:
+            config[key] = value
+    return config
+
+
+def main():
+    """Run every concurrency level and print or write the report."""
+    args = parse_args()
+    entries = load_log(args.log)
+    if not entries:
+        raise SystemExit(f"No replayable requests in {args.log}")
+    video_ids = [f"bench{i:06d}" for i in range(args.videos)]
+
+    levels = []
+    with fake_backends(args.ytdlp_latency, args.openai_latency,
+                       args.openai_error_rate) as base_url:
+        for concurrency in (int(c) for c in args.concurrency.split(',')):
+            with tempfile.TemporaryDirectory(prefix='bench_data_') as data_dir, \
+                 open(os.devnull, 'w', encoding='utf-8') as devnull:
+                app = create_app(app_config(data_dir, base_url, args.set))
+                if args.tracemalloc:
+                    tracemalloc.start()
+                with redirect_stdout(devnull):
+                    level = run_level(app, entries, concurrency, args.requests, video_ids)
+                if args.tracemalloc:
+                    level['py_peak_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                    tracemalloc.stop()
+                app.extensions['job_manager'].shutdown()
+            levels.append(level)
+            print(f"c={concurrency}: {level['rps']} req/s, p50 {level['latency_ms']['p50']}ms, "
+                  f"p95 {level['latency_ms']['p95']}ms, p99 {level['latency_ms']['p99']}ms, "
+                  f"{level['errors']} errors", file=sys.stderr)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': sys.version.split()[0],
+        'settings': {key: value for key, value in vars(args).items()
+                     if key not in ('output', 'baseline')},
+        'levels': levels
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
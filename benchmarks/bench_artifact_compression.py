@@ -0,0 +1,84 @@
+"""Compare transcript storage size and read speed for each artifact codec.
+
+Uses the transcripts already in ``--data-dir`` when there are enough, and
+otherwise ``--transcripts`` generated ones whose words follow a Zipf-like
+distribution. Each transcript is stored as a plain file, a gzip blob, a zstd
+blob and a zstd blob with a dictionary trained on the first half of them:
+
+    python benchmarks/bench_artifact_compression.py --data-dir instance --transcripts 2000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from website.storage import (ArtifactStore, BlobStore, TRANSCRIPT,  # pylint: disable=wrong-import-position
+                             zstandard)
+
+VOCABULARY = [f"word{i}" for i in range(5000)]
+WEIGHTS = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+
+def generate(count, words, seed=0):
+    """Return ``count`` synthetic transcripts of about ``words`` words each."""
+    rng = random.Random(seed)
+    return [' '.join(rng.choices(VOCABULARY, WEIGHTS, k=words)).encode('utf-8')
+            for _ in range(count)]
+
+
+def measure(store, texts):
+    """Write and read back ``texts``; return bytes on disk and timings."""
+    started = time.perf_counter()
+    for number, text in enumerate(texts):
+        store.write_bytes(f"video{number:06d}", TRANSCRIPT, text)
+    written = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for number in range(len(texts)):
+        store.read_bytes(f"video{number:06d}", TRANSCRIPT)
+    read = time.perf_counter() - started
+
+    on_disk = sum(os.path.getsize(os.path.join(directory, name))
+                  for directory, _, names in os.walk(os.path.dirname(store.root))
+                  for name in names if not name.endswith(('.ref', '.dict', 'current')))
+    return {'bytes': on_disk, 'write_ms_each': round(written * 1000 / len(texts), 3),
+            'read_ms_each': round(read * 1000 / len(texts), 3)}
+
+
+def main():
+    """Print a JSON report of the size and speed of each codec."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data-dir', help='app DATA_DIR to take real transcripts from')
+    parser.add_argument('--transcripts', type=int, default=2000)
+    parser.add_argument('--words', type=int, default=1500, help='words per generated transcript')
+    args = parser.parse_args()
+
+    texts = []
+    if args.data_dir:
+        source = ArtifactStore(os.path.join(args.data_dir, 'artifacts'),
+                               BlobStore(os.path.join(args.data_dir, 'blobs')))
+        texts = source.sample(TRANSCRIPT, args.transcripts)
+    if len(texts) < 16:
+        texts = generate(args.transcripts, args.words)
+
+    report = {'transcripts': len(texts), 'raw_bytes': sum(len(text) for text in texts)}
+    codecs = ['none', 'gzip'] + (['zstd', 'zstd+dictionary'] if zstandard else [])
+    for codec in codecs:
+        with tempfile.TemporaryDirectory() as root:
+            blobs = None
+            if codec != 'none':
+                blobs = BlobStore(os.path.join(root, 'blobs'), codec.split('+')[0])
+            if codec == 'zstd+dictionary':
+                blobs.train_dictionary(texts[:len(texts) // 2])
+            report[codec] = measure(ArtifactStore(os.path.join(root, 'artifacts'), blobs),
+                                    texts)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
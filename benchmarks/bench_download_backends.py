@@ -0,0 +1,55 @@
+"""Compare per-call latency of the subprocess and in-process yt-dlp backends.
+
+Each iteration fetches a video's metadata (no media download) through
+``website.routes.probe_video`` with DOWNLOAD_BACKEND set to each backend, so
+the difference is interpreter startup, import and extractor initialization.
+
+    python benchmarks/bench_download_backends.py --video-id dQw4w9WgXcQ -n 10
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # pylint: disable=wrong-import-position
+from website import routes  # pylint: disable=wrong-import-position
+
+
+def run_backend(backend, video_id, iterations):
+    """Time ``iterations`` metadata probes with the given backend."""
+    Config.DOWNLOAD_BACKEND = backend
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        metadata = routes.probe_video(video_id)
+        timings.append(time.perf_counter() - start)
+        if metadata is None:
+            raise SystemExit(f"{backend} backend failed to probe {video_id}")
+    return {
+        'backend': backend,
+        'iterations': iterations,
+        'first_s': timings[0],
+        'mean_s': statistics.mean(timings),
+        'median_s': statistics.median(timings),
+        'min_s': min(timings)
+    }
+
+
+def main():
+    """Run the benchmark and print one JSON line per backend."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--video-id', default='dQw4w9WgXcQ')
+    parser.add_argument('-n', '--iterations', type=int, default=5)
+    parser.add_argument('--backends', nargs='+', default=['subprocess', 'inprocess'])
+    args = parser.parse_args()
+
+    for backend in args.backends:
+        print(json.dumps(run_backend(backend, args.video_id, args.iterations)))
+
+
+if __name__ == '__main__':
+    main()
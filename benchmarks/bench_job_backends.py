@@ -0,0 +1,84 @@
+"""Compare the threads and asyncio job backends on many concurrent pipeline runs.
+
+Submits ``--jobs`` distinct videos at once to each backend's job manager,
+against the fake yt-dlp and OpenAI backends of bench_app.py, with stage and
+OpenAI concurrency limits lifted so the job backend is the only cap. Reports
+wall time, throughput, the peak number of threads and the process's memory:
+
+    python benchmarks/bench_job_backends.py --jobs 300 --threads 4,32
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_app import app_config, fake_backends, rss_mb  # pylint: disable=wrong-import-position
+from website import create_app  # pylint: disable=wrong-import-position
+
+UNBOUNDED = ['DOWNLOAD_CONCURRENCY=0', 'TRANSCRIBE_CONCURRENCY=0', 'LLM_CONCURRENCY=0',
+             'OPENAI_MAX_CONCURRENCY=0', 'CAPTIONS_MODE=off', 'SEARCH_ENABLED=false']
+
+
+def run_backend(base_url, overrides, jobs, label): #pylint: disable=too-many-locals
+    """Run ``jobs`` pipeline jobs with the given config overrides; return the results."""
+    with tempfile.TemporaryDirectory(prefix='bench_data_') as data_dir, \
+         open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+        app = create_app(app_config(data_dir, base_url, UNBOUNDED + overrides))
+        manager = app.extensions['job_manager']
+        peak, done = [threading.active_count()], threading.Event()
+
+        def sample():
+            while not done.wait(0.05):
+                peak.append(threading.active_count())
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+
+        started = time.perf_counter()
+        submitted = [manager.submit(f"bench{i:06d}")[0] for i in range(jobs)]
+        for job in submitted:
+            job.wait(600)
+        elapsed = time.perf_counter() - started
+        done.set()
+        sampler.join()
+        manager.shutdown()
+
+    return {
+        'backend': label,
+        'jobs': jobs,
+        'failed': sum(job.stage != 'done' for job in submitted),
+        'wall_s': round(elapsed, 2),
+        'jobs_per_s': round(jobs / elapsed, 1),
+        'peak_threads': max(peak) - 1,
+        'rss_mb': round(rss_mb() or 0, 1)
+    }
+
+
+def main():
+    """Run each backend and print one JSON line per run."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=300)
+    parser.add_argument('--threads', default='4,32',
+                        help='comma-separated JOB_WORKERS values for the threads backend')
+    parser.add_argument('--ytdlp-latency', type=float, default=0.5)
+    parser.add_argument('--openai-latency', type=float, default=0.5)
+    args = parser.parse_args()
+
+    with fake_backends(args.ytdlp_latency, args.openai_latency, 0.0) as base_url:
+        for workers in (int(w) for w in args.threads.split(',')):
+            print(json.dumps(run_backend(base_url, ['JOB_BACKEND=threads',
+                                                    f'JOB_WORKERS={workers}'],
+                                         args.jobs, f'threads-{workers}')), flush=True)
+        print(json.dumps(run_backend(base_url, ['JOB_BACKEND=asyncio',
+                                                f'ASYNC_MAX_JOBS={args.jobs}'],
+                                     args.jobs, 'asyncio')), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Measure /api/search query latency against a large synthetic transcript index.
+
+Builds (or reuses) an index of ``--videos`` generated transcripts, whose words
+follow a Zipf-like distribution so queries range from rare to very common
+terms, then times ``--queries`` searches of each kind, both ranking every
+match and ranking only the most recent ones (``?recent=1``):
+
+    python benchmarks/bench_search.py --videos 100000 --index /tmp/search.sqlite3
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from website.search import SearchIndex  # pylint: disable=wrong-import-position
+
+VOCABULARY = [f"word{i}" for i in range(20000)]
+WEIGHTS = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+
+def build(index, videos, words, seed=0):
+    """Index ``videos`` synthetic transcripts of ``words`` words each."""
+    rng = random.Random(seed)
+    batch = []
+    for number in range(videos):
+        text = ' '.join(rng.choices(VOCABULARY, WEIGHTS, k=words))
+        batch.append((f"bench{number:06d}", f"Video {number}", text))
+        if len(batch) == 1000:
+            index.write(batch)
+            batch = []
+    if batch:
+        index.write(batch)
+
+
+def time_queries(index, queries, limit, prefix=False, recent=False):
+    """Return latency percentiles, in milliseconds, for ``queries``."""
+    latencies = []
+    for terms in queries:
+        started = time.perf_counter()
+        index.search(terms, limit, prefix=prefix, recent=recent)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return {
+        'p50': round(latencies[len(latencies) // 2], 2),
+        'p95': round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        'max': round(latencies[-1], 2)
+    }
+
+
+def main():
+    """Build the index if needed and print a JSON latency report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--videos', type=int, default=100000)
+    parser.add_argument('--words', type=int, default=300, help='words per transcript')
+    parser.add_argument('--queries', type=int, default=200, help='queries of each kind')
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--index', default='search_bench.sqlite3',
+                        help='index file, reused when it already holds --videos transcripts')
+    args = parser.parse_args()
+
+    index = SearchIndex(args.index)
+    if index.count() != args.videos:
+        started = time.perf_counter()
+        build(index, args.videos, args.words)
+        print(f"Indexed {args.videos} transcripts in {time.perf_counter() - started:.1f}s",
+              file=sys.stderr)
+
+    rng = random.Random(1)
+    kinds = {
+        'rare': [[rng.choice(VOCABULARY[5000:])] for _ in range(args.queries)],
+        'common': [[rng.choice(VOCABULARY[:50])] for _ in range(args.queries)],
+        'two_terms': [[rng.choice(VOCABULARY[:500]), rng.choice(VOCABULARY[500:5000])]
+                      for _ in range(args.queries)],
+        'prefix': [[rng.choice(VOCABULARY[1000:5000])[:-1]] for _ in range(args.queries)]
+    }
+    report = {'videos': index.count(), 'index_mb': round(os.path.getsize(args.index) / 2 ** 20),
+              'latency_ms': {
+                  mode: {kind: time_queries(index, queries, args.limit, kind == 'prefix',
+                                            mode == 'recent')
+                         for kind, queries in kinds.items()}
+                  for mode in ('ranked', 'recent')}}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
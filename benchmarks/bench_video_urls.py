@@ -0,0 +1,97 @@
+"""Measure video ID extraction over a large corpus of generated YouTube links.
+
+Generates ``--urls`` links in a mix of shapes (watch, youtu.be, shorts,
+embed, playlists, timestamps, bare IDs and junk), then times the previous
+three-regex extractor against website.urls.parse_video_url, which also
+returns the playlist and start time, and reports how many IDs each found:
+
+    python benchmarks/bench_video_urls.py --urls 1000000
+"""
+import argparse
+import json
+import os
+import random
+import re
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from website.urls import parse_video_url  # pylint: disable=wrong-import-position
+
+ID_CHARS = string.ascii_letters + string.digits + '-_'
+SHAPES = [
+    'https://www.youtube.com/watch?v={id}',
+    'https://www.youtube.com/watch?v={id}&list=PL{id}&index=3',
+    'https://www.youtube.com/watch?feature=share&v={id}',
+    'https://youtu.be/{id}?t=1m30s',
+    'https://youtu.be/{id}',
+    'https://m.youtube.com/watch?v={id}',
+    'https://www.youtube.com/shorts/{id}',
+    'https://www.youtube.com/embed/{id}?start=30',
+    'https://www.youtube.com/live/{id}?si=share',
+    'youtube.com/watch?v={id}',
+    '{id}',
+    'https://example.com/watch?v={id}',
+]
+
+LEGACY_PATTERNS = [
+    r'(?:youtube\.com\/watch\?v=|youtu\.be\/)([A-Za-z0-9_-]{11})',
+    r'youtube\.com\/embed\/([A-Za-z0-9_-]{11})',
+    r'youtube\.com\/v\/([A-Za-z0-9_-]{11})'
+]
+
+
+def legacy_extract(url):
+    """The extractor this benchmark replaces: up to three regex searches per link."""
+    for pattern in LEGACY_PATTERNS:
+        match = re.search(pattern, url)
+        if match:
+            return match.group(1)
+    return None
+
+
+def parsed_extract(url):
+    """Video ID from parse_video_url."""
+    ref = parse_video_url(url)
+    return ref.video_id if ref else None
+
+
+def corpus(size, seed=0):
+    """Return ``size`` links drawn uniformly from SHAPES."""
+    rng = random.Random(seed)
+    return [rng.choice(SHAPES).format(id=''.join(rng.choices(ID_CHARS, k=11)))
+            for _ in range(size)]
+
+
+def time_extractor(extract, urls):
+    """Return ``(ns per link, results)`` for one pass of ``extract`` over ``urls``."""
+    started = time.perf_counter_ns()
+    results = [extract(url) for url in urls]
+    return (time.perf_counter_ns() - started) / len(urls), results
+
+
+def main():
+    """Generate the corpus and print a JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--urls', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    urls = corpus(args.urls, args.seed)
+    legacy_ns, legacy = time_extractor(legacy_extract, urls)
+    parsed_ns, parsed = time_extractor(parsed_extract, urls)
+    print(json.dumps({
+        'urls': len(urls),
+        'legacy_ns_per_url': round(legacy_ns),
+        'parse_video_url_ns_per_url': round(parsed_ns),
+        'legacy_found': sum(result is not None for result in legacy),
+        'parse_video_url_found': sum(result is not None for result in parsed),
+        # Links both found but read differently; should be zero.
+        'conflicts': sum(a is not None and a != b for a, b in zip(legacy, parsed)),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
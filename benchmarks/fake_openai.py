@@ -0,0 +1,133 @@
+"""A local stand-in for the OpenAI API, for load testing without network access.
+
+Serves the two endpoints the app uses, streaming chat completions when asked,
+with configurable latency and a share of requests answered with 429 so the
+client's retries and rate limits are exercised:
+
+    python benchmarks/fake_openai.py --port 8001 --latency 0.5 --error-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=fake flask run
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRANSCRIPT = ("This is a transcript produced by the fake OpenAI server. "
+              "It stands in for Whisper output during load tests. ") * 20
+
+SUMMARY = "A summary from the fake server, streamed a word at a time when asked to."
+
+SEGMENTS = [{'id': i, 'start': i * 4.0, 'end': i * 4.0 + 4.0, 'text': sentence.strip() + '.'}
+            for i, sentence in enumerate(s for s in TRANSCRIPT.split('.') if s.strip())]
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Answers transcription and chat completion requests with canned bodies."""
+
+    latency = 0.0
+    error_rate = 0.0
+    # Seconds between the words of a streamed completion.
+    token_interval = 0.02
+    counts = {'requests': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def log_message(self, format, *args): #pylint: disable=redefined-builtin
+        """Keep the console quiet under load."""
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, text):
+        """Send ``text`` a word at a time as server-sent completion chunks, then the usage."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        chunk = {'id': 'chatcmpl-fake', 'object': 'chat.completion.chunk',
+                 'created': int(time.time()), 'model': 'fake'}
+        for word in text.split(' '):
+            time.sleep(self.token_interval)
+            delta = dict(chunk, choices=[{'index': 0, 'delta': {'content': word + ' '},
+                                          'finish_reason': None}])
+            self.wfile.write(f"data: {json.dumps(delta)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+        usage = dict(chunk, choices=[], usage={'prompt_tokens': 0, 'completion_tokens': 0,
+                                               'total_tokens': 0})
+        self.wfile.write(f"data: {json.dumps(usage)}\n\ndata: [DONE]\n\n".encode('utf-8'))
+
+    def do_POST(self): #pylint: disable=invalid-name
+        """Handle /v1/audio/transcriptions and /v1/chat/completions."""
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with self.lock:
+            self.counts['requests'] += 1
+        time.sleep(random.uniform(0.5, 1.5) * self.latency)
+
+        if random.random() < self.error_rate:
+            with self.lock:
+                self.counts['errors'] += 1
+            self._send_json(429, {'error': {'message': 'Rate limit reached (fake)',
+                                            'type': 'requests', 'code': 'rate_limit_exceeded'}},
+                            {'Retry-After': '0.1'})
+        elif self.path.endswith('/audio/transcriptions'):
+            if b'verbose_json' in body:
+                self._send_json(200, {'text': TRANSCRIPT, 'segments': SEGMENTS})
+            else:
+                self._send_json(200, {'text': TRANSCRIPT})
+        elif self.path.endswith('/chat/completions') and json.loads(body).get('stream'):
+            self._send_stream(SUMMARY)
+        elif self.path.endswith('/chat/completions'):
+            self._send_json(200, {
+                'id': 'chatcmpl-fake',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': 'fake',
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': SUMMARY},
+                    'finish_reason': 'stop'
+                }],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+            })
+        else:
+            self._send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+
+
+def serve(port, latency=0.0, error_rate=0.0):
+    """Start the fake server on a background thread and return it."""
+    FakeOpenAIHandler.latency = latency
+    FakeOpenAIHandler.error_rate = error_rate
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    """Run the fake server until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='mean seconds to wait before answering')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='share of requests answered with 429')
+    args = parser.parse_args()
+
+    server = serve(args.port, args.latency, args.error_rate)
+    print(f"Fake OpenAI API on http://127.0.0.1:{server.server_port}/v1")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(json.dumps(FakeOpenAIHandler.counts))
+
+
+if __name__ == '__main__':
+    main()
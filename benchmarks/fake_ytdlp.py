@@ -0,0 +1,52 @@
+"""A stand-in for the yt-dlp CLI, for benchmarking without network access.
+
+Understands the options the app passes: writes a small audio file to the
+``-o`` path (``%(ext)s`` becomes ``mp3``), prints the video's info JSON for
+``--dump-json``/``--dump-single-json`` and its title for ``--print title``.
+Each call sleeps for FAKE_YTDLP_LATENCY seconds (default 0) first, and
+FAKE_YTDLP_AUDIO_BYTES sets the size of the file written.
+"""
+import json
+import os
+import re
+import sys
+import time
+
+VIDEO_ID_RE = re.compile(r'(?:v=|youtu\.be/)([A-Za-z0-9_-]{11})')
+
+
+def main(argv):
+    """Emulate one yt-dlp invocation."""
+    time.sleep(float(os.getenv('FAKE_YTDLP_LATENCY', '0')))
+    url = argv[-1]
+    match = VIDEO_ID_RE.search(url)
+    video_id = match.group(1) if match else 'fakevideo00'
+    info = {
+        'id': video_id,
+        'title': f"Fake video {video_id}",
+        'duration': 600,
+        'channel': 'Fake Channel',
+        'formats': [{'format_id': '140', 'ext': 'm4a', 'acodec': 'mp4a.40.2', 'abr': 128}]
+    }
+
+    if '--flat-playlist' in argv:
+        info = {'id': 'fakeplaylist', 'entries': [{'id': f"fakevideo{i:02d}"} for i in range(5)]}
+
+    outputs = [argv[i + 1] for i, arg in enumerate(argv[:-1])
+               if arg == '-o' and not argv[i + 1].startswith('infojson:')]
+    if outputs and '--skip-download' not in argv and '--flat-playlist' not in argv:
+        path = outputs[0].replace('%(ext)s', 'mp3')
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'\0' * int(os.getenv('FAKE_YTDLP_AUDIO_BYTES', '65536')))
+        info['requested_downloads'] = [{'filepath': path}]
+
+    if '--print' in argv:
+        print(info.get('title', ''))
+    elif '--dump-json' in argv or '--dump-single-json' in argv:
+        print(json.dumps(info))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -3,4 +3,132 @@ import os
 class Config:
     API_KEY = os.getenv('OPENAI_API_KEY')
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-key-replace-in-production')
-    
\ No newline at end of file
+    # Where runtime data (caches, artifacts) lives; defaults to the Flask instance folder.
+    DATA_DIR = os.getenv('DATA_DIR')
+
+    RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', '1') == '1'
+    RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', str(7 * 24 * 3600)))
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', '5000'))
+    RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+    # Store shared by every instance (redis://..., or memory://name in one process) holding results
+    # and per-video leases, so only one instance processes a video; unset keeps instances separate.
+    SHARED_BACKEND_URL = os.getenv('SHARED_BACKEND_URL') or os.getenv('REDIS_URL')
+    SHARED_KEY_PREFIX = os.getenv('SHARED_KEY_PREFIX', 'yta:')
+    # A lease lapses this many seconds after its holder stops renewing it.
+    SHARED_LEASE_TTL = int(os.getenv('SHARED_LEASE_TTL', '60'))
+    # How long to wait for another instance's result before processing the video anyway.
+    SHARED_WAIT_TIMEOUT = int(os.getenv('SHARED_WAIT_TIMEOUT', '1800'))
+
+    # Size of the background pool that runs download/transcribe/summarize jobs.
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+    # "threads" runs each job on a JOB_WORKERS thread; "asyncio" runs jobs as coroutines on one
+    # event loop, awaiting yt-dlp and OpenAI, with up to ASYNC_MAX_JOBS in flight.
+    JOB_BACKEND = os.getenv('JOB_BACKEND', 'threads')
+    ASYNC_MAX_JOBS = int(os.getenv('ASYNC_MAX_JOBS', '500'))
+    JOB_RETENTION = int(os.getenv('JOB_RETENTION', '3600'))
+
+    # Audio above this size is split into overlapping chunks and transcribed in parallel.
+    TRANSCRIBE_CHUNK_THRESHOLD = int(os.getenv('TRANSCRIBE_CHUNK_THRESHOLD', str(25 * 1024 * 1024)))
+    TRANSCRIBE_CHUNK_SECONDS = int(os.getenv('TRANSCRIBE_CHUNK_SECONDS', '600'))
+    TRANSCRIBE_CHUNK_OVERLAP = float(os.getenv('TRANSCRIBE_CHUNK_OVERLAP', '2'))
+    TRANSCRIBE_WORKERS = int(os.getenv('TRANSCRIBE_WORKERS', '4'))
+
+    # "any" uses YouTube's manual or automatic captions when a video has them, "manual" only
+    # channel-uploaded ones, and "off" always transcribes the audio.
+    CAPTIONS_MODE = os.getenv('CAPTIONS_MODE', 'any')
+    # yt-dlp --sub-langs patterns, most preferred first.
+    CAPTION_LANGUAGES = os.getenv('CAPTION_LANGUAGES', 'en,en-US,en-GB,en.*')
+    CAPTIONS_MIN_WORDS = int(os.getenv('CAPTIONS_MIN_WORDS', '20'))
+
+    # Probe each video's duration, audio formats and captions before fetching anything, and pick
+    # captions, one Whisper request or chunks, or reject it when longer or larger than these (0 = no
+    # limit).
+    ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', '1') == '1'
+    ADMISSION_MAX_MINUTES = int(os.getenv('ADMISSION_MAX_MINUTES', '240'))
+    ADMISSION_MAX_DOWNLOAD_BYTES = int(os.getenv('ADMISSION_MAX_DOWNLOAD_BYTES',
+                                                 str(1024 ** 3)))
+    # Minutes of audio each client may have transcribed per AUDIO_QUOTA_WINDOW seconds (0 = no
+    # quota). Clients are told apart by QUOTA_CLIENT_HEADER, set by a trusted proxy, or else
+    # by their address.
+    AUDIO_QUOTA_MINUTES = float(os.getenv('AUDIO_QUOTA_MINUTES', '0'))
+    AUDIO_QUOTA_WINDOW = int(os.getenv('AUDIO_QUOTA_WINDOW', str(24 * 3600)))
+    QUOTA_CLIENT_HEADER = os.getenv('QUOTA_CLIENT_HEADER', '')
+
+    # "openai" uses the Whisper API, "local" a faster-whisper model on this machine, and "auto"
+    # sends audio up to LOCAL_WHISPER_MAX_BYTES to the local model and the rest to the API.
+    TRANSCRIBE_ENGINE = os.getenv('TRANSCRIBE_ENGINE', 'openai')
+    LOCAL_WHISPER_MODEL = os.getenv('LOCAL_WHISPER_MODEL', 'small')
+    LOCAL_WHISPER_COMPUTE_TYPE = os.getenv('LOCAL_WHISPER_COMPUTE_TYPE', 'int8')
+    LOCAL_WHISPER_WORKERS = int(os.getenv('LOCAL_WHISPER_WORKERS', '2'))
+    LOCAL_WHISPER_BATCH_SIZE = int(os.getenv('LOCAL_WHISPER_BATCH_SIZE', '8'))
+    LOCAL_WHISPER_MAX_BYTES = int(os.getenv('LOCAL_WHISPER_MAX_BYTES', str(10 * 1024 * 1024)))
+
+    # Transcripts are stored once per distinct content, compressed with "zstd" (using a dictionary
+    # once `flask train-artifact-dictionary` has trained one) or "gzip", or as plain files ("none").
+    ARTIFACT_CODEC = os.getenv('ARTIFACT_CODEC', 'zstd')
+    ARTIFACT_DICTIONARY_SIZE = int(os.getenv('ARTIFACT_DICTIONARY_SIZE', str(110 * 1024)))
+    ARTIFACT_DICTIONARY_SAMPLES = int(os.getenv('ARTIFACT_DICTIONARY_SAMPLES', '2000'))
+
+    # Transcripts are indexed for /api/search in the background, this many per transaction.
+    SEARCH_ENABLED = os.getenv('SEARCH_ENABLED', '1') == '1'
+    SEARCH_BATCH_SIZE = int(os.getenv('SEARCH_BATCH_SIZE', '64'))
+    SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', '50'))
+    # Matches ranked per ?recent=1 query; bounds the cost of very common words (newest are ranked).
+    SEARCH_CANDIDATES = int(os.getenv('SEARCH_CANDIDATES', '1000'))
+    # Timestamps returned per search result, from the video's timed segments.
+    SEARCH_HITS_PER_VIDEO = int(os.getenv('SEARCH_HITS_PER_VIDEO', '3'))
+
+    # Most transcript segments returned by one /api/videos/<id>/segments request.
+    SEGMENTS_PAGE_SIZE = int(os.getenv('SEGMENTS_PAGE_SIZE', '200'))
+
+    # Transcripts longer than this are summarized per chunk, then combined.
+    SUMMARY_CHUNK_TOKENS = int(os.getenv('SUMMARY_CHUNK_TOKENS', '6000'))
+    SUMMARY_WORKERS = int(os.getenv('SUMMARY_WORKERS', '4'))
+    # Stream the summary from OpenAI so job followers see it as it is written.
+    SUMMARY_STREAMING = os.getenv('SUMMARY_STREAMING', '1') == '1'
+    # Transcripts are summarized once, in SUMMARY_LANGUAGE; other languages in SUMMARY_LANGUAGES
+    # are translations of that summary. A request may ask for up to SUMMARY_MAX_LANGUAGES.
+    SUMMARY_LANGUAGE = os.getenv('SUMMARY_LANGUAGE', 'en')
+    SUMMARY_LANGUAGES = os.getenv('SUMMARY_LANGUAGES', 'en,es,fr,de,it,pt,nl,pl,ru,uk,tr,ar,hi,'
+                                                       'ja,ko,zh')
+    SUMMARY_MAX_LANGUAGES = int(os.getenv('SUMMARY_MAX_LANGUAGES', '4'))
+
+    # "subprocess" runs the yt-dlp CLI per video; "inprocess" reuses warm yt_dlp.YoutubeDL instances.
+    DOWNLOAD_BACKEND = os.getenv('DOWNLOAD_BACKEND', 'subprocess')
+    DOWNLOAD_POOL_SIZE = int(os.getenv('DOWNLOAD_POOL_SIZE', '2'))
+
+    # "mp3" re-encodes every download; "native" keeps the source m4a/webm stream.
+    AUDIO_FORMAT = os.getenv('AUDIO_FORMAT', 'mp3')
+    # Audio larger than this is re-encoded as low-bitrate mono speech before transcription (0 = never).
+    AUDIO_TRANSCODE_THRESHOLD = int(os.getenv('AUDIO_TRANSCODE_THRESHOLD', str(24 * 1024 * 1024)))
+    AUDIO_SPEECH_BITRATE = os.getenv('AUDIO_SPEECH_BITRATE', '32k')
+
+    # Downloaded audio is kept for reuse within this budget and evicted least recently used first.
+    AUDIO_SCRATCH_MAX_BYTES = int(os.getenv('AUDIO_SCRATCH_MAX_BYTES', str(2 * 1024 ** 3)))
+    AUDIO_SCRATCH_MIN_FREE_BYTES = int(os.getenv('AUDIO_SCRATCH_MIN_FREE_BYTES', str(1024 ** 3)))
+    AUDIO_SWEEP_INTERVAL = int(os.getenv('AUDIO_SWEEP_INTERVAL', '60'))
+
+    # Per-stage concurrency across all jobs in the process (0 = unbounded).
+    DOWNLOAD_CONCURRENCY = int(os.getenv('DOWNLOAD_CONCURRENCY', '2'))
+    TRANSCRIBE_CONCURRENCY = int(os.getenv('TRANSCRIBE_CONCURRENCY', '2'))
+    LLM_CONCURRENCY = int(os.getenv('LLM_CONCURRENCY', '4'))
+    # Videos of one /api/batch request in flight at once, and the largest batch accepted.
+    BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '4'))
+    BATCH_MAX_VIDEOS = int(os.getenv('BATCH_MAX_VIDEOS', '200'))
+
+    # "serial" runs download, transcription and summarization in turn; "streaming" overlaps them.
+    PIPELINE_MODE = os.getenv('PIPELINE_MODE', 'serial')
+    STREAM_SEGMENT_SECONDS = int(os.getenv('STREAM_SEGMENT_SECONDS', '120'))
+
+    # OpenAI calls share per-model limits, written "model=requests/min:tokens/min,..." (0 = none).
+    OPENAI_RATE_LIMITS = os.getenv('OPENAI_RATE_LIMITS', 'whisper-1=50:0,gpt-3.5-turbo=3500:160000')
+    OPENAI_MAX_CONCURRENCY = int(os.getenv('OPENAI_MAX_CONCURRENCY', '8'))
+    # Transient failures are retried with jittered backoff until OPENAI_DEADLINE seconds per call.
+    OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '5'))
+    OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '120'))
+    OPENAI_DEADLINE = float(os.getenv('OPENAI_DEADLINE', '600'))
+    # Point at a local fake server (see benchmarks/fake_openai.py) to load test without network.
+    OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL')
+
+    # Print one JSON line with stage timings per HTTP request and per pipeline job.
+    METRICS_LOG_REQUESTS = os.getenv('METRICS_LOG_REQUESTS', '1') == '1'
@@ -6,9 +6,12 @@ from flask import Flask
 from website import create_app
 
 @pytest.fixture
-def app():
+def app(tmp_path):
     """Create a Flask app for testing."""
-    app = create_app()
+    # Tests mock the audio pipeline; keep them from probing or fetching real captions first,
+    # and from rendering results before the mocked summary is in.
+    app = create_app({'DATA_DIR': str(tmp_path), 'CAPTIONS_MODE': 'off',
+                      'ADMISSION_ENABLED': False, 'SUMMARY_STREAMING': False})
     app.config['TESTING'] = True
     app.config['SECRET_KEY'] = 'test_secret_key'  # Add a secret key for testing
     app.config['WTF_CSRF_ENABLED'] = False  # Disable CSRF for testing
@@ -1,5 +1,7 @@
 """Functional tests for transcript download feature."""
+import gzip
 import pytest
+from website.storage import BlobStore, zstandard
 
 class TestDownloadTranscript:    
     
@@ -15,4 +17,97 @@ class TestDownloadTranscript:
         # Follow the redirect to check the flash message
         response = client.get('/download/test_video_id', follow_redirects=True)
         assert b'Transcript file not found' in response.data
-        
\ No newline at end of file
+
+    def test_download_transcript_per_video(self, client, app):
+        """Test that each video's own transcript is served."""
+        store = app.extensions['artifact_store']
+        store.write_text('video_a', 'transcript.txt', 'Transcript A')
+        store.write_text('video_b', 'transcript.txt', 'Transcript B')
+        
+        response = client.get('/download/video_a')
+        
+        assert response.status_code == 200
+        assert response.data == b'Transcript A'
+        assert 'attachment' in response.headers['Content-Disposition']
+        assert 'transcript_video_a.txt' in response.headers['Content-Disposition']
+        assert client.get('/download/video_b').data == b'Transcript B'
+    
+    def test_download_transcript_conditional_get(self, client, app):
+        """Test that a matching ETag is answered with 304 Not Modified."""
+        app.extensions['artifact_store'].write_text('video_a', 'transcript.txt', 'Transcript A')
+        
+        etag = client.get('/download/video_a').headers['ETag']
+        response = client.get('/download/video_a', headers={'If-None-Match': etag})
+        
+        assert response.status_code == 304
+        assert response.data == b''
+    
+    def test_download_transcript_after_processing(self, client, mock_download_audio,
+                                                  mock_transcribe_audio, mock_summarize_text):
+        """Test that processing a video makes its transcript downloadable."""
+        client.post('/process', data={"youtube_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ"})
+        
+        response = client.get('/download/dQw4w9WgXcQ')
+        
+        assert response.status_code == 200
+        assert response.data == b'This is a test transcript.'
+    
+    def test_download_transcript_invalid_video_id(self, client):
+        """Test that an unsafe video ID is treated as not found."""
+        response = client.get('/download/..config.py', follow_redirects=True)
+        assert b'Transcript file not found' in response.data
+
+    def test_download_transcript_served_compressed(self, client, app):
+        """Test that a client accepting gzip gets the stored blob's bytes as they are."""
+        app.extensions['artifact_store'].blobs = BlobStore(app.config['DATA_DIR'] + '/gz', 'gzip')
+        app.extensions['artifact_store'].write_text('video_a', 'transcript.txt', 'Transcript A')
+
+        response = client.get('/download/video_a', headers={'Accept-Encoding': 'gzip, br'})
+        stored = app.extensions['artifact_store'].stored_blob('video_a', 'transcript.txt')
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        with open(stored.path, 'rb') as f:
+            assert response.data == f.read()
+        assert gzip.decompress(response.data) == b'Transcript A'
+        assert client.get('/download/video_a').data == b'Transcript A'
+
+    def test_download_transcript_refused_encoding(self, client, app):
+        """Test that gzip;q=0 and a bare * get the transcript decompressed."""
+        app.extensions['artifact_store'].blobs = BlobStore(app.config['DATA_DIR'] + '/gz', 'gzip')
+        app.extensions['artifact_store'].write_text('video_a', 'transcript.txt', 'Transcript A')
+
+        for accepted in ('gzip;q=0', 'gzip;q=0, identity', '*'):
+            response = client.get('/download/video_a', headers={'Accept-Encoding': accepted})
+            assert 'Content-Encoding' not in response.headers
+            assert response.data == b'Transcript A'
+
+    @pytest.mark.skipif(zstandard is None, reason="zstandard is not installed")
+    def test_transcript_api_serves_zstd(self, client, app):
+        """Test the transcript endpoint with zstd, only gzip, or no encoding accepted."""
+        app.extensions['artifact_store'].write_text('video_a', 'transcript.txt', 'Transcript A')
+
+        response = client.get('/api/videos/video_a/transcript',
+                              headers={'Accept-Encoding': 'zstd'})
+        assert response.headers['Content-Encoding'] == 'zstd'
+        assert zstandard.ZstdDecompressor().decompress(response.data) == b'Transcript A'
+
+        for accepted in ('zstd;q=0', '*'):
+            response = client.get('/api/videos/video_a/transcript',
+                                  headers={'Accept-Encoding': accepted})
+            assert 'Content-Encoding' not in response.headers
+            assert response.data == b'Transcript A'
+
+        for accepted in ('gzip, deflate', 'gzip, zstd;q=0'):
+            response = client.get('/api/videos/video_a/transcript',
+                                  headers={'Accept-Encoding': accepted})
+            assert response.headers['Content-Encoding'] == 'gzip'
+            assert gzip.decompress(response.data) == b'Transcript A'
+
+        plain = client.get('/api/videos/video_a/transcript')
+        assert 'Content-Encoding' not in plain.headers
+        assert plain.data == b'Transcript A'
+        again = client.get('/api/videos/video_a/transcript',
+                           headers={'If-None-Match': plain.headers['ETag']})
+        assert again.status_code == 304
+        assert client.get('/api/videos/video_b/transcript').status_code == 404
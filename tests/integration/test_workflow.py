@@ -44,6 +44,10 @@ class TestIntegrationWorkflow:
                 content_type='application/json'
             )
             
+            # The job is queued; wait for its result
+            assert response.status_code == 202
+            response = client.get(json.loads(response.data)["result_url"] + "?wait=5")
+            
             # Verify that we get the correct JSON response
             assert response.status_code == 200
             data = json.loads(response.data)
@@ -0,0 +1,257 @@
+"""Unit tests for admission control and per-client audio quotas."""
+import asyncio
+import json
+import time
+from unittest.mock import patch, AsyncMock, MagicMock
+import pytest
+from config import Config
+from website.admission import AdmissionPolicy, AudioQuota, estimate_download_bytes, parse_bitrate
+from website.async_pipeline import run_pipeline_async
+from website.routes import needs_chunks, run_pipeline, PipelineError
+
+MB = 1024 * 1024
+
+def metadata(minutes=10, abr=128, filesize=None, **fields):
+    """Probe metadata for a video of ``minutes`` with one audio-only format."""
+    info = {'video_id': 'dQw4w9WgXcQ', 'title': 'Title', 'duration': minutes * 60,
+            'is_live': False, 'caption_languages': [], 'auto_caption_languages': [],
+            'formats': [{'format_id': '140', 'ext': 'm4a', 'acodec': 'mp4a', 'vcodec': 'none',
+                         'abr': abr, 'filesize': filesize}]}
+    info.update(fields)
+    return info
+
+@pytest.fixture
+def policy():
+    """A policy on the default settings, with captions off."""
+    return AdmissionPolicy({name: getattr(Config, name) for name in dir(Config)
+                            if name.isupper()} | {'CAPTIONS_MODE': 'off'})
+
+@pytest.fixture
+def admitting_app(app):
+    """The test app with admission control on and a 30 minute quota."""
+    app.config['ADMISSION_ENABLED'] = True
+    app.extensions['admission'] = AdmissionPolicy(app.config)
+    app.extensions['audio_quota'] = AudioQuota(30, window=3600)
+    return app
+
+class TestAdmissionPolicy:
+    """Test choosing a strategy from metadata alone."""
+
+    def test_short_video_is_single(self, policy):
+        """Test that a short video is sent to Whisper in one request."""
+        plan = policy.plan(metadata(minutes=10))
+        assert plan.strategy == 'single'
+        assert plan.minutes == 10
+        assert plan.download_bytes == 128 * 1000 // 8 * 600
+
+    def test_long_video_is_chunked(self, policy):
+        """Test that audio over the chunking threshold even after transcoding is chunked."""
+        plan = policy.plan(metadata(minutes=150))
+        assert plan.strategy == 'chunked'
+        assert plan.upload_bytes == 32000 // 8 * 9000
+
+    def test_transcoding_keeps_medium_video_single(self, policy):
+        """Test that audio small enough once transcoded for speech stays single."""
+        plan = policy.plan(metadata(minutes=60))
+        assert plan.strategy == 'single'
+        assert plan.upload_bytes < Config.TRANSCRIBE_CHUNK_THRESHOLD
+
+    def test_rejections(self, policy):
+        """Test that live, overlong and oversized videos are rejected before download."""
+        assert policy.plan(metadata(is_live=True)).strategy == 'reject'
+        assert policy.plan(metadata(minutes=300)).strategy == 'reject'
+        assert policy.plan(metadata(filesize=2 * 1024 * MB)).strategy == 'reject'
+
+    def test_captions(self, policy):
+        """Test that listed captions win over audio and keep an audio fallback."""
+        policy.config['CAPTIONS_MODE'] = 'any'
+        plan = policy.plan(metadata(minutes=150, auto_caption_languages=['en', 'fr']))
+        assert plan.strategy == 'captions'
+        assert plan.minutes == 0
+        assert plan.fallback.strategy == 'chunked'
+
+        policy.config['CAPTIONS_MODE'] = 'manual'
+        assert policy.plan(metadata(auto_caption_languages=['en'])).strategy == 'single'
+        assert policy.plan(metadata(caption_languages=['de'])).strategy == 'single'
+        assert policy.plan(metadata(caption_languages=['en-GB'])).strategy == 'captions'
+
+    def test_estimates(self):
+        """Test the download estimate and bitrate parsing."""
+        muxed = {'format_id': '18', 'acodec': 'mp4a', 'vcodec': 'avc1', 'abr': 256,
+                 'filesize': 50 * MB}
+        info = metadata(filesize=5 * MB)
+        info['formats'].append(muxed)
+        assert estimate_download_bytes(info) == 5 * MB
+        assert estimate_download_bytes(metadata(formats=[])) is None
+        assert parse_bitrate('32k') == 32000
+        assert parse_bitrate(48000) == 48000
+
+class TestAudioQuota:
+    """Test the rolling per-client budget."""
+
+    def test_charge_and_refund(self):
+        """Test that charges stop at the budget and refunds restore it."""
+        quota = AudioQuota(30)
+        assert quota.charge('a', 20)
+        assert not quota.charge('a', 15)
+        assert quota.charge('b', 15)
+        quota.refund('a', 20)
+        assert quota.charge('a', 25)
+        assert quota.remaining('a') == 5
+
+    def test_window(self):
+        """Test that charges older than the window no longer count."""
+        quota = AudioQuota(10, window=0.05)
+        assert quota.charge('a', 10)
+        time.sleep(0.1)
+        assert quota.used('a') == 0
+        assert quota.charge('a', 10)
+
+    def test_unlimited(self):
+        """Test that a quota of 0 admits everything."""
+        quota = AudioQuota(0)
+        assert quota.charge('a', 10 ** 6)
+        assert quota.remaining('a') is None
+
+class TestAdmittedPipeline:
+    """Test admission before anything is downloaded."""
+
+    def test_rejected_video_is_not_downloaded(self, admitting_app, mock_download_audio):
+        """Test that a rejected video fails without fetching any audio."""
+        with admitting_app.app_context(), \
+             patch('website.routes.probe_video', return_value=metadata(minutes=300)):
+            with pytest.raises(PipelineError) as error:
+                run_pipeline('dQw4w9WgXcQ', client='client')
+        assert error.value.status_code == 413
+        mock_download_audio.assert_not_called()
+
+    def test_quota(self, admitting_app, mock_download_audio, mock_transcribe_audio,
+                   mock_summarize_text):
+        """Test that a client over its quota is refused before the download."""
+        with admitting_app.app_context(), \
+             patch('website.routes.probe_video', return_value=metadata(minutes=20)):
+            run_pipeline('dQw4w9WgXcQ', client='client')
+            with pytest.raises(PipelineError) as error:
+                run_pipeline('9bZkp7q19f0', client='client')
+            run_pipeline('9bZkp7q19f0', client='other')
+        assert error.value.status_code == 429
+        assert mock_download_audio.call_count == 2
+        assert admitting_app.extensions['audio_quota'].used('client') == 20
+
+    def test_failed_download_is_refunded(self, admitting_app):
+        """Test that minutes are returned when the audio could not be fetched."""
+        with admitting_app.app_context(), \
+             patch('website.routes.probe_video', return_value=metadata(minutes=20)), \
+             patch('website.routes.download_audio', return_value=(None, None)):
+            with pytest.raises(PipelineError):
+                run_pipeline('dQw4w9WgXcQ', client='client')
+        assert admitting_app.extensions['audio_quota'].used('client') == 0
+
+    def test_captions_plan(self, admitting_app, mock_download_audio, mock_transcribe_audio,
+                           mock_summarize_text):
+        """Test that captions are only fetched when listed and cost no minutes."""
+        admitting_app.config['CAPTIONS_MODE'] = 'any'
+        captions = {'title': 'Captioned', 'text': 'Caption text', 'timestamped': '',
+                    'source': 'manual_captions'}
+        with admitting_app.app_context(), \
+             patch('website.routes.probe_video',
+                   side_effect=[metadata(caption_languages=['en']), metadata()]), \
+             patch('website.routes.fetch_captions', return_value=captions) as fetch:
+            assert run_pipeline('dQw4w9WgXcQ', client='client')['transcript'] == 'Caption text'
+            run_pipeline('9bZkp7q19f0', client='client')
+        fetch.assert_called_once_with('dQw4w9WgXcQ')
+        mock_download_audio.assert_called_once_with('9bZkp7q19f0')
+        assert admitting_app.extensions['audio_quota'].used('client') == 10
+
+    def test_plan_strategy_reaches_transcription(self, admitting_app, mock_download_audio,
+                                                 mock_transcribe_audio, mock_summarize_text):
+        """Test that a video planned as chunked is split even if its file comes out small."""
+        with admitting_app.app_context(), \
+             patch('website.routes.probe_video',
+                   side_effect=[metadata(minutes=120), metadata(minutes=10)]):
+            run_pipeline('dQw4w9WgXcQ')
+            run_pipeline('9bZkp7q19f0')
+        assert [call.kwargs['strategy'] for call in mock_transcribe_audio.call_args_list] == [
+            'chunked', 'single']
+        assert needs_chunks(1024, 'chunked') and not needs_chunks(1024, 'single')
+        assert needs_chunks(Config.TRANSCRIBE_CHUNK_THRESHOLD + 1, 'single')
+
+        with admitting_app.app_context(), \
+             patch('website.async_pipeline.probe_video_async',
+                   AsyncMock(return_value=metadata(minutes=120))), \
+             patch('website.async_pipeline.download_audio_async',
+                   AsyncMock(return_value=('/fake/audio.mp3', 'Title'))), \
+             patch('website.async_pipeline.transcribe_audio_async',
+                   AsyncMock(return_value='Transcript')) as transcribe, \
+             patch('website.async_pipeline.summarize_text_async',
+                   AsyncMock(return_value='Summary')):
+            asyncio.run(run_pipeline_async('jNQXAC9IVRw'))
+        assert transcribe.await_args.kwargs['strategy'] == 'chunked'
+
+    def test_probe_failure_admits(self, admitting_app, mock_download_audio,
+                                  mock_transcribe_audio, mock_summarize_text):
+        """Test that a failed probe leaves the video to be processed as before."""
+        with admitting_app.app_context(), \
+             patch('website.routes.probe_video', return_value=None):
+            result = run_pipeline('dQw4w9WgXcQ', client='client')
+        assert result['transcript_source'] == 'whisper'
+
+    def test_async_quota(self, admitting_app):
+        """Test that the asyncio pipeline probes without blocking and is charged the same way."""
+        probe = MagicMock(returncode=0, stderr='', stdout=json.dumps(
+            {'id': 'dQw4w9WgXcQ', 'title': 'Title', 'duration': 20 * 60,
+             'formats': [{'format_id': '140', 'acodec': 'mp4a', 'vcodec': 'none', 'abr': 128}]}))
+        with admitting_app.app_context(), \
+             patch('website.routes.probe_video') as blocking_probe, \
+             patch('website.async_pipeline.run_command', AsyncMock(return_value=probe)) as run, \
+             patch('website.async_pipeline.download_audio_async',
+                   AsyncMock(return_value=('/fake/audio.mp3', 'Title'))) as download, \
+             patch('website.async_pipeline.transcribe_audio_async',
+                   AsyncMock(return_value='Transcript')), \
+             patch('website.async_pipeline.summarize_text_async',
+                   AsyncMock(return_value='Summary')):
+            asyncio.run(run_pipeline_async('dQw4w9WgXcQ', client='client'))
+            with pytest.raises(PipelineError):
+                asyncio.run(run_pipeline_async('9bZkp7q19f0', client='client'))
+        assert download.await_count == 1
+        assert run.await_args.args[0][:2] == ['yt-dlp', '--cookies']
+        assert '--dump-json' in run.await_args.args[0]
+        blocking_probe.assert_not_called()
+
+    def test_async_captions_plan(self, admitting_app):
+        """Test that the asyncio pipeline only fetches captions the probe listed."""
+        admitting_app.config['CAPTIONS_MODE'] = 'any'
+        captions = {'title': 'Captioned', 'text': 'Caption text', 'timestamped': '',
+                    'source': 'manual_captions'}
+        with admitting_app.app_context(), \
+             patch('website.async_pipeline.probe_video_async',
+                   AsyncMock(side_effect=[metadata(caption_languages=['en']),
+                                          metadata(auto_caption_languages=['de'])])), \
+             patch('website.async_pipeline.fetch_captions_async',
+                   AsyncMock(return_value=captions)) as fetch, \
+             patch('website.async_pipeline.download_audio_async',
+                   AsyncMock(return_value=('/fake/audio.mp3', 'Title'))) as download, \
+             patch('website.async_pipeline.transcribe_audio_async',
+                   AsyncMock(return_value='Transcript')), \
+             patch('website.async_pipeline.summarize_text_async',
+                   AsyncMock(return_value='Summary')):
+            captioned = asyncio.run(run_pipeline_async('dQw4w9WgXcQ', client='client'))
+            asyncio.run(run_pipeline_async('9bZkp7q19f0', client='client'))
+        assert captioned['transcript'] == 'Caption text'
+        fetch.assert_awaited_once_with('dQw4w9WgXcQ')
+        download.assert_awaited_once_with('9bZkp7q19f0')
+
+    def test_api_reports_quota_errors(self, admitting_app, mock_download_audio):
+        """Test that a refused job reports 429 and the quota endpoint the usage."""
+        client = admitting_app.test_client()
+        admitting_app.config['QUOTA_CLIENT_HEADER'] = 'X-Client'
+        admitting_app.extensions['audio_quota'].charge('key-1', 25)
+        with patch('website.routes.probe_video', return_value=metadata(minutes=10)):
+            job = client.post('/api/process', headers={'X-Client': 'key-1'},
+                              json={"youtube_url": "https://youtu.be/dQw4w9WgXcQ"}).get_json()
+            response = client.get(job['result_url'] + '?wait=5')
+        assert response.status_code == 429
+        mock_download_audio.assert_not_called()
+
+        usage = client.get('/api/quota', headers={'X-Client': 'key-1'}).get_json()
+        assert usage['used_minutes'] == 25 and usage['remaining_minutes'] == 5
@@ -20,6 +20,10 @@ class TestApiRoutes:
             content_type='application/json'
         )
         
+        assert response.status_code == 202
+        job = json.loads(response.data)
+        response = client.get(job["result_url"] + "?wait=5")
+        
         data = json.loads(response.data)
         assert response.status_code == 200
         assert data["video_id"] == "test_video_id"
@@ -66,6 +70,9 @@ class TestApiRoutes:
             content_type='application/json'
         )
         
+        assert response.status_code == 202
+        response = client.get(json.loads(response.data)["result_url"] + "?wait=5")
+        
         data = json.loads(response.data)
         assert response.status_code == 500
         assert "error" in data
@@ -84,6 +91,9 @@ class TestApiRoutes:
             content_type='application/json'
         )
         
+        assert response.status_code == 202
+        response = client.get(json.loads(response.data)["result_url"] + "?wait=5")
+        
         data = json.loads(response.data)
         assert response.status_code == 500
         assert "error" in data
@@ -0,0 +1,186 @@
+"""Unit tests for the asyncio job backend and pipeline."""
+import asyncio
+import json
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch, AsyncMock, MagicMock
+import openai
+import pytest
+from website import create_app
+from website.async_pipeline import (run_command, download_audio_async, _whisper_async,
+                                    summarize_text_async, run_pipeline_async)
+from website.jobs import AsyncJobManager
+from website.limits import StageLimiter
+from website.llm import OpenAIClient
+
+def rate_limit_error():
+    """Build the error the SDK raises for a 429 response."""
+    response = MagicMock(status_code=429, headers={'retry-after': '0'})
+    return openai.RateLimitError("Rate limit reached", response=response, body=None)
+
+@pytest.fixture
+def async_app(tmp_path):
+    """An app running jobs on the asyncio backend."""
+    app = create_app({'DATA_DIR': str(tmp_path), 'CAPTIONS_MODE': 'off',
+                      'ADMISSION_ENABLED': False, 'JOB_BACKEND': 'asyncio'})
+    app.config['TESTING'] = True
+    yield app
+    app.extensions['job_manager'].shutdown()
+
+class TestAsyncPrimitives:
+    """Test the non-blocking building blocks."""
+
+    def test_run_command(self):
+        """Test that a subprocess's exit code and text output are returned."""
+        result = asyncio.run(run_command(
+            [sys.executable, '-c', 'import sys; print("out"); sys.exit(3)']))
+        assert result.returncode == 3
+        assert result.stdout.strip() == 'out'
+
+    def test_acall_retries(self):
+        """Test that an awaited request is retried after a 429."""
+        request = AsyncMock(side_effect=[rate_limit_error(), 'ok'])
+        client = OpenAIClient()
+        assert asyncio.run(client.acall('gpt-3.5-turbo', request)) == 'ok'
+        assert request.await_count == 2
+        assert client.metrics()['retries'] == 1
+
+    def test_astage_limits_coroutines(self):
+        """Test that coroutines share a stage's slots."""
+        limiter = StageLimiter({'download': 2})
+        peak = []
+
+        async def enter():
+            async with limiter.astage('download', poll_interval=0.001):
+                peak.append(limiter.active()['download'])
+                await asyncio.sleep(0.01)
+
+        async def main():
+            await asyncio.gather(*(enter() for _ in range(6)))
+        asyncio.run(main())
+        assert max(peak) == 2 and len(peak) == 6
+
+class TestAsyncPipeline:
+    """Test the coroutine pipeline steps."""
+
+    def test_download_uses_subprocess(self, app, tmp_path):
+        """Test that yt-dlp is awaited and its metadata used for the title."""
+        audio = tmp_path / "audio.mp3"
+        audio.write_bytes(b"audio")
+        done = MagicMock(returncode=0, stdout='{"title": "Async Title"}', stderr='')
+        with app.app_context(), \
+             patch('website.async_pipeline.run_command', AsyncMock(return_value=done)) as run, \
+             patch('website.routes.finish_download',
+                   return_value=(str(audio), {'title': 'Async Title'})):
+            assert asyncio.run(download_audio_async('dQw4w9WgXcQ')) == (str(audio),
+                                                                         'Async Title')
+        assert run.await_args.args[0][0] == 'yt-dlp'
+
+    def test_download_failure(self, app):
+        """Test that a failing yt-dlp is reported as no audio."""
+        failed = MagicMock(returncode=1, stdout='', stderr='ERROR')
+        with app.app_context(), \
+             patch('website.async_pipeline.run_command', AsyncMock(return_value=failed)):
+            assert asyncio.run(download_audio_async('dQw4w9WgXcQ')) == (None, None)
+
+    def test_whisper_keeps_segments(self, app, tmp_path):
+        """Test that the async Whisper call returns the text with its segments."""
+        audio = tmp_path / "audio.mp3"
+        audio.write_bytes(b"audio")
+        response = SimpleNamespace(text="Hello there.",
+                                   segments=[{'start': 0.0, 'end': 1.5, 'text': 'Hello there.'}])
+        sdk = MagicMock()
+        sdk.audio.transcriptions.create = AsyncMock(return_value=response)
+        with app.app_context(), patch('website.async_pipeline.get_async_openai',
+                                      return_value=sdk):
+            transcript = asyncio.run(_whisper_async(str(audio)))
+        assert transcript == "Hello there."
+        assert transcript.segments == [(0.0, 1.5, 'Hello there.')]
+        assert sdk.audio.transcriptions.create.await_args.kwargs['file'][1] == b"audio"
+
+    def test_summarize_map_reduce(self, app):
+        """Test that long transcripts are summarized in chunks, then combined."""
+        app.config['SUMMARY_CHUNK_TOKENS'] = 50
+        message = MagicMock()
+        message.content = "partial"
+        sdk = MagicMock()
+        sdk.chat.completions.create = AsyncMock(
+            return_value=MagicMock(choices=[MagicMock(message=message)]))
+        with app.app_context(), patch('website.async_pipeline.get_async_openai',
+                                      return_value=sdk):
+            assert asyncio.run(summarize_text_async("word " * 200)) == "partial"
+        assert sdk.chat.completions.create.await_count > 2
+
+    def test_run_pipeline(self, app):
+        """Test a full run, then a cached one that skips every step."""
+        with app.app_context(), \
+             patch('website.async_pipeline.download_audio_async',
+                   AsyncMock(return_value=('/fake/audio.mp3', 'Title'))) as download, \
+             patch('website.async_pipeline.transcribe_audio_async',
+                   AsyncMock(return_value='Transcript')), \
+             patch('website.async_pipeline.summarize_text_async',
+                   AsyncMock(return_value='Summary')) as summarize:
+            stages = []
+            result = asyncio.run(run_pipeline_async('dQw4w9WgXcQ', stages.append))
+            again = asyncio.run(run_pipeline_async('dQw4w9WgXcQ'))
+        assert result['summary'] == again['summary'] == 'Summary'
+        assert result['transcript'] == 'Transcript'
+        assert stages == ['downloading', 'transcribing', 'summarizing']
+        assert download.await_count == summarize.await_count == 1
+
+class TestAsyncJobManager:
+    """Test running jobs as coroutines."""
+
+    def test_many_jobs_on_one_thread(self):
+        """Test that hundreds of waiting jobs run concurrently without a thread each."""
+        threads = set()
+
+        async def runner(video_id, on_stage):
+            on_stage('downloading')
+            threads.add(threading.get_ident())
+            await asyncio.sleep(0.2)
+            return video_id
+
+        manager = AsyncJobManager(runner, max_workers=500)
+        started = time.monotonic()
+        jobs = [manager.submit(f"video{i:06d}")[0] for i in range(300)]
+        assert all(job.wait(5) for job in jobs)
+        assert time.monotonic() - started < 3
+        assert [job.result for job in jobs] == [f"video{i:06d}" for i in range(300)]
+        assert len(threads) == 1
+        manager.shutdown()
+
+    def test_failure_and_coalescing(self):
+        """Test that errors fail the job and duplicates share the running job."""
+        async def runner(video_id, on_stage):
+            await asyncio.sleep(0.05)
+            raise RuntimeError("boom")
+
+        manager = AsyncJobManager(runner)
+        first, created = manager.submit("video")
+        second, created_again = manager.submit("video")
+        assert first.wait(5)
+        assert created and not created_again and first is second
+        assert first.stage == 'failed' and first.error == "boom"
+        manager.shutdown()
+
+    def test_process_endpoint(self, async_app):
+        """Test /api/process end to end on the asyncio backend."""
+        client = async_app.test_client()
+        with patch('website.async_pipeline.download_audio_async',
+                   AsyncMock(return_value=('/fake/audio.mp3', 'Title'))), \
+             patch('website.async_pipeline.transcribe_audio_async',
+                   AsyncMock(return_value='Transcript')), \
+             patch('website.async_pipeline.summarize_text_async',
+                   AsyncMock(return_value='Summary')):
+            response = client.post(
+                '/api/process',
+                data=json.dumps({"youtube_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ"}),
+                content_type='application/json'
+            )
+            assert response.status_code == 202
+            result = client.get(response.get_json()['result_url'] + '?wait=5')
+        assert result.status_code == 200
+        assert result.get_json()['summary'] == 'Summary'
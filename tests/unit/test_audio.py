@@ -0,0 +1,94 @@
+"""Unit tests for audio chunking and transcript stitching."""
+import pytest
+from website.audio import plan_chunks, merge_transcripts, detect_silences, prepare_for_whisper
+
+class TestPlanChunks:
+    """Test how audio is cut into windows."""
+
+    def test_short_audio_is_one_chunk(self):
+        """Test that audio shorter than a window is not split."""
+        assert plan_chunks(90.0, 600) == [(0.0, 90.0)]
+
+    def test_fixed_windows_with_overlap(self):
+        """Test fixed windows that overlap by the requested amount."""
+        chunks = plan_chunks(250.0, 100, overlap_seconds=2)
+        assert chunks == [(0.0, 100.0), (98.0, 198.0), (196.0, 250.0)]
+
+    def test_cut_moves_to_silence(self):
+        """Test that a silence near the end of a window becomes the cut point."""
+        chunks = plan_chunks(250.0, 100, silences=[(10.0, 11.0), (90.0, 92.0)])
+        assert chunks[0] == (0.0, 91.0)
+        assert chunks[1][0] == 91.0
+
+    def test_overlap_must_be_smaller_than_window(self):
+        """Test that an overlap as large as the window is rejected."""
+        with pytest.raises(ValueError):
+            plan_chunks(100.0, 10, overlap_seconds=10)
+
+class TestMergeTranscripts:
+    """Test stitching chunk transcripts back together."""
+
+    def test_overlap_is_removed(self):
+        """Test that words repeated across a chunk boundary appear once."""
+        merged = merge_transcripts(["Hello there, general", "General Kenobi. You are bold."])
+        assert merged == "Hello there, general Kenobi. You are bold."
+
+    def test_no_overlap(self):
+        """Test that unrelated chunks are simply joined."""
+        assert merge_transcripts(["First part.", "Second part."]) == "First part. Second part."
+
+    def test_empty_chunks_are_skipped(self):
+        """Test that silent chunks do not add stray whitespace."""
+        assert merge_transcripts(["One.", "", None, "Two."]) == "One. Two."
+
+class TestDetectSilences:
+    """Test parsing ffmpeg silencedetect output."""
+
+    def test_parse_silences(self, mock_subprocess_run):
+        """Test that start/end pairs are read from ffmpeg's stderr."""
+        mock_subprocess_run.return_value.stderr = (
+            "[silencedetect @ 0x1] silence_start: -0.01\n"
+            "[silencedetect @ 0x1] silence_end: 1.5 | silence_duration: 1.51\n"
+            "[silencedetect @ 0x1] silence_start: 60.25\n"
+            "[silencedetect @ 0x1] silence_end: 61 | silence_duration: 0.75\n"
+        )
+        assert detect_silences("/fake/path/audio.mp3") == [(0.0, 1.5), (60.25, 61.0)]
+
+class TestPrepareForWhisper:
+    """Test deciding when downloaded audio needs transcoding."""
+
+    def test_small_native_file_is_kept(self, tmp_path, mock_subprocess_run):
+        """Test that a supported file under the threshold is used as-is."""
+        audio = tmp_path / "video_audio_x.webm"
+        audio.write_bytes(b"\0" * 100)
+
+        assert prepare_for_whisper(str(audio), threshold=1000) == str(audio)
+        mock_subprocess_run.assert_not_called()
+
+    def test_large_file_is_transcoded(self, tmp_path, mock_subprocess_run):
+        """Test that a file over the threshold is replaced by a speech transcode."""
+        audio = tmp_path / "video_audio_x.m4a"
+        audio.write_bytes(b"\0" * 2000)
+
+        def ffmpeg(command, **kwargs):
+            (tmp_path / "video_audio_x.speech.ogg").write_bytes(b"\0" * 500)
+            return mock_subprocess_run.return_value
+        mock_subprocess_run.side_effect = ffmpeg
+
+        result = prepare_for_whisper(str(audio), threshold=1000)
+
+        assert result == str(tmp_path / "video_audio_x.speech.ogg")
+        assert not audio.exists()
+        assert "libopus" in mock_subprocess_run.call_args.args[0]
+
+    def test_unsupported_container_is_transcoded(self, tmp_path, mock_subprocess_run):
+        """Test that formats Whisper rejects are converted regardless of size."""
+        audio = tmp_path / "video_audio_x.opus"
+        audio.write_bytes(b"\0" * 100)
+
+        def ffmpeg(command, **kwargs):
+            (tmp_path / "video_audio_x.speech.ogg").write_bytes(b"\0" * 200)
+            return mock_subprocess_run.return_value
+        mock_subprocess_run.side_effect = ffmpeg
+
+        assert prepare_for_whisper(str(audio), threshold=0).endswith(".speech.ogg")
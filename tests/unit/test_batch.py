@@ -0,0 +1,112 @@
+"""Unit tests for batch processing and per-stage concurrency limits."""
+import json
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from website.limits import StageLimiter
+
+def read_ndjson(response):
+    """Parse an NDJSON response body into a list of objects."""
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+
+class TestStageLimiter:
+    """Test per-stage concurrency caps."""
+
+    def test_stage_limit_is_enforced(self):
+        """Test that no more than the limit run inside a stage at once."""
+        limiter = StageLimiter({'download': 2})
+        peak, lock = [0], threading.Lock()
+
+        def work():
+            with limiter.stage('download'):
+                with lock:
+                    peak[0] = max(peak[0], limiter.active()['download'])
+                time.sleep(0.02)
+
+        threads = [threading.Thread(target=work) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert peak[0] == 2
+        assert limiter.active()['download'] == 0
+
+    def test_unlisted_stage_is_unbounded(self):
+        """Test that a stage without a limit does not block."""
+        limiter = StageLimiter({'download': 0})
+        with limiter.stage('download'), limiter.stage('other'):
+            assert limiter.active() == {'download': 1, 'other': 1}
+
+class TestBatchRoute:
+    """Test the /api/batch endpoint."""
+
+    def test_batch_streams_one_line_per_video(self, client, mock_download_audio,
+                                              mock_transcribe_audio, mock_summarize_text):
+        """Test that a list of URLs is processed and streamed back as NDJSON."""
+        response = client.post('/api/batch', json={"youtube_urls": [
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+            "https://youtu.be/9bZkp7q19f0",
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+            "https://www.example.com/not-youtube"
+        ]})
+
+        lines = read_ndjson(response)
+        assert response.mimetype == 'application/x-ndjson'
+        assert lines[0] == {"batch_size": 2, "video_ids": ["dQw4w9WgXcQ", "9bZkp7q19f0"]}
+        assert lines[1]["status"] == "failed"
+        done = {line["video_id"]: line for line in lines[2:]}
+        assert set(done) == {"dQw4w9WgXcQ", "9bZkp7q19f0"}
+        assert all(line["status"] == "done" for line in done.values())
+        assert mock_download_audio.call_count == 2
+
+    def test_batch_respects_concurrency(self, app, client, mock_transcribe_audio,
+                                        mock_summarize_text):
+        """Test that no more than BATCH_CONCURRENCY videos run at once."""
+        app.config['BATCH_CONCURRENCY'] = 2
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def slow_download(video_id):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return "/fake/path/audio.mp3", "Test Video Title"
+
+        ids = ["aaaaaaaaaaa", "bbbbbbbbbbb", "ccccccccccc", "ddddddddddd", "eeeeeeeeeee"]
+        with patch('website.routes.download_audio', side_effect=slow_download):
+            response = client.post('/api/batch', json={
+                "youtube_urls": [f"https://youtu.be/{video_id}" for video_id in ids]})
+            lines = read_ndjson(response)
+
+        assert len(lines) == 6
+        assert peak[0] <= 2
+
+    def test_batch_expands_playlist(self, client, mock_subprocess_run, mock_download_audio,
+                                    mock_transcribe_audio, mock_summarize_text):
+        """Test that a playlist is expanded with one flat metadata call."""
+        mock_subprocess_run.return_value.stdout = json.dumps(
+            {"entries": [{"id": "dQw4w9WgXcQ"}, {"id": "9bZkp7q19f0"}]})
+
+        response = client.post('/api/batch', json={
+            "playlist_url": "https://www.youtube.com/playlist?list=PL123"})
+
+        lines = read_ndjson(response)
+        assert lines[0]["video_ids"] == ["dQw4w9WgXcQ", "9bZkp7q19f0"]
+        assert "--flat-playlist" in mock_subprocess_run.call_args.args[0]
+        mock_subprocess_run.assert_called_once()
+
+    def test_batch_canonicalizes_playlist_link(self, client):
+        """Test that a video link carrying a playlist expands the canonical playlist URL."""
+        with patch('website.routes.expand_playlist', return_value=[]) as expand:
+            client.post('/api/batch', json={
+                "playlist_url": "youtu.be/dQw4w9WgXcQ?list=PL123&t=30"})
+        expand.assert_called_once_with("https://www.youtube.com/playlist?list=PL123")
+
+    def test_batch_requires_input(self, client):
+        """Test that an empty batch is rejected."""
+        response = client.post('/api/batch', json={})
+        assert response.status_code == 400
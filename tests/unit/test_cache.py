@@ -0,0 +1,149 @@
+"""Unit tests for the pipeline result cache."""
+import json
+import sqlite3
+import time
+import pytest
+from unittest.mock import patch
+from website.cache import ResultCache, SCHEMA
+
+@pytest.fixture
+def cache(tmp_path):
+    """Create a result cache backed by a temporary database."""
+    return ResultCache(str(tmp_path / "results.sqlite3"))
+
+class TestResultCache:
+    """Test storing, expiring and evicting cached results."""
+
+    def test_cache_miss(self, cache):
+        """Test that an unknown video is a miss."""
+        assert cache.get_video("test_video_id", "whisper-1") is None
+        assert cache.get_summary("test_video_id", "gpt-3.5-turbo", 1) is None
+
+    def test_put_and_get(self, cache):
+        """Test storing and reading back a transcript and summary."""
+        cache.put_video("test_video_id", "Test Video Title", "A transcript.", "whisper-1")
+        cache.put_summary("test_video_id", "gpt-3.5-turbo", 1, "A summary.")
+
+        assert cache.get_video("test_video_id", "whisper-1") == {
+            'title': "Test Video Title", 'transcript': "A transcript.", 'source': "whisper"}
+        assert cache.get_summary("test_video_id", "gpt-3.5-turbo", 1) == "A summary."
+
+    def test_model_and_prompt_version_are_part_of_key(self, cache):
+        """Test that a different model or prompt version misses."""
+        cache.put_video("test_video_id", "Title", "A transcript.", "whisper-1")
+        cache.put_summary("test_video_id", "gpt-3.5-turbo", 1, "A summary.")
+
+        assert cache.get_video("test_video_id", "other-model") is None
+        assert cache.get_summary("test_video_id", "gpt-3.5-turbo", 2) is None
+
+    def test_summaries_are_kept_per_language(self, cache):
+        """Test that each language has its own summary and English is the default."""
+        cache.put_video("test_video_id", "Title", "A transcript.", "whisper-1")
+        cache.put_summary("test_video_id", "gpt-3.5-turbo", 1, "A summary.")
+        cache.put_summary("test_video_id", "gpt-3.5-turbo", 1, "Un résumé.", "fr")
+
+        assert cache.get_summary("test_video_id", "gpt-3.5-turbo", 1, "en") == "A summary."
+        assert cache.get_summary("test_video_id", "gpt-3.5-turbo", 1, "fr") == "Un résumé."
+        assert cache.get_summary("test_video_id", "gpt-3.5-turbo", 1, "de") is None
+
+    def test_expired_entries_are_ignored(self, tmp_path):
+        """Test that entries older than the TTL are not returned."""
+        cache = ResultCache(str(tmp_path / "results.sqlite3"), ttl=60)
+        cache.put_video("test_video_id", "Title", "A transcript.", "whisper-1")
+
+        with patch('website.cache.time.time', return_value=time.time() + 120):
+            assert cache.get_video("test_video_id", "whisper-1") is None
+
+    def test_lru_eviction_by_entry_count(self, tmp_path):
+        """Test that the least recently used video is evicted first."""
+        cache = ResultCache(str(tmp_path / "results.sqlite3"), max_entries=2)
+        cache.put_video("video_a", "A", "Transcript A", "whisper-1")
+        cache.put_video("video_b", "B", "Transcript B", "whisper-1")
+        cache.get_video("video_a", "whisper-1")
+        cache.put_video("video_c", "C", "Transcript C", "whisper-1")
+
+        assert cache.get_video("video_a", "whisper-1") is not None
+        assert cache.get_video("video_b", "whisper-1") is None
+        assert cache.get_video("video_c", "whisper-1") is not None
+
+    def test_eviction_by_size(self, tmp_path):
+        """Test that the byte budget is enforced and summaries go with their video."""
+        cache = ResultCache(str(tmp_path / "results.sqlite3"), max_bytes=15)
+        cache.put_video("video_a", "A", "x" * 10, "whisper-1")
+        cache.put_summary("video_a", "gpt-3.5-turbo", 1, "Summary A")
+        cache.put_video("video_b", "B", "y" * 10, "whisper-1")
+
+        assert cache.get_video("video_a", "whisper-1") is None
+        assert cache.get_summary("video_a", "gpt-3.5-turbo", 1) is None
+        assert cache.get_video("video_b", "whisper-1") is not None
+
+class TestCachedPipeline:
+    """Test that cached results short-circuit the processing routes."""
+
+    def test_second_request_is_served_from_cache(self, client, mock_download_audio,
+                                                  mock_transcribe_audio, mock_summarize_text):
+        """Test that a repeated video ID skips download, transcription and summarization."""
+        payload = json.dumps({"youtube_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ"})
+
+        first = client.post('/api/process', data=payload, content_type='application/json')
+        assert first.status_code == 202
+        first = client.get(json.loads(first.data)["result_url"] + "?wait=5")
+        second = client.post('/api/process', data=payload, content_type='application/json')
+
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert json.loads(second.data) == json.loads(first.data)
+        mock_download_audio.assert_called_once()
+        mock_transcribe_audio.assert_called_once()
+        mock_summarize_text.assert_called_once()
+
+    def test_missing_summary_is_recomputed_from_cached_transcript(
+            self, client, mock_download_audio, mock_transcribe_audio, mock_summarize_text):
+        """Test that a failed summary is retried without re-downloading."""
+        payload = json.dumps({"youtube_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ"})
+        mock_summarize_text.return_value = None
+        response = client.post('/api/process', data=payload, content_type='application/json')
+        client.get(json.loads(response.data)["result_url"] + "?wait=5")
+
+        mock_summarize_text.return_value = "This is a test summary."
+        response = client.post('/api/process', data=payload, content_type='application/json')
+        response = client.get(json.loads(response.data)["result_url"] + "?wait=5")
+
+        assert json.loads(response.data)["summary"] == "This is a test summary."
+        mock_download_audio.assert_called_once()
+        assert mock_summarize_text.call_count == 2
+
+class TestMigrations:
+    """Test upgrading databases created by older versions."""
+
+    def test_old_database_is_migrated(self, tmp_path):
+        """Test that a cache created before transcript sources were recorded still works."""
+        path = str(tmp_path / "old.sqlite3")
+        conn = sqlite3.connect(path)
+        conn.executescript(SCHEMA)
+        conn.execute("INSERT INTO videos VALUES ('old_video', 'Old', 'Old transcript.', "
+                     "'whisper-1', 15, ?, ?)", (time.time(), time.time()))
+        conn.commit()
+        conn.close()
+
+        cache = ResultCache(path)
+        assert cache.get_video("old_video", "whisper-1")["source"] == "whisper"
+        cache.put_video("new_video", "New", "New transcript.", "whisper-1", "manual_captions")
+        assert cache.get_video("new_video", "whisper-1")["source"] == "manual_captions"
+
+    def test_old_summaries_become_english(self, tmp_path):
+        """Test that summaries cached before languages were recorded are kept as English."""
+        path = str(tmp_path / "old.sqlite3")
+        conn = sqlite3.connect(path)
+        conn.executescript(SCHEMA)
+        conn.execute("INSERT INTO videos VALUES ('old_video', 'Old', 'Old transcript.', "
+                     "'whisper-1', 15, ?, ?)", (time.time(), time.time()))
+        conn.execute("INSERT INTO summaries VALUES ('old_video', 'gpt-3.5-turbo', 1, "
+                     "'Old summary.', ?)", (time.time(),))
+        conn.commit()
+        conn.close()
+
+        cache = ResultCache(path)
+        assert cache.get_summary("old_video", "gpt-3.5-turbo", 1, "en") == "Old summary."
+        cache.put_video("old_video", "Old", "New transcript.", "whisper-1")
+        assert cache.get_summary("old_video", "gpt-3.5-turbo", 1, "en") is None
@@ -0,0 +1,148 @@
+"""Unit tests for the caption-first transcript path."""
+import json
+import os
+from unittest.mock import patch, MagicMock
+from website.captions import (parse_cues, dedupe_cues, to_plain_text, to_timestamped_text,
+                              parse_timestamp)
+from website.routes import fetch_captions, run_pipeline
+from website.storage import TIMESTAMPED_TRANSCRIPT
+
+AUTO_VTT = """WEBVTT
+Kind: captions
+Language: en
+
+00:00:00.000 --> 00:00:02.000 align:start position:0%
+hello<00:00:00.500><c> everyone</c><00:00:01.000><c> and</c>
+
+00:00:02.000 --> 00:00:02.010 align:start position:0%
+hello everyone and
+
+00:00:02.010 --> 00:00:04.000 align:start position:0%
+hello everyone and
+welcome<00:00:02.500><c> to</c><00:00:03.000><c> the</c><00:00:03.500><c> show</c>
+
+00:00:04.000 --> 00:01:05.000 align:start position:0%
+welcome to the show
+it&#39;s great to be here
+"""
+
+SRT = """1
+00:00:01,000 --> 00:00:03,500
+<i>First</i> line
+
+2
+01:02:03,000 --> 01:02:05,000
+Second line
+spanning two rows
+"""
+
+CAPTION_WORDS = " ".join(["word"] * 30)
+
+class TestParseCaptions:
+    """Test VTT/SRT parsing and normalization."""
+
+    def test_parse_timestamps(self):
+        """Test both the VTT and SRT forms, with and without hours."""
+        assert parse_timestamp("01:02:03.500") == 3723.5
+        assert parse_timestamp("02:03,250") == 123.25
+
+    def test_srt(self):
+        """Test that SRT cues are parsed and markup removed."""
+        cues = parse_cues(SRT)
+        assert [(cue.start, cue.text) for cue in cues] == [
+            (1.0, "First line"), (3723.0, "Second line\nspanning two rows")]
+        assert to_timestamped_text(cues) == (
+            "[00:00:01] First line\n[01:02:03] Second line spanning two rows")
+
+    def test_auto_captions_are_deduplicated(self):
+        """Test that lines repeated by YouTube's scrolling captions appear once."""
+        cues = dedupe_cues(parse_cues(AUTO_VTT))
+        assert to_plain_text(cues) == ("hello everyone and welcome to the show "
+                                       "it's great to be here")
+        assert to_timestamped_text(cues).splitlines()[0] == "[00:00:00] hello everyone and"
+
+    def test_header_only(self):
+        """Test that a track without cues yields nothing."""
+        assert not parse_cues("WEBVTT\n\nNOTE nothing here\n")
+
+def fake_yt_dlp(files, info):
+    """Build a subprocess.run replacement that writes caption files like yt-dlp."""
+    def run(command, **kwargs): #pylint: disable=unused-argument
+        out_dir = os.path.dirname(command[command.index("-o") + 1])
+        for name, content in files.items():
+            with open(os.path.join(out_dir, name), 'w', encoding='utf-8') as f:
+                f.write(content)
+        return MagicMock(returncode=0, stdout=json.dumps(info) + "\n")
+    return run
+
+class TestFetchCaptions:
+    """Test fetching captions with yt-dlp."""
+
+    def test_manual_track_is_preferred(self):
+        """Test that an uploaded track wins over an automatic one."""
+        files = {"captions.en.vtt": f"WEBVTT\n\n00:00:01.000 --> 00:00:02.000\n{CAPTION_WORDS}\n",
+                 "captions.en-GB.vtt": "WEBVTT\n\n00:00:01.000 --> 00:00:02.000\nmanual\n" +
+                                       "\n00:00:02.000 --> 00:00:03.000\n" + CAPTION_WORDS + "\n"}
+        info = {"title": "Captioned", "subtitles": {"en-GB": []}}
+        with patch('subprocess.run', side_effect=fake_yt_dlp(files, info)) as mock_run:
+            captions = fetch_captions("dQw4w9WgXcQ")
+
+        command = mock_run.call_args.args[0]
+        assert "--skip-download" in command
+        assert "--write-auto-subs" in command
+        assert captions["source"] == "manual_captions"
+        assert captions["language"] == "en-GB"
+        assert captions["title"] == "Captioned"
+        assert captions["text"].startswith("manual word")
+
+    def test_short_track_is_rejected(self):
+        """Test that a track with too few words falls back to transcription."""
+        files = {"captions.en.vtt": "WEBVTT\n\n00:00:01.000 --> 00:00:02.000\n[Music]\n"}
+        with patch('subprocess.run', side_effect=fake_yt_dlp(files, {"title": "Song"})):
+            assert fetch_captions("dQw4w9WgXcQ") is None
+
+    def test_no_tracks(self):
+        """Test that a video without captions falls back to transcription."""
+        with patch('subprocess.run', side_effect=fake_yt_dlp({}, {"title": "Silent"})):
+            assert fetch_captions("dQw4w9WgXcQ") is None
+
+    def test_manual_mode_skips_automatic_captions(self):
+        """Test that CAPTIONS_MODE=manual does not ask for automatic captions."""
+        with patch('config.Config.CAPTIONS_MODE', 'manual'), \
+             patch('subprocess.run', side_effect=fake_yt_dlp({}, {})) as mock_run:
+            fetch_captions("dQw4w9WgXcQ")
+        assert "--write-auto-subs" not in mock_run.call_args.args[0]
+
+class TestCaptionFirstPipeline:
+    """Test that the pipeline uses captions before downloading audio."""
+
+    def test_captions_skip_audio(self, app, mock_download_audio, mock_transcribe_audio,
+                                 mock_summarize_text):
+        """Test that a captioned video is never downloaded or transcribed."""
+        app.config['CAPTIONS_MODE'] = 'any'
+        captions = {'title': 'Captioned', 'text': 'Caption text', 'language': 'en',
+                    'timestamped': '[00:00:00] Caption text', 'source': 'auto_captions'}
+        with app.app_context(), \
+             patch('website.routes.fetch_captions', return_value=captions):
+            result = run_pipeline('dQw4w9WgXcQ')
+            cached = app.extensions['result_cache'].get_video('dQw4w9WgXcQ', 'whisper-1')
+            timestamped = app.extensions['artifact_store'].read_text('dQw4w9WgXcQ',
+                                                                     TIMESTAMPED_TRANSCRIPT)
+
+        mock_download_audio.assert_not_called()
+        mock_transcribe_audio.assert_not_called()
+        assert result['transcript'] == 'Caption text'
+        assert result['transcript_source'] == 'auto_captions'
+        assert cached['source'] == 'auto_captions'
+        assert timestamped == '[00:00:00] Caption text'
+
+    def test_falls_back_to_transcription(self, app, mock_download_audio, mock_transcribe_audio,
+                                         mock_summarize_text):
+        """Test that a video without captions is transcribed as before."""
+        app.config['CAPTIONS_MODE'] = 'any'
+        with app.app_context(), \
+             patch('website.routes.fetch_captions', return_value=None):
+            result = run_pipeline('dQw4w9WgXcQ')
+
+        mock_transcribe_audio.assert_called_once()
+        assert result['transcript_source'] == 'whisper'
@@ -0,0 +1,110 @@
+"""Unit tests for token-aware chunking and map-reduce summarization."""
+import pytest
+from unittest.mock import patch, MagicMock
+from website import routes
+from website.chunking import Memo, count_tokens, split_by_tokens
+from website.routes import summarize_text
+
+def completion(content):
+    """Build a chat completion response with the given content."""
+    choice = MagicMock()
+    choice.message.content = content
+    return MagicMock(choices=[choice])
+
+@pytest.fixture(autouse=True)
+def clear_memo():
+    """Start each test with no memoized chunk summaries."""
+    routes.chunk_summaries.clear()
+    yield
+    routes.chunk_summaries.clear()
+
+class TestSplitByTokens:
+    """Test splitting text into bounded chunks."""
+
+    def test_short_text_is_one_chunk(self):
+        """Test that text within the limit is returned unchanged."""
+        assert split_by_tokens("One sentence. Two sentences.", 100) == [
+            "One sentence. Two sentences."]
+
+    def test_chunks_respect_limit_and_sentences(self):
+        """Test that chunks stay within the limit and break between sentences."""
+        text = " ".join(f"Sentence number {i} is here." for i in range(50))
+        chunks = split_by_tokens(text, 20)
+
+        assert len(chunks) > 1
+        assert all(count_tokens(chunk) <= 20 for chunk in chunks)
+        assert all(chunk.endswith(".") for chunk in chunks)
+        assert " ".join(chunks) == text
+
+    def test_long_sentence_is_split_between_words(self):
+        """Test that a sentence longer than the limit is split on spaces."""
+        chunks = split_by_tokens("word " * 100, 10)
+        assert all(count_tokens(chunk) <= 10 for chunk in chunks)
+        assert sum(len(chunk.split()) for chunk in chunks) == 100
+
+    def test_each_piece_is_tokenized_once(self):
+        """Test that the text tokenized grows linearly, not with each chunk's size."""
+        text = " ".join(f"Sentence number {i} is here." for i in range(2000))
+        tokenized = []
+
+        def counting(piece):
+            tokenized.append(len(piece))
+            return count_tokens(piece)
+
+        with patch('website.chunking.count_tokens', side_effect=counting):
+            chunks = split_by_tokens(text, 500)
+        assert len(chunks) > 10
+        assert sum(tokenized) <= len(text) + len(chunks)
+
+class TestMemo:
+    """Test the bounded memo."""
+
+    def test_lru_bound(self):
+        """Test that the least recently used entry is dropped first."""
+        memo = Memo(maxsize=2)
+        memo.put("a", 1)
+        memo.put("b", 2)
+        memo.get("a")
+        memo.put("c", 3)
+
+        assert memo.get("a") == 1
+        assert memo.get("b") is None
+        assert memo.get("c") == 3
+
+class TestMapReduceSummary:
+    """Test summarizing transcripts longer than one request."""
+
+    LONG_TEXT = " ".join(f"Sentence number {i} is here." for i in range(30))
+
+    def test_long_transcript_is_mapped_then_reduced(self):
+        """Test that each chunk is summarized and the results combined."""
+        with patch('config.Config.SUMMARY_CHUNK_TOKENS', 40), \
+             patch('openai.chat.completions.create',
+                   side_effect=lambda **kw: completion("partial")) as mock_create:
+            summarize_text(self.LONG_TEXT)
+
+        prompts = [call.kwargs["messages"][1]["content"] for call in mock_create.call_args_list]
+        chunks = split_by_tokens(self.LONG_TEXT, 40)
+        assert len(prompts) == len(chunks) + 1
+        assert prompts[-1].startswith("These are summaries")
+
+    def test_retry_only_redoes_failed_chunks(self):
+        """Test that chunk summaries survive a failed run."""
+        calls = []
+
+        def flaky(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 2:
+                raise Exception("Test error")
+            return completion("partial")
+
+        with patch('config.Config.SUMMARY_CHUNK_TOKENS', 40), \
+             patch('config.Config.SUMMARY_WORKERS', 1), \
+             patch('openai.chat.completions.create', side_effect=flaky):
+            assert summarize_text(self.LONG_TEXT) is None
+            first_run = len(calls)
+            assert summarize_text(self.LONG_TEXT) == "partial"
+
+        chunks = split_by_tokens(self.LONG_TEXT, 40)
+        assert first_run == len(chunks)
+        assert len(calls) - first_run == 2
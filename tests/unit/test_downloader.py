@@ -0,0 +1,94 @@
+"""Unit tests for the in-process yt-dlp backend."""
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+from website.downloader import YoutubeDLPool
+from website.routes import download_audio, probe_video
+
+@pytest.fixture
+def fake_yt_dlp():
+    """Replace the yt_dlp module with a fake whose YoutubeDL records calls."""
+    module = MagicMock()
+    instances = []
+
+    def make(params):
+        ydl = MagicMock()
+        ydl.params = dict(params)
+        ydl.extract_info.return_value = {"id": "dQw4w9WgXcQ", "title": "Pooled Title",
+                                         "duration": 212}
+        ydl.sanitize_info.side_effect = lambda info: info
+        instances.append(ydl)
+        return ydl
+
+    module.YoutubeDL.side_effect = make
+    with patch('website.downloader.yt_dlp', module):
+        yield module, instances
+
+class TestYoutubeDLPool:
+    """Test reuse of warm YoutubeDL instances."""
+
+    def test_instances_are_reused(self, fake_yt_dlp):
+        """Test that sequential calls share one instance."""
+        _, instances = fake_yt_dlp
+        pool = YoutubeDLPool(size=2)
+
+        pool.extract_info("dQw4w9WgXcQ")
+        pool.extract_info("dQw4w9WgXcQ")
+
+        assert len(instances) == 1
+        assert instances[0].extract_info.call_count == 2
+
+    def test_pool_is_bounded(self, fake_yt_dlp):
+        """Test that concurrent borrowers never create more than ``size`` instances."""
+        _, instances = fake_yt_dlp
+        pool = YoutubeDLPool(size=2)
+        barrier = threading.Barrier(2)
+
+        def borrow():
+            with pool.acquire():
+                barrier.wait(5)
+
+        threads = [threading.Thread(target=borrow) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        with pool.acquire():
+            pass
+
+        assert len(instances) == 2
+
+    def test_cookies_are_loaded_when_present(self, fake_yt_dlp, tmp_path):
+        """Test that the cookie file is passed to new instances."""
+        _, instances = fake_yt_dlp
+        cookies = tmp_path / "cookies.txt"
+        cookies.write_text("# Netscape HTTP Cookie File\n")
+
+        YoutubeDLPool(cookies_path=str(cookies)).extract_info("dQw4w9WgXcQ")
+
+        assert instances[0].params["cookiefile"] == str(cookies)
+
+    def test_download_sets_output_template(self, fake_yt_dlp):
+        """Test that downloads write next to the requested audio path."""
+        _, instances = fake_yt_dlp
+        YoutubeDLPool().download("dQw4w9WgXcQ", "/fake/path/video_audio_dQw4w9WgXcQ.mp3")
+
+        assert instances[0].params["outtmpl"] == {
+            "default": "/fake/path/video_audio_dQw4w9WgXcQ.%(ext)s"}
+        instances[0].extract_info.assert_called_once_with(
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ", download=True)
+
+class TestInProcessBackend:
+    """Test selecting the in-process backend from config."""
+
+    def test_download_audio_uses_pool(self, fake_yt_dlp, mock_subprocess_run):
+        """Test that no subprocess is spawned when the in-process backend is selected."""
+        with patch('config.Config.DOWNLOAD_BACKEND', 'inprocess'), \
+             patch('website.routes._ydl_pool', return_value=YoutubeDLPool()):
+            audio_file, title = download_audio("dQw4w9WgXcQ")
+            metadata = probe_video("dQw4w9WgXcQ")
+
+        assert audio_file.endswith("video_audio_dQw4w9WgXcQ.mp3")
+        assert title == "Pooled Title"
+        assert metadata["duration"] == 212
+        mock_subprocess_run.assert_not_called()
@@ -0,0 +1,94 @@
+"""Unit tests for the background job queue."""
+import json
+import threading
+import pytest
+from website.jobs import JobManager
+
+class TestJobManager:
+    """Test job execution, stage reporting and coalescing."""
+
+    def test_job_reports_stages_and_result(self):
+        """Test that a job records its stages and final result."""
+        seen = []
+
+        def runner(video_id, on_stage):
+            for stage in ('downloading', 'transcribing', 'summarizing'):
+                on_stage(stage)
+                seen.append(stage)
+            return {'video_id': video_id}
+
+        manager = JobManager(runner, max_workers=1)
+        job, created = manager.submit("test_video_id")
+
+        assert created
+        assert job.wait(5)
+        assert job.stage == 'done'
+        assert job.result == {'video_id': "test_video_id"}
+        assert seen == ['downloading', 'transcribing', 'summarizing']
+        assert manager.get(job.id) is job
+
+    def test_failed_job_keeps_error(self):
+        """Test that an exception in the runner marks the job as failed."""
+        def runner(video_id, on_stage):
+            raise RuntimeError("boom")
+
+        job, _ = JobManager(runner).submit("test_video_id")
+
+        assert job.wait(5)
+        assert job.stage == 'failed'
+        assert job.error == "boom"
+        assert job.status_code == 500
+
+    def test_duplicate_in_flight_submissions_are_coalesced(self):
+        """Test that the same video submitted twice while running shares one job."""
+        release = threading.Event()
+        calls = []
+
+        def runner(video_id, on_stage):
+            calls.append(video_id)
+            release.wait(5)
+            return {'video_id': video_id}
+
+        manager = JobManager(runner, max_workers=2)
+        first, created_first = manager.submit("test_video_id")
+        second, created_second = manager.submit("test_video_id")
+        release.set()
+
+        assert first.wait(5)
+        assert created_first and not created_second
+        assert first is second
+        assert calls == ["test_video_id"]
+
+        third, created_third = manager.submit("test_video_id")
+        assert third.wait(5)
+        assert created_third and third is not first
+
+class TestJobRoutes:
+    """Test the job status, result and event endpoints."""
+
+    def test_unknown_job(self, client):
+        """Test that an unknown job ID is a 404."""
+        assert client.get('/api/jobs/missing').status_code == 404
+        assert client.get('/api/jobs/missing/result').status_code == 404
+        assert client.get('/api/jobs/missing/events').status_code == 404
+
+    def test_job_status_and_events(self, client, mock_download_audio,
+                                   mock_transcribe_audio, mock_summarize_text):
+        """Test polling a job and streaming its stages as server-sent events."""
+        response = client.post(
+            '/api/process',
+            data=json.dumps({"youtube_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ"}),
+            content_type='application/json'
+        )
+        job = json.loads(response.data)
+        assert response.status_code == 202
+        assert response.headers['Location'] == job["status_url"]
+
+        events = client.get(job["events_url"])
+        body = events.get_data(as_text=True)
+        assert events.mimetype == 'text/event-stream'
+        assert "event: done" in body
+
+        status = json.loads(client.get(job["status_url"]).data)
+        assert status["stage"] == 'done'
+        assert status["video_id"] == "dQw4w9WgXcQ"
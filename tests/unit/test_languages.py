@@ -0,0 +1,211 @@
+"""Unit tests for summaries in several languages."""
+import asyncio
+import threading
+from unittest.mock import patch, AsyncMock
+import pytest
+from website.async_pipeline import run_pipeline_async
+from website.jobs import JobManager
+from website.languages import language_name, normalize_language, parse_languages
+from website.routes import run_pipeline
+
+SUPPORTED = 'en,fr,de,pt-BR'
+
+def translate(summary, language, **_):
+    """Stand in for translate_summary."""
+    return f"[{language}] {summary}"
+
+class TestParseLanguages:
+    """Test validating requested languages."""
+
+    def test_normalize_and_name(self):
+        """Test that codes are put in canonical case and named for prompts."""
+        assert normalize_language(' FR ') == 'fr'
+        assert normalize_language('pt-br') == 'pt-BR'
+        assert normalize_language('zh-hant') == 'zh-Hant'
+        assert normalize_language('french') is None
+        assert language_name('pt-BR') == 'Portuguese (BR)'
+        assert language_name('xx') == 'xx'
+
+    def test_parse(self):
+        """Test defaults, repeats and comma-separated strings."""
+        assert parse_languages(None, SUPPORTED, 3, 'en') == ('en',)
+        assert parse_languages('', SUPPORTED, 3, 'en') == ('en',)
+        assert parse_languages('fr, EN,fr', SUPPORTED, 3, 'en') == ('fr', 'en')
+        assert parse_languages(['pt-br'], SUPPORTED, 3, 'en') == ('pt-BR',)
+
+    def test_rejections(self):
+        """Test that unsupported languages, too many of them and wrong types are refused."""
+        for requested in (['es'], ['en; drop'], 'en,fr,de,pt-BR', {'en': 1}):
+            with pytest.raises(ValueError):
+                parse_languages(requested, SUPPORTED, 3, 'en')
+
+class TestTranslatedPipeline:
+    """Test that one summary is translated into each language and cached per language."""
+
+    def test_languages_fan_out(self, app, mock_download_audio, mock_transcribe_audio,
+                               mock_summarize_text):
+        """Test that the transcript is summarized once and translated in parallel."""
+        both_started, threads = threading.Barrier(2, timeout=5), set()
+
+        def parallel_translate(summary, language, **_):
+            threads.add(threading.get_ident())
+            both_started.wait()
+            return translate(summary, language)
+
+        with app.app_context(), \
+             patch('website.routes.translate_summary', side_effect=parallel_translate):
+            result = run_pipeline('dQw4w9WgXcQ', languages=('fr', 'de', 'en'))
+
+        assert result['summary'] == '[fr] This is a test summary.'
+        assert result['language'] == 'fr'
+        assert result['summaries'] == {'fr': '[fr] This is a test summary.',
+                                       'de': '[de] This is a test summary.',
+                                       'en': 'This is a test summary.'}
+        assert len(threads) == 2
+        mock_summarize_text.assert_called_once()
+        mock_download_audio.assert_called_once()
+
+    def test_new_language_costs_one_call(self, app, mock_download_audio, mock_transcribe_audio,
+                                         mock_summarize_text):
+        """Test that another language for a processed video is one completion, then cached."""
+        with app.app_context():
+            run_pipeline('dQw4w9WgXcQ')
+            with patch('website.routes._complete', return_value='Zusammenfassung') as complete:
+                result = run_pipeline('dQw4w9WgXcQ', languages=('de',))
+                again = run_pipeline('dQw4w9WgXcQ', languages=('de', 'en'))
+
+        assert result['summary'] == 'Zusammenfassung'
+        assert again['summaries'] == {'de': 'Zusammenfassung', 'en': 'This is a test summary.'}
+        complete.assert_called_once()
+        assert 'German' in complete.call_args.args[0]
+        mock_summarize_text.assert_called_once()
+        mock_download_audio.assert_called_once()
+
+    def test_failed_summary_is_not_translated(self, app, mock_download_audio,
+                                              mock_transcribe_audio, mock_summarize_text):
+        """Test that no translation is attempted without a summary to translate."""
+        mock_summarize_text.return_value = None
+        with app.app_context(), patch('website.routes.translate_summary') as translation:
+            result = run_pipeline('dQw4w9WgXcQ', languages=('fr',))
+        assert result['summaries'] == {'fr': None}
+        translation.assert_not_called()
+
+    def test_async_pipeline(self, app):
+        """Test that the asyncio pipeline translates the same way."""
+        with app.app_context(), \
+             patch('website.async_pipeline.download_audio_async',
+                   AsyncMock(return_value=('/fake/audio.mp3', 'Title'))), \
+             patch('website.async_pipeline.transcribe_audio_async',
+                   AsyncMock(return_value='Transcript')), \
+             patch('website.async_pipeline.summarize_text_async',
+                   AsyncMock(return_value='Summary')) as summarize, \
+             patch('website.async_pipeline._complete_async',
+                   AsyncMock(return_value='Résumé')) as complete:
+            result = asyncio.run(run_pipeline_async('dQw4w9WgXcQ', languages=('fr', 'en')))
+            again = asyncio.run(run_pipeline_async('dQw4w9WgXcQ', languages=('fr',)))
+
+        assert result['summaries'] == {'fr': 'Résumé', 'en': 'Summary'}
+        assert again['summary'] == 'Résumé'
+        assert summarize.await_count == complete.await_count == 1
+
+class TestLanguageRequests:
+    """Test asking for languages through the API and the form."""
+
+    def test_api_languages(self, client, mock_download_audio, mock_transcribe_audio,
+                           mock_summarize_text):
+        """Test that a job carries its languages and a cached video is answered at once."""
+        with patch('website.routes.translate_summary', side_effect=translate):
+            job = client.post('/api/process', json={"youtube_url": "https://youtu.be/dQw4w9WgXcQ",
+                                                    "languages": ["fr", "en"]}).get_json()
+            result = client.get(job['result_url'] + '?wait=5').get_json()
+            cached = client.post('/api/process', json={
+                "youtube_url": "https://youtu.be/dQw4w9WgXcQ", "language": "fr"})
+
+        assert job['languages'] == ['fr', 'en']
+        assert result['summary'] == '[fr] This is a test summary.'
+        assert cached.status_code == 200
+        assert cached.get_json()['summaries'] == {'fr': '[fr] This is a test summary.'}
+
+    def test_languages_share_transcription(self, client, mock_download_audio,
+                                           mock_transcribe_audio, mock_summarize_text):
+        """Test that concurrent jobs for one video in two languages transcribe it once."""
+        release = threading.Event()
+
+        def slow_download(*_, **__):
+            release.wait(5)
+            return '/fake/path/to/audio.mp3', 'Test Video Title'
+
+        mock_download_audio.side_effect = slow_download
+        with patch('website.routes.translate_summary', side_effect=translate):
+            english, french = [
+                client.post('/api/process', json={"youtube_url": "https://youtu.be/dQw4w9WgXcQ",
+                                                  "language": language}).get_json()
+                for language in ('en', 'fr')]
+            release.set()
+            results = [client.get(job['result_url'] + '?wait=5').get_json()
+                       for job in (english, french)]
+
+        assert english['job_id'] != french['job_id']
+        assert [result['summary'] for result in results] == [
+            'This is a test summary.', '[fr] This is a test summary.']
+        mock_transcribe_audio.assert_called_once()
+        mock_summarize_text.assert_called_once()
+
+    def test_failed_job_is_retried_once(self, client, mock_download_audio,
+                                        mock_transcribe_audio, mock_summarize_text):
+        """Test that jobs waiting on a failed job for the video transcribe it only once more."""
+        release, downloads = threading.Event(), []
+
+        def failing_first_download(*_, **__):
+            downloads.append(threading.get_ident())
+            if len(downloads) == 1:
+                release.wait(5)
+                return None, None
+            return '/fake/path/to/audio.mp3', 'Test Video Title'
+
+        mock_download_audio.side_effect = failing_first_download
+        with patch('website.routes.translate_summary', side_effect=translate):
+            jobs = [
+                client.post('/api/process', json={"youtube_url": "https://youtu.be/dQw4w9WgXcQ",
+                                                  "language": language}).get_json()
+                for language in ('en', 'fr', 'de')]
+            release.set()
+            responses = [client.get(job['result_url'] + '?wait=5') for job in jobs]
+
+        assert [response.status_code for response in responses] == [500, 200, 200]
+        assert [response.get_json()['summary'] for response in responses[1:]] == [
+            '[fr] This is a test summary.', '[de] This is a test summary.']
+        assert len(downloads) == 2
+        mock_transcribe_audio.assert_called_once()
+
+    def test_api_rejects_unsupported_language(self, client, mock_download_audio):
+        """Test that an unknown language is a 400 before any work is queued."""
+        response = client.post('/api/process', json={"youtube_url": "https://youtu.be/dQw4w9WgXcQ",
+                                                     "language": "tlh"})
+        assert response.status_code == 400
+        assert 'tlh' in response.get_json()['error']
+        mock_download_audio.assert_not_called()
+
+    def test_form_language(self, client, mock_download_audio, mock_transcribe_audio,
+                           mock_summarize_text):
+        """Test that the form offers the languages and shows the summary in the chosen one."""
+        assert b'<option value="fr">French</option>' in client.get('/').data
+        with patch('website.routes.translate_summary', side_effect=translate):
+            response = client.post('/process', data={
+                "youtube_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "language": "fr"})
+        assert b'Summary (French)' in response.data
+        assert b'[fr] This is a test summary.' in response.data
+
+    def test_jobs_are_shared_per_language(self):
+        """Test that only submissions for the same languages share a job."""
+        release = threading.Event()
+        manager = JobManager(lambda video_id, on_stage: release.wait(5), max_workers=3)
+        english, _ = manager.submit("video", languages=('en',))
+        french, created = manager.submit("video", languages=('fr',))
+        again, created_again = manager.submit("video", languages=('fr',))
+        release.set()
+
+        assert created and not created_again
+        assert french is again and french is not english
+        assert english.wait(5) and french.wait(5)
+        manager.shutdown()
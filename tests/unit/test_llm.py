@@ -0,0 +1,152 @@
+"""Unit tests for the shared OpenAI client layer."""
+import threading
+import time
+import pytest
+import openai
+from unittest.mock import patch, MagicMock
+from website.llm import (OpenAIClient, TokenBucket, DeadlineExceeded, parse_rate_limits,
+                         get_client)
+from website.routes import summarize_text
+
+def rate_limit_error(retry_after=None):
+    """Build the error the SDK raises for a 429 response."""
+    headers = {'retry-after': retry_after} if retry_after else {}
+    response = MagicMock(status_code=429, headers=headers)
+    return openai.RateLimitError("Rate limit reached", response=response, body=None)
+
+def bad_request_error():
+    """Build the error the SDK raises for a 400 response."""
+    response = MagicMock(status_code=400, headers={})
+    return openai.BadRequestError("Bad request", response=response, body=None)
+
+class TestTokenBucket:
+    """Test the per-minute token bucket."""
+
+    def test_burst_up_to_capacity_then_wait(self):
+        """Test that a full bucket admits a minute's worth, then asks callers to wait."""
+        bucket = TokenBucket(60)
+        assert all(bucket.reserve(1) == 0 for _ in range(60))
+        assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+
+    def test_zero_rate_is_unlimited(self):
+        """Test that a rate of 0 never throttles."""
+        bucket = TokenBucket(0)
+        assert bucket.reserve(10 ** 9) == 0
+
+    def test_oversized_request_is_clamped(self):
+        """Test that a request larger than the bucket is not delayed forever."""
+        bucket = TokenBucket(100)
+        assert bucket.reserve(1000) == 0
+
+class TestParseRateLimits:
+    """Test parsing the OPENAI_RATE_LIMITS setting."""
+
+    def test_parse(self):
+        """Test requests and tokens per minute per model."""
+        assert parse_rate_limits("whisper-1=50, gpt-3.5-turbo=3500:160000") == {
+            'whisper-1': (50, 0), 'gpt-3.5-turbo': (3500, 160000)}
+
+    def test_empty(self):
+        """Test that an empty setting means no limits."""
+        assert not parse_rate_limits('')
+
+class TestOpenAIClient:
+    """Test retries, deadlines and concurrency limits."""
+
+    def test_retries_transient_errors(self):
+        """Test that 429s are retried until the request succeeds."""
+        request = MagicMock(side_effect=[rate_limit_error('0'), rate_limit_error('0'), 'ok'])
+        client = OpenAIClient()
+        assert client.call('gpt-3.5-turbo', request) == 'ok'
+        assert request.call_count == 3
+        assert client.metrics()['retries'] == 2
+
+    def test_does_not_retry_client_errors(self):
+        """Test that a 400 is raised immediately."""
+        request = MagicMock(side_effect=bad_request_error())
+        client = OpenAIClient()
+        with pytest.raises(openai.BadRequestError):
+            client.call('gpt-3.5-turbo', request)
+        assert request.call_count == 1
+
+    def test_gives_up_after_max_retries(self):
+        """Test that the last error is raised once retries are exhausted."""
+        request = MagicMock(side_effect=rate_limit_error('0'))
+        client = OpenAIClient(max_retries=2)
+        with pytest.raises(openai.RateLimitError):
+            client.call('gpt-3.5-turbo', request)
+        assert request.call_count == 3
+
+    def test_deadline_stops_retries(self):
+        """Test that a backoff past the deadline raises DeadlineExceeded."""
+        request = MagicMock(side_effect=rate_limit_error('30'))
+        client = OpenAIClient(deadline=1)
+        with pytest.raises(DeadlineExceeded):
+            client.call('gpt-3.5-turbo', request)
+        assert request.call_count == 1
+
+    def test_timeout_is_capped_by_deadline(self):
+        """Test that each attempt's HTTP timeout never outlives the deadline."""
+        request = MagicMock(return_value='ok')
+        OpenAIClient(timeout=120).call('gpt-3.5-turbo', request, deadline=5)
+        assert request.call_args.kwargs['timeout'] <= 5
+
+    def test_rate_limit_past_deadline(self):
+        """Test that a call the rate limit would delay past its deadline is refused."""
+        client = OpenAIClient(rate_limits={'whisper-1': (1, 0)})
+        client.call('whisper-1', MagicMock(), deadline=5)
+        with pytest.raises(DeadlineExceeded):
+            client.call('whisper-1', MagicMock(), deadline=5)
+
+    def test_refused_calls_do_not_add_debt(self):
+        """Test that calls refused for their deadline leave the next admissible call's wait."""
+        client = OpenAIClient(rate_limits={'whisper-1': (1, 100)})
+        client.call('whisper-1', MagicMock(), tokens=10, deadline=5)
+        for _ in range(20):
+            with pytest.raises(DeadlineExceeded):
+                client.call('whisper-1', MagicMock(), tokens=10, deadline=5)
+
+        delay = client._throttle_delay('whisper-1', 10, time.monotonic() + 600) #pylint: disable=protected-access
+        assert delay == pytest.approx(60, abs=1)
+
+    def test_concurrency_is_limited(self):
+        """Test that no more than max_concurrency requests run at once."""
+        client = OpenAIClient(max_concurrency=2)
+        active, peak, lock = [0], [0], threading.Lock()
+        release = threading.Event()
+
+        def request(timeout): #pylint: disable=unused-argument
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            release.wait(0.05)
+            with lock:
+                active[0] -= 1
+
+        threads = [threading.Thread(target=client.call, args=('gpt-3.5-turbo', request))
+                   for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert peak[0] == 2
+
+class TestClientIntegration:
+    """Test that the pipeline's OpenAI calls go through the shared client."""
+
+    def test_summarize_retries_rate_limits(self, app):
+        """Test that a rate-limited summary is retried instead of failing."""
+        completion = MagicMock()
+        completion.choices[0].message.content = "Summary"
+        with app.app_context(), \
+             patch('openai.chat.completions.create',
+                   side_effect=[rate_limit_error('0'), completion]) as mock_create:
+            assert summarize_text("A short transcript.") == "Summary"
+
+        assert mock_create.call_count == 2
+        assert 'timeout' in mock_create.call_args.kwargs
+
+    def test_app_configures_client(self, app):
+        """Test that the app installs its configured client process-wide."""
+        assert app.extensions['openai_client'] is get_client()
+        assert openai.max_retries == 0
@@ -0,0 +1,112 @@
+"""Unit tests for timing spans and the /metrics endpoint."""
+import json
+import threading
+from unittest.mock import patch
+import pytest
+from website.metrics import Registry, timed, trace, span, carry_trace, record_download
+
+class TestRegistry:
+    """Test the Prometheus text rendering."""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that bucket counts include every smaller bucket."""
+        registry = Registry(prefix='test_')
+        histogram = registry.histogram('latency_seconds', 'Latency.', ('stage',), buckets=(1, 5))
+        for value in (0.5, 2, 10):
+            histogram.observe(value, stage='download')
+
+        lines = registry.render().splitlines()
+        assert '# TYPE test_latency_seconds histogram' in lines
+        assert 'test_latency_seconds_bucket{stage="download",le="1"} 1' in lines
+        assert 'test_latency_seconds_bucket{stage="download",le="5"} 2' in lines
+        assert 'test_latency_seconds_bucket{stage="download",le="+Inf"} 3' in lines
+        assert 'test_latency_seconds_sum{stage="download"} 12.5' in lines
+        assert 'test_latency_seconds_count{stage="download"} 3' in lines
+
+    def test_counter_and_gauges(self):
+        """Test counters and gauges read at scrape time."""
+        registry = Registry(prefix='test_')
+        counter = registry.counter('bytes_total', 'Bytes.')
+        counter.inc(10)
+        counter.inc(5)
+
+        lines = registry.render([('active', 'Active.', {(('stage', 'llm'),): 2})]).splitlines()
+        assert 'test_bytes_total 15' in lines
+        assert '# TYPE test_active gauge' in lines
+        assert 'test_active{stage="llm"} 2' in lines
+
+class TestSpans:
+    """Test that spans and totals are collected into the current trace."""
+
+    def test_timed_records_outcome(self):
+        """Test that a None result counts as an error span."""
+        @timed('lookup')
+        def lookup(value):
+            return value
+
+        with trace(kind='test') as event:
+            lookup('found')
+            lookup(None)
+
+        assert [(s['stage'], s['outcome']) for s in event['spans']] == [
+            ('lookup', 'ok'), ('lookup', 'error')]
+        assert event['duration_ms'] >= 0
+
+    def test_span_records_exceptions(self):
+        """Test that a span that raises is recorded as an error."""
+        with trace() as event:
+            with pytest.raises(ValueError):
+                with span('explode'):
+                    raise ValueError("boom")
+        assert event['spans'][0]['outcome'] == 'error'
+
+    def test_worker_threads_record_into_caller_trace(self):
+        """Test that carry_trace attributes work on other threads to the caller."""
+        with trace() as event:
+            thread = threading.Thread(target=carry_trace(record_download), args=(100, 60))
+            thread.start()
+            thread.join()
+        assert event['download_bytes'] == 100
+        assert event['audio_seconds'] == 60
+
+    def test_no_trace_outside_requests(self):
+        """Test that recording without a trace is a no-op."""
+        record_download(100)
+
+class TestMetricsRoute:
+    """Test the /metrics endpoint and the per-request log line."""
+
+    def test_metrics_endpoint(self, client, mock_download_audio, mock_transcribe_audio):
+        """Test that stage timings and request latencies are exported."""
+        with patch('website.routes._complete', return_value='Summary'):
+            response = client.post('/api/process', json={
+                "youtube_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ"})
+            client.get(response.get_json()["result_url"] + "?wait=5")
+
+        response = client.get('/metrics')
+        text = response.get_data(as_text=True)
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        assert ('youtube_analyzer_stage_duration_seconds_count'
+                '{stage="summarize",outcome="ok"}') in text
+        assert ('youtube_analyzer_http_request_duration_seconds_count'
+                '{endpoint="main.api_process_video"') in text
+        assert 'youtube_analyzer_stage_active{stage="download"} 0' in text
+
+    def test_request_log_line(self, client, capsys, mock_download_audio, mock_transcribe_audio):
+        """Test that each request and job prints one JSON line with its spans."""
+        client.post('/api/process', json={"youtube_url": "https://www.example.com/not-youtube"})
+        with patch('website.routes._complete', return_value='Summary'):
+            job = client.post('/api/process', json={
+                "youtube_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ"}).get_json()
+            client.get(job["result_url"] + "?wait=5")
+
+        lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()
+                 if line.startswith('{')]
+        assert lines[0]["kind"] == "request"
+        assert lines[0]["path"] == "/api/process"
+        assert lines[0]["status"] == 400
+        job_line, = [line for line in lines if line["kind"] == "job"]
+        assert job_line["video_id"] == "dQw4w9WgXcQ"
+        assert [(span["stage"], span["outcome"]) for span in job_line["spans"]] == [
+            ("summarize", "ok")]
@@ -1,7 +1,9 @@
 """Unit tests for functions in routes.py."""
 import os
 import pytest
+import json
 from website.routes import extract_video_id, get_video_title, download_audio, transcribe_audio, summarize_text
+from website.routes import download_audio_with_metadata, probe_video
 
 class TestVideoUrlExtraction:
     """Test the extraction of video IDs from URLs."""
@@ -69,6 +71,62 @@ class TestVideoOperations:
         assert title is None
         mock_subprocess_run.assert_called_once()
 
+    def test_download_audio_reads_metadata_from_same_run(self, mock_subprocess_run,
+                                                          mock_get_video_title):
+        """Test that title, duration and channel come from the download's JSON output."""
+        mock_subprocess_run.return_value.stdout = json.dumps({
+            "id": "dQw4w9WgXcQ", "title": "JSON Title", "duration": 212,
+            "channel": "Test Channel",
+            "formats": [{"format_id": "251", "ext": "webm", "acodec": "opus", "abr": 130},
+                        {"format_id": "137", "ext": "mp4", "acodec": "none"}]
+        }) + "\n"
+        
+        audio_file, metadata = download_audio_with_metadata("dQw4w9WgXcQ")
+        
+        assert audio_file.endswith("video_audio_dQw4w9WgXcQ.mp3")
+        assert metadata["title"] == "JSON Title"
+        assert metadata["duration"] == 212
+        assert metadata["channel"] == "Test Channel"
+        assert [f["format_id"] for f in metadata["formats"]] == ["251"]
+        mock_subprocess_run.assert_called_once()
+        mock_get_video_title.assert_not_called()
+        assert "--dump-json" in mock_subprocess_run.call_args.args[0]
+    
+    def test_download_audio_native_format(self, mock_subprocess_run, tmp_path):
+        """Test that native mode keeps the source stream instead of converting to mp3."""
+        downloaded = tmp_path / "video_audio_dQw4w9WgXcQ.webm"
+        downloaded.write_bytes(b"\0" * 100)
+        mock_subprocess_run.return_value.stdout = json.dumps({
+            "id": "dQw4w9WgXcQ", "title": "JSON Title",
+            "requested_downloads": [{"filepath": str(downloaded)}]
+        })
+        
+        with patch('config.Config.AUDIO_FORMAT', 'native'), \
+             patch('website.routes.STATIC_DIR', str(tmp_path)):
+            audio_file, title = download_audio("dQw4w9WgXcQ")
+        
+        command = mock_subprocess_run.call_args.args[0]
+        assert audio_file == str(downloaded)
+        assert title == "JSON Title"
+        assert "-x" not in command
+        assert "--audio-format" not in command
+        mock_subprocess_run.assert_called_once()
+    
+    def test_probe_video(self, mock_subprocess_run):
+        """Test fetching metadata without downloading."""
+        mock_subprocess_run.return_value.stdout = json.dumps(
+            {"id": "dQw4w9WgXcQ", "title": "JSON Title", "duration": 212})
+        
+        metadata = probe_video("dQw4w9WgXcQ")
+        
+        assert metadata["duration"] == 212
+        assert "--skip-download" in mock_subprocess_run.call_args.args[0]
+    
+    def test_probe_video_error(self, mock_subprocess_run):
+        """Test that a failing probe returns None."""
+        mock_subprocess_run.side_effect = Exception("Test error")
+        assert probe_video("dQw4w9WgXcQ") is None
+
 class TestTranscriptionOperations:
     """Test transcription and summarization operations."""
     
@@ -90,13 +148,31 @@ class TestTranscriptionOperations:
         
         assert result is None
     
-    def test_transcribe_audio_file_too_large(self):
-        """Test transcription when file is too large."""
+    def test_transcribe_audio_file_too_large(self, mock_open_file):
+        """Test that files over 25MB are transcribed in chunks and stitched."""
+        chunk_texts = {
+            "/tmp/chunk_0000.mp3": "the quick brown fox jumps",
+            "/tmp/chunk_0001.mp3": "fox jumps over the lazy dog",
+        }
         with patch('os.path.exists', return_value=True), \
-             patch('os.path.getsize', return_value=30 * 1024 * 1024):  # 30MB
+             patch('os.path.getsize', return_value=30 * 1024 * 1024), \
+             patch('website.routes.split_audio',
+                   return_value=[(path, 0.0) for path in chunk_texts]), \
+             patch('website.routes._whisper', side_effect=chunk_texts.get) as mock_whisper:
             result = transcribe_audio("/fake/path/audio.mp3")
         
-        assert "File too large" in result
+        assert result == "the quick brown fox jumps over the lazy dog"
+        assert mock_whisper.call_count == 2
+    
+    def test_transcribe_audio_chunk_failure(self, mock_open_file):
+        """Test that a failed chunk fails the whole transcription."""
+        with patch('os.path.exists', return_value=True), \
+             patch('os.path.getsize', return_value=30 * 1024 * 1024), \
+             patch('website.routes.split_audio', return_value=[("/tmp/chunk_0000.mp3", 0.0)]), \
+             patch('website.routes._whisper', side_effect=Exception("Test error")):
+            result = transcribe_audio("/fake/path/audio.mp3")
+        
+        assert result is None
     
     def test_summarize_text_success(self, mock_openai_summarize):
         """Test successful text summarization."""
@@ -0,0 +1,104 @@
+"""Unit tests for the managed audio scratch area."""
+import os
+import time
+import json
+import pytest
+from unittest.mock import patch
+from website.scratch import AudioScratch
+from website.routes import download_audio
+
+@pytest.fixture
+def scratch(tmp_path):
+    """Create a scratch area with no background sweeper and plenty of free disk."""
+    area = AudioScratch(str(tmp_path / "audio"), max_bytes=250, min_free_bytes=0,
+                        sweep_interval=0)
+    return area
+
+def add_audio(scratch, video_id, size, age=0):
+    """Write a fake downloaded audio file and its metadata."""
+    path = scratch.base_path(video_id) + ".mp3"
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    scratch.save_metadata(video_id, {"video_id": video_id, "title": f"Title {video_id}"})
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+class TestAudioScratch:
+    """Test reuse, eviction and metrics."""
+
+    def test_reuse_downloaded_audio(self, scratch):
+        """Test that a second job for the same video reuses the file and metadata."""
+        path = add_audio(scratch, "video_a", 100)
+
+        assert scratch.find("video_a") == (path, {"video_id": "video_a", "title": "Title video_a"})
+        assert scratch.find("video_b") is None
+        assert scratch.metrics()["reuse_hits"] == 1
+        assert scratch.metrics()["reuse_misses"] == 1
+
+    def test_least_recently_used_is_evicted(self, scratch):
+        """Test that eviction removes the oldest files until within budget."""
+        oldest = add_audio(scratch, "video_a", 100, age=300)
+        add_audio(scratch, "video_b", 100, age=200)
+        add_audio(scratch, "video_c", 100, age=100)
+
+        assert scratch.sweep() == 100
+        assert not os.path.exists(oldest)
+        assert scratch.find("video_a") is None
+        metrics = scratch.metrics()
+        assert metrics["bytes_held"] == 200
+        assert metrics["bytes_evicted"] == 100
+        assert metrics["files_evicted"] == 1
+
+    def test_reuse_refreshes_recency(self, scratch):
+        """Test that reusing a file protects it from the next eviction."""
+        add_audio(scratch, "video_a", 100, age=300)
+        newer = add_audio(scratch, "video_b", 100, age=200)
+        add_audio(scratch, "video_c", 100, age=100)
+        scratch.find("video_a")
+
+        scratch.sweep()
+
+        assert scratch.find("video_a") is not None
+        assert not os.path.exists(newer)
+
+    def test_pinned_audio_is_not_evicted(self, scratch):
+        """Test that audio being transcribed survives a sweep."""
+        pinned = add_audio(scratch, "video_a", 200, age=300)
+        add_audio(scratch, "video_b", 100, age=100)
+
+        with scratch.pin("video_a"):
+            scratch.sweep()
+            assert os.path.exists(pinned)
+
+    def test_low_disk_space_shrinks_budget(self, scratch):
+        """Test that the budget leaves the configured free space on disk."""
+        add_audio(scratch, "video_a", 100, age=200)
+        add_audio(scratch, "video_b", 100, age=100)
+        scratch.min_free_bytes = 1000
+
+        with patch('website.scratch.shutil.disk_usage') as mock_usage:
+            mock_usage.return_value.free = 900
+            assert scratch.budget() == 100
+            scratch.sweep()
+
+        assert scratch.find("video_a") is None
+        assert scratch.find("video_b") is not None
+
+class TestAudioReuseInPipeline:
+    """Test that the download step reuses audio from the scratch area."""
+
+    def test_download_reuses_scratch_audio(self, app, mock_subprocess_run):
+        """Test that no yt-dlp process runs when the audio is already held."""
+        with app.app_context():
+            path = add_audio(app.extensions['audio_scratch'], "dQw4w9WgXcQ", 10)
+            audio_file, title = download_audio("dQw4w9WgXcQ")
+
+        assert audio_file == path
+        assert title == "Title dQw4w9WgXcQ"
+        mock_subprocess_run.assert_not_called()
+
+    def test_audio_stats_route(self, client):
+        """Test that scratch metrics are exposed over HTTP."""
+        data = json.loads(client.get('/api/stats/audio').data)
+        assert {"bytes_held", "bytes_evicted", "reuse_hits"} <= set(data)
@@ -0,0 +1,110 @@
+"""Unit tests for the transcript search index."""
+from unittest.mock import patch
+import pytest
+from website.search import SearchIndex, match_expression, query_terms
+from website.segments import Transcript
+from website.routes import run_pipeline
+
+@pytest.fixture
+def index(tmp_path):
+    """A search index holding a few transcripts."""
+    search_index = SearchIndex(str(tmp_path / "search.sqlite3"))
+    search_index.write([
+        ("vid00000001", "Learning Python", "Today we write Python generators and decorators."),
+        ("vid00000002", "Cooking pasta", "Boil the water, salt it, and cook the pasta."),
+        ("vid00000003", "Snakes", "The python is a large snake. Pythons are not venomous.")
+    ])
+    return search_index
+
+class TestQueryParsing:
+    """Test turning user input into an FTS5 query."""
+
+    def test_terms(self):
+        """Test that punctuation and FTS5 operators are dropped."""
+        assert query_terms('python AND "snake"*') == ['python', 'AND', 'snake']
+        assert not query_terms('  -- ')
+
+    def test_match_expression(self):
+        """Test that every term is quoted and the last one can be a prefix."""
+        assert match_expression(['python', 'gen']) == '"python" "gen"'
+        assert match_expression(['python', 'gen'], prefix=True) == '"python" "gen"*'
+
+class TestSearchIndex:
+    """Test indexing and ranking."""
+
+    def test_ranking_and_snippet(self, index):
+        """Test that title matches rank first and snippets mark the match."""
+        results = index.search(['python'])
+        assert [r['video_id'] for r in results] == ['vid00000001', 'vid00000003']
+        assert '**Python**' in results[0]['snippet']
+
+    def test_all_terms_required(self, index):
+        """Test that a video must contain every word."""
+        assert [r['video_id'] for r in index.search(['python', 'snake'])] == ['vid00000003']
+        assert not index.search(['python', 'pasta'])
+
+    def test_prefix_and_stemming(self, index):
+        """Test search-as-you-type prefixes and word stems."""
+        assert not index.search(['gen'])
+        assert [r['video_id'] for r in index.search(['gen'], prefix=True)] == ['vid00000001']
+        assert [r['video_id'] for r in index.search(['boiling'])] == ['vid00000002']
+
+    def test_reindexing_replaces(self, index):
+        """Test that a re-transcribed video's old text is no longer found."""
+        index.write([("vid00000002", "Cooking rice", "Rinse the rice first.")])
+        assert not index.search(['pasta'])
+        assert [r['title'] for r in index.search(['rice'])] == ['Cooking rice']
+        assert index.count() == 3
+
+    def test_recent_bounds_ranking(self, tmp_path):
+        """Test that every match is ranked unless only recent candidates are asked for."""
+        search_index = SearchIndex(str(tmp_path / "search.sqlite3"), candidates=2)
+        search_index.write([("vid00000001", "Python", "Python, python and more python.")])
+        search_index.write([(f"vid0000000{i}", "Talk", f"A word on python number {i}.")
+                            for i in range(2, 5)])
+        assert [r['video_id'] for r in search_index.search(['python'], limit=1)] == ['vid00000001']
+        recent = search_index.search(['python'], recent=True)
+        assert [r['video_id'] for r in recent] == ['vid00000004', 'vid00000003']
+
+        search_index.write([("vid00000001", "Python", "Python, python and more python.")])
+        recent = search_index.search(['python'], limit=1, recent=True)
+        assert [r['video_id'] for r in recent] == ['vid00000001']
+
+    def test_background_indexing(self, tmp_path):
+        """Test that queued transcripts are written by the indexer thread."""
+        search_index = SearchIndex(str(tmp_path / "search.sqlite3"), batch_size=2)
+        for i in range(5):
+            search_index.add(f"vid{i:08d}", "Title", f"transcript number {i}")
+        search_index.flush()
+        assert search_index.count() == 5
+
+class TestSearchApi:
+    """Test the /api/search endpoint."""
+
+    def test_pipeline_indexes_and_search_finds(self, app, client):
+        """Test that a processed video is indexed and returned with timestamp hits."""
+        transcript = Transcript("Welcome. Today we discuss quantum computing.",
+                                [(0.0, 2.0, "Welcome."),
+                                 (2.0, 6.0, "Today we discuss quantum computing.")])
+        with app.app_context(), \
+             patch('website.routes.download_audio', return_value=('/fake/audio.mp3', 'Qubits')), \
+             patch('website.routes.transcribe_audio', return_value=transcript), \
+             patch('website.routes.summarize_text', return_value='Summary'):
+            run_pipeline('dQw4w9WgXcQ')
+        app.extensions['search_index'].flush()
+
+        response = client.get('/api/search?q=quantum')
+        assert response.status_code == 200
+        result, = response.get_json()['results']
+        assert result['video_id'] == 'dQw4w9WgXcQ'
+        assert result['title'] == 'Qubits'
+        assert result['hits'] == [{'start': 2.0, 'text': "Today we discuss quantum computing."}]
+
+    def test_empty_query(self, client):
+        """Test that a query without words is rejected."""
+        assert client.get('/api/search?q=%20').status_code == 400
+
+    def test_disabled(self, app, client):
+        """Test the response when search is unavailable."""
+        app.extensions['search_index'] = None
+        assert client.get('/api/search?q=python').status_code == 503
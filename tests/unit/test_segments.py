@@ -0,0 +1,167 @@
+"""Unit tests for timed transcript segments."""
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+import pytest
+from website.segments import SegmentIndex, Transcript, encode, segments_of, shift_segments
+from website.routes import transcribe_audio, run_pipeline
+from website.storage import SEGMENTS, TIMESTAMPED_TRANSCRIPT
+
+SEGMENTS_LIST = [(0.0, 4.5, "Welcome to the show."),
+                 (4.5, 9.0, "Today we talk about café culture."),
+                 (9.0, 15.0, "Coffee, coffee and more COFFEE."),
+                 (20.0, 25.0, "Thanks for watching.")]
+
+@pytest.fixture
+def index(tmp_path):
+    """A segments file holding SEGMENTS_LIST."""
+    path = tmp_path / "segments.bin"
+    path.write_bytes(encode(SEGMENTS_LIST))
+    return SegmentIndex(str(path))
+
+class TestSegmentIndex:
+    """Test the columnar segments file."""
+
+    def test_page(self, index):
+        """Test paging by segment number, including past the end."""
+        assert len(index) == 4
+        page = index.page(1, 2)
+        assert [s['index'] for s in page] == [1, 2]
+        assert page[0] == {'index': 1, 'start': 4.5, 'end': 9.0,
+                           'text': "Today we talk about café culture."}
+        assert not index.page(10, 5)
+
+    def test_between(self, index):
+        """Test that a time window returns the segments overlapping it."""
+        assert [s['index'] for s in index.between(5.0, 10.0, 10)] == [1, 2]
+        assert [s['index'] for s in index.between(9.0, 9.5, 10)] == [2]
+        assert [s['index'] for s in index.between(16.0, 18.0, 10)] == []
+        assert [s['index'] for s in index.between(0.0, None, 2)] == [0, 1]
+
+    def test_search(self, index):
+        """Test that search ignores case and reports each segment once."""
+        matches = index.search("coffee", 10)
+        assert [(s['index'], s['start']) for s in matches] == [(2, 9.0)]
+        assert [s['index'] for s in index.search("the", 10)] == [0]
+        assert [s['index'] for s in index.search("café", 10)] == [1]
+        assert not index.search("tea", 10)
+
+    def test_search_does_not_span_segments(self, index):
+        """Test that a match cannot join the end of one segment to the next."""
+        assert not index.search("show.Today", 10)
+
+    def test_rejects_other_files(self, tmp_path):
+        """Test that a file in another format is refused."""
+        path = tmp_path / "transcript.txt"
+        path.write_bytes(b"not a segments file at all")
+        with pytest.raises(ValueError):
+            SegmentIndex(str(path))
+
+    def test_empty(self, tmp_path):
+        """Test a transcript without segments."""
+        path = tmp_path / "segments.bin"
+        path.write_bytes(encode([]))
+        assert not SegmentIndex(str(path)).search("anything", 10)
+
+class TestSegmentHelpers:
+    """Test extracting and combining segments."""
+
+    def test_segments_of_api_response(self):
+        """Test reading the segments of a verbose_json response."""
+        response = SimpleNamespace(text="Hi there", segments=[
+            SimpleNamespace(start=0, end=1.5, text=" Hi "),
+            {'start': 1.5, 'end': 2.0, 'text': "there"}])
+        assert segments_of(response) == [(0.0, 1.5, "Hi"), (1.5, 2.0, "there")]
+
+    def test_segments_of_plain_response(self):
+        """Test that a response without timing has no segments."""
+        assert not segments_of(MagicMock(text="Hi there"))
+
+    def test_shift_segments_drops_overlap(self):
+        """Test that chunks are moved onto one timeline and the overlap is kept once."""
+        parts = [(0.0, [(0.0, 5.0, "a"), (5.0, 10.0, "b")]),
+                 (8.0, [(0.0, 2.0, "b"), (2.0, 6.0, "c")])]
+        assert shift_segments(parts) == [(0.0, 5.0, "a"), (5.0, 10.0, "b"), (10.0, 14.0, "c")]
+
+class TestTimedTranscription:
+    """Test that transcription keeps Whisper's segment timing."""
+
+    def test_whisper_requests_verbose_json(self, tmp_path, mock_openai_transcribe):
+        """Test that the API is asked for segments and they are carried with the text."""
+        audio = tmp_path / "audio.mp3"
+        audio.write_bytes(b"\0" * 100)
+        mock_openai_transcribe.return_value = SimpleNamespace(
+            text="Hello world", segments=[SimpleNamespace(start=0.0, end=1.0, text="Hello world")])
+
+        transcript = transcribe_audio(str(audio))
+
+        assert transcript == "Hello world"
+        assert transcript.segments == [(0.0, 1.0, "Hello world")]
+        assert mock_openai_transcribe.call_args.kwargs['response_format'] == 'verbose_json'
+
+    def test_chunk_segments_are_offset(self):
+        """Test that each chunk's segments are moved by the chunk's start time."""
+        chunks = {"/tmp/chunk_0000.mp3": Transcript("one", [(0.0, 3.0, "one")]),
+                  "/tmp/chunk_0001.mp3": Transcript("two", [(1.0, 2.0, "two")])}
+        with patch('os.path.exists', return_value=True), \
+             patch('os.path.getsize', return_value=30 * 1024 * 1024), \
+             patch('website.routes.split_audio',
+                   return_value=[("/tmp/chunk_0000.mp3", 0.0), ("/tmp/chunk_0001.mp3", 600.0)]), \
+             patch('website.routes._whisper', side_effect=chunks.get):
+            transcript = transcribe_audio("/fake/path/audio.mp3")
+
+        assert transcript == "one two"
+        assert transcript.segments == [(0.0, 3.0, "one"), (601.0, 602.0, "two")]
+
+class TestSegmentsApi:
+    """Test storing segments and serving them."""
+
+    def run(self, app, transcript):
+        """Run the pipeline with ``transcript`` as the transcription result."""
+        with app.app_context(), \
+             patch('website.routes.download_audio', return_value=('/fake/audio.mp3', 'Title')), \
+             patch('website.routes.transcribe_audio', return_value=transcript), \
+             patch('website.routes.summarize_text', return_value='Summary'):
+            return run_pipeline('dQw4w9WgXcQ')
+
+    def test_pipeline_stores_segments(self, app):
+        """Test that segments and timestamped text are written, and the result is plain text."""
+        result = self.run(app, Transcript("Welcome to the show.", SEGMENTS_LIST[:1]))
+        store = app.extensions['artifact_store']
+
+        assert type(result['transcript']) is str
+        assert store.exists('dQw4w9WgXcQ', SEGMENTS)
+        assert store.read_text('dQw4w9WgXcQ', TIMESTAMPED_TRANSCRIPT) == \
+            "[00:00:00] Welcome to the show."
+
+    def test_range_and_paging(self, app, client):
+        """Test fetching segments by time window and by page."""
+        self.run(app, Transcript("text", SEGMENTS_LIST))
+
+        response = client.get('/api/videos/dQw4w9WgXcQ/segments?start=5&end=10')
+        assert response.status_code == 200
+        assert [s['index'] for s in response.get_json()['segments']] == [1, 2]
+
+        page = client.get('/api/videos/dQw4w9WgXcQ/segments?offset=0&limit=3').get_json()
+        assert page['total'] == 4
+        assert page['next_offset'] == 3
+        last = client.get('/api/videos/dQw4w9WgXcQ/segments?offset=3').get_json()
+        assert last['next_offset'] is None
+
+    def test_limit_is_capped(self, app, client):
+        """Test that a page never exceeds SEGMENTS_PAGE_SIZE."""
+        app.config['SEGMENTS_PAGE_SIZE'] = 2
+        self.run(app, Transcript("text", SEGMENTS_LIST))
+        page = client.get('/api/videos/dQw4w9WgXcQ/segments?limit=100').get_json()
+        assert len(page['segments']) == 2
+
+    def test_search(self, app, client):
+        """Test searching a transcript for timestamps to jump to."""
+        self.run(app, Transcript("text", SEGMENTS_LIST))
+        response = client.get('/api/videos/dQw4w9WgXcQ/segments/search?q=thanks')
+        assert [s['start'] for s in response.get_json()['segments']] == [20.0]
+        assert client.get('/api/videos/dQw4w9WgXcQ/segments/search').status_code == 400
+
+    def test_missing_segments(self, client):
+        """Test videos without segments and invalid IDs."""
+        assert client.get('/api/videos/dQw4w9WgXcQ/segments').status_code == 404
+        assert client.get('/api/videos/bad.id/segments/search?q=x').status_code == 404
@@ -0,0 +1,204 @@
+"""Unit tests for the state shared between app instances."""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+import pytest
+from website import create_app
+from website.routes import run_pipeline
+from website.segments import Transcript
+from website.storage import SEGMENTS
+from website.shared import (MemoryBackend, Coordinator, connect, encode_result, decode_result,
+                            redis)
+
+@pytest.fixture
+def backend():
+    """A fresh in-process backend."""
+    return MemoryBackend()
+
+def make_app(tmp_path, name, url):
+    """Create one app instance, with its own data directory, on a shared backend."""
+    return create_app({'DATA_DIR': str(tmp_path / name), 'CAPTIONS_MODE': 'off',
+                       'ADMISSION_ENABLED': False, 'SHARED_BACKEND_URL': url})
+
+class TestMemoryBackend:
+    """Test the in-process stand-in for Redis."""
+
+    def test_leases(self, backend):
+        """Test that a lease is exclusive and only its holder may renew or release it."""
+        assert backend.acquire('lease', 'a', 10)
+        assert not backend.acquire('lease', 'b', 10)
+        assert not backend.renew('lease', 'b', 10)
+        assert not backend.release('lease', 'b')
+        assert backend.renew('lease', 'a', 10)
+        assert backend.release('lease', 'a')
+        assert backend.acquire('lease', 'b', 10)
+
+    def test_expiry(self, backend):
+        """Test that keys and leases lapse after their TTL."""
+        backend.set('key', 'value', ttl=0.05)
+        assert backend.acquire('lease', 'a', 0.05)
+        time.sleep(0.1)
+        assert backend.get('key') is None
+        assert backend.acquire('lease', 'b', 10)
+
+    def test_subscribe(self, backend):
+        """Test that subscribers wake on publish and time out otherwise."""
+        subscription = backend.subscribe('events')
+        assert subscription.wait(0.01) is None
+        threading.Timer(0.05, backend.publish, ('events', 'done')).start()
+        assert subscription.wait(5) == 'done'
+
+    def test_connect(self):
+        """Test that memory URLs name one backend and unknown schemes are rejected."""
+        assert connect('memory://test-connect') is connect('memory://test-connect')
+        assert connect('memory://test-connect') is not connect('memory://other')
+        with pytest.raises(ValueError):
+            connect('memcached://localhost')
+        if redis is None:
+            with pytest.raises(RuntimeError):
+                connect('redis://localhost:6379/0')
+
+class TestCoordinator:
+    """Test claiming videos across instances."""
+
+    def test_result_round_trip(self):
+        """Test that shared results keep the transcript's segments."""
+        transcript = Transcript("Hello.", [(0.0, 1.0, "Hello.")])
+        title, decoded, source, summary = decode_result(
+            encode_result("Title", transcript, 'whisper', "Summary"))
+        assert (title, decoded, source, summary) == ("Title", "Hello.", 'whisper', "Summary")
+        assert decoded.segments == [(0.0, 1.0, "Hello.")]
+
+    def test_waiter_gets_holders_result(self, backend):
+        """Test that a second claim waits for the first and receives its result."""
+        first, second = Coordinator(backend), Coordinator(backend)
+        result, lease = first.claim('video')
+        assert result is None and lease is not None
+
+        def finish():
+            time.sleep(0.05)
+            lease.publish("Title", "Transcript", 'whisper', "Summary")
+            lease.release()
+        threading.Thread(target=finish).start()
+
+        result, second_lease = second.claim('video')
+        assert second_lease is None
+        assert result == ("Title", "Transcript", 'whisper', "Summary")
+
+    def test_result_published_before_acquire(self, backend):
+        """Test that a result published between the check and the acquire is used."""
+        first, second = Coordinator(backend), Coordinator(backend)
+        checks = []
+
+        def racing_result(key):
+            found = Coordinator.result(second, key)
+            if not checks:
+                # Another instance finishes after the check but before the acquire.
+                _, lease = first.claim(key)
+                lease.publish("Title", "Transcript", 'whisper', "Summary")
+                lease.release()
+            checks.append(found)
+            return found
+
+        with patch.object(second, 'result', side_effect=racing_result):
+            result, lease = second.claim('video')
+
+        assert lease is None
+        assert result == ("Title", "Transcript", 'whisper', "Summary")
+        assert checks[0] is None
+        assert backend.acquire(first.lease_key('video'), 'next', 10)
+
+    def test_failed_holder_hands_over(self, backend):
+        """Test that a waiter takes the lease when the holder gives up without a result."""
+        first, second = Coordinator(backend), Coordinator(backend)
+        _, lease = first.claim('video')
+        threading.Timer(0.05, lease.release).start()
+
+        result, second_lease = second.claim('video')
+        assert result is None and second_lease is not None
+        second_lease.release()
+
+    def test_lapsed_lease_is_taken_over(self, backend):
+        """Test that a lease that is no longer renewed lapses after its TTL."""
+        coordinator = Coordinator(backend, lease_ttl=0.1)
+        assert backend.acquire(coordinator.lease_key('video'), 'dead-instance', 0.1)
+
+        started = time.monotonic()
+        result, lease = coordinator.claim('video')
+        assert result is None and lease is not None
+        assert time.monotonic() - started < 2
+        lease.release()
+
+    def test_async_wait_holds_no_thread(self, backend):
+        """Test that coroutines waiting on a lease leave the loop's thread pool usable."""
+        holder, waiter = Coordinator(backend), Coordinator(backend)
+        _, lease = holder.claim('video')
+
+        async def main():
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=1))
+            waits = [asyncio.create_task(waiter.aclaim('video', poll_interval=0.01))
+                     for _ in range(3)]
+            await asyncio.sleep(0.05)
+            assert await asyncio.wait_for(asyncio.to_thread(lambda: 'free'), 1) == 'free'
+            assert not any(wait.done() for wait in waits)
+            lease.publish("Title", "Transcript", 'whisper', "Summary")
+            lease.release()
+            return await asyncio.gather(*waits)
+
+        for result, waiter_lease in asyncio.run(main()):
+            assert waiter_lease is None
+            assert result == ("Title", "Transcript", 'whisper', "Summary")
+
+    def test_backend_failure_processes_locally(self):
+        """Test that an unreachable backend does not stop processing."""
+        broken = MagicMock()
+        broken.subscribe.side_effect = ConnectionError("refused")
+        assert Coordinator(broken).claim('video') == (None, None)
+
+class TestSharedPipeline:
+    """Test the pipeline on two instances sharing one backend."""
+
+    def test_only_one_instance_processes(self, tmp_path):
+        """Test that a concurrent run on another instance waits and reuses the result."""
+        url = f"memory://{tmp_path}"
+        first, second = make_app(tmp_path, 'one', url), make_app(tmp_path, 'two', url)
+        transcribing, release = threading.Event(), threading.Event()
+
+        def transcribe(audio_file, **_):
+            transcribing.set()
+            release.wait(5)
+            return Transcript("Shared transcript.", [(0.0, 2.0, "Shared transcript.")])
+
+        results = {}
+
+        def run(app, name):
+            with app.app_context():
+                results[name] = run_pipeline('dQw4w9WgXcQ')
+
+        with patch('website.routes.download_audio',
+                   return_value=('/fake/audio.mp3', 'Title')) as download, \
+             patch('website.routes.transcribe_audio', side_effect=transcribe), \
+             patch('website.routes.summarize_text', return_value='Summary') as summarize:
+            holder = threading.Thread(target=run, args=(first, 'one'))
+            holder.start()
+            assert transcribing.wait(5)
+            waiter = threading.Thread(target=run, args=(second, 'two'))
+            waiter.start()
+            time.sleep(0.1)
+            release.set()
+            holder.join(5)
+            waiter.join(5)
+
+        assert download.call_count == summarize.call_count == 1
+        assert results['one'] == results['two']
+        assert results['two']['summary'] == 'Summary'
+        with second.app_context():
+            cached = second.extensions['result_cache'].get_video('dQw4w9WgXcQ', 'whisper-1')
+        assert cached['transcript'] == "Shared transcript."
+        assert second.extensions['artifact_store'].exists('dQw4w9WgXcQ', SEGMENTS)
+
+    def test_disabled_by_default(self, app):
+        """Test that instances are independent without a SHARED_BACKEND_URL."""
+        assert app.extensions['coordinator'] is None
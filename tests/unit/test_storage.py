@@ -0,0 +1,187 @@
+"""Unit tests for the per-video artifact store."""
+import gzip
+import os
+import threading
+import pytest
+from unittest.mock import patch
+from website.storage import ArtifactStore, BlobStore, TRANSCRIPT, SEGMENTS, zstandard
+
+CODECS = ['gzip', pytest.param('zstd', marks=pytest.mark.skipif(
+    zstandard is None, reason="zstandard is not installed"))]
+
+@pytest.fixture
+def store(tmp_path):
+    """Create an artifact store in a temporary directory."""
+    return ArtifactStore(str(tmp_path))
+
+class TestArtifactStore:
+    """Test per-video paths and atomic writes."""
+
+    def test_artifacts_are_isolated_per_video(self, store):
+        """Test that two videos never share a transcript file."""
+        store.write_text("video_a", "transcript.txt", "Transcript A")
+        store.write_text("video_b", "transcript.txt", "Transcript B")
+
+        assert store.read_text("video_a", "transcript.txt") == "Transcript A"
+        assert store.read_text("video_b", "transcript.txt") == "Transcript B"
+
+    def test_missing_artifact(self, store):
+        """Test reading an artifact that was never written."""
+        assert store.read_text("video_a", "transcript.txt") is None
+        assert not store.exists("video_a", "transcript.txt")
+
+    def test_unsafe_video_ids_are_rejected(self, store):
+        """Test that path traversal through the video ID is refused."""
+        for video_id in ("../etc", "a/b", "", None):
+            with pytest.raises(ValueError):
+                store.path(video_id, "transcript.txt")
+
+    def test_failed_write_leaves_previous_file(self, store, tmp_path):
+        """Test that an interrupted write neither truncates the old file nor leaks temp files."""
+        store.write_text("video_a", "transcript.txt", "Old transcript")
+
+        with patch('website.storage.os.replace', side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                store.write_text("video_a", "transcript.txt", "New transcript")
+
+        assert store.read_text("video_a", "transcript.txt") == "Old transcript"
+        assert os.listdir(tmp_path / "video_a") == ["transcript.txt"]
+
+    def test_concurrent_writes_are_never_partial(self, store):
+        """Test that concurrent writers leave one complete version."""
+        texts = [str(i) * 10000 for i in range(8)]
+        threads = [threading.Thread(target=store.write_text, args=("video_a", "transcript.txt", t))
+                   for t in texts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert store.read_text("video_a", "transcript.txt") in texts
+
+@pytest.fixture(params=CODECS)
+def compressed_store(request, tmp_path):
+    """An artifact store keeping transcripts in a BlobStore of each codec."""
+    return ArtifactStore(str(tmp_path / "artifacts"),
+                         BlobStore(str(tmp_path / "blobs"), request.param))
+
+class TestCompressedArtifacts:
+    """Test transcripts kept as compressed, content-addressed blobs."""
+
+    def test_round_trip_and_dedupe(self, compressed_store, tmp_path):
+        """Test that identical transcripts share one compressed blob."""
+        text = "the same words again and again " * 200
+        compressed_store.write_text("video_a", TRANSCRIPT, text)
+        compressed_store.write_text("video_b", TRANSCRIPT, text)
+        compressed_store.write_text("video_c", TRANSCRIPT, "Something else")
+
+        assert compressed_store.read_text("video_a", TRANSCRIPT) == text
+        assert compressed_store.read_text("video_c", TRANSCRIPT) == "Something else"
+        assert compressed_store.stored_blob("video_a", TRANSCRIPT) == \
+            compressed_store.stored_blob("video_b", TRANSCRIPT)
+        blob = compressed_store.stored_blob("video_a", TRANSCRIPT)
+        assert os.path.getsize(blob.path) < len(text) / 10
+        assert sorted(os.listdir(tmp_path / "artifacts" / "video_a")) == ["transcript.txt.ref"]
+
+    def test_other_artifacts_stay_plain(self, compressed_store):
+        """Test that artifacts read by offset, like segments, are not compressed."""
+        compressed_store.write_bytes("video_a", SEGMENTS, b"columns")
+        assert compressed_store.stored_blob("video_a", SEGMENTS) is None
+        with open(compressed_store.path("video_a", SEGMENTS), 'rb') as f:
+            assert f.read() == b"columns"
+
+    def test_plain_files_are_still_read(self, tmp_path, compressed_store):
+        """Test that transcripts written before compression are read, then replaced."""
+        ArtifactStore(str(tmp_path / "artifacts")).write_text("video_a", TRANSCRIPT, "Legacy")
+        assert compressed_store.exists("video_a", TRANSCRIPT)
+        assert compressed_store.read_text("video_a", TRANSCRIPT) == "Legacy"
+
+        compressed_store.write_text("video_a", TRANSCRIPT, "Rewritten")
+        assert compressed_store.read_text("video_a", TRANSCRIPT) == "Rewritten"
+        assert not os.path.exists(compressed_store.path("video_a", TRANSCRIPT))
+
+    @pytest.mark.skipif(zstandard is None, reason="zstandard is not installed")
+    def test_dictionary(self, tmp_path):
+        """Test that a trained dictionary is used for new blobs and older ones stay readable."""
+        store = ArtifactStore(str(tmp_path / "artifacts"), BlobStore(str(tmp_path / "blobs")))
+        words = ["video", "today", "we", "talk", "about", "the", "music", "channel", "subscribe"]
+        for number in range(200):
+            text = " ".join(words[(number + i) % len(words)] for i in range(60)) + f" {number}"
+            store.write_text(f"video_{number}", TRANSCRIPT, text)
+
+        dict_id = store.blobs.train_dictionary(store.sample(TRANSCRIPT, 200), size=4096)
+        store.write_text("video_new", TRANSCRIPT, "today we talk about the channel again")
+
+        assert store.blobs.current_dictionary() == dict_id
+        assert store.stored_blob("video_new", TRANSCRIPT).encoding is None
+        assert store.read_text("video_new", TRANSCRIPT) == "today we talk about the channel again"
+        assert store.stored_blob("video_0", TRANSCRIPT).encoding == 'zstd'
+        assert store.read_text("video_0", TRANSCRIPT).endswith(" 0")
+
+    def test_zstd_falls_back_to_gzip(self, tmp_path):
+        """Test that without zstandard new blobs are gzip."""
+        with patch('website.storage.zstandard', None):
+            assert BlobStore(str(tmp_path)).codec == 'gzip'
+
+    def test_collect_garbage(self, compressed_store):
+        """Test that only blobs no artifact refers to are deleted, once old enough."""
+        compressed_store.write_text("video_a", TRANSCRIPT, "Shared")
+        compressed_store.write_text("video_b", TRANSCRIPT, "Shared")
+        compressed_store.write_text("video_c", TRANSCRIPT, "First take")
+        first_take = compressed_store.stored_blob("video_c", TRANSCRIPT).path
+        compressed_store.write_text("video_a", TRANSCRIPT, "Retranscribed")
+        compressed_store.write_text("video_c", TRANSCRIPT, "Second take")
+
+        assert compressed_store.collect_garbage() == (0, 0)
+        removed, freed = compressed_store.collect_garbage(min_age=0)
+
+        assert removed == 1 and freed > 0
+        assert not os.path.exists(first_take)
+        for video_id, text in (("video_a", "Retranscribed"), ("video_b", "Shared"),
+                               ("video_c", "Second take")):
+            assert compressed_store.read_text(video_id, TRANSCRIPT) == text
+        assert len(list(compressed_store.blobs.names())) == 3
+
+    def test_reused_blob_is_kept(self, compressed_store):
+        """Test that storing existing content again protects its blob from the next sweep."""
+        compressed_store.write_text("video_a", TRANSCRIPT, "Shared")
+        blob = compressed_store.stored_blob("video_a", TRANSCRIPT).path
+        os.utime(blob, (0, 0))
+        compressed_store.write_text("video_a", TRANSCRIPT, "Replaced")
+
+        # The sweep looked at the references before video_b's was written.
+        referenced = compressed_store.referenced_blobs()
+        compressed_store.write_text("video_b", TRANSCRIPT, "Shared")
+        compressed_store.blobs.sweep(referenced, min_age=60)
+        assert compressed_store.read_text("video_b", TRANSCRIPT) == "Shared"
+
+    def test_gzip_copy(self, compressed_store):
+        """Test that a gzip copy of a blob is written once and kept while its content is."""
+        compressed_store.write_text("video_a", TRANSCRIPT, "Transcript")
+        copy = compressed_store.gzip_blob("video_a", TRANSCRIPT)
+        assert copy.encoding == 'gzip'
+        with open(copy.path, 'rb') as f:
+            assert gzip.decompress(f.read()) == b"Transcript"
+        assert compressed_store.gzip_blob("video_a", TRANSCRIPT) == copy
+
+        assert compressed_store.collect_garbage(min_age=0) == (0, 0)
+        assert compressed_store.gzip_blob("video_a", SEGMENTS) is None
+
+    def test_collect_command(self, app):
+        """Test that the CLI command sweeps the app's blob store."""
+        store = app.extensions['artifact_store']
+        store.write_text("video_a", TRANSCRIPT, "Old")
+        store.write_text("video_a", TRANSCRIPT, "New")
+
+        output = app.test_cli_runner().invoke(args=['collect-artifact-blobs', '--min-age', '0'])
+
+        assert "Removed 1 unreferenced blobs" in output.output
+        assert list(store.blobs.names()) == [os.path.basename(
+            store.stored_blob("video_a", TRANSCRIPT).path)]
+
+    def test_invalid_blob_names(self, tmp_path):
+        """Test that blob paths cannot be steered outside the store."""
+        blobs = BlobStore(str(tmp_path), 'gzip')
+        for name in ("../secret.gz", "abc.gz", None):
+            with pytest.raises(ValueError):
+                blobs.path(name)
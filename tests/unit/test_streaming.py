@@ -0,0 +1,113 @@
+"""Unit tests for the streaming (overlapped) pipeline."""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from unittest.mock import patch
+import pytest
+from website.routes import PipelineError, run_pipeline, run_streaming_pipeline
+
+def fake_segments(count, released=None):
+    """Return a stream_segments replacement that yields ``count`` fake segments."""
+    def stream(url, out_dir, segment_seconds, cookies_path): #pylint: disable=unused-argument
+        with open(os.path.join(out_dir, 'video.info.json'), 'w', encoding='utf-8') as f:
+            json.dump({'title': 'Streamed Title'}, f)
+        for index in range(count):
+            yield os.path.join(out_dir, f"segment_{index:05d}.mp3")
+            if released is not None and index == 0:
+                # Don't produce more audio until the first segment has been transcribed.
+                assert released.wait(5)
+    return stream
+
+class TestStreamingPipeline:
+    """Test that download, transcription and summarization overlap."""
+
+    def test_transcript_and_summary(self, app, mock_get_video_title):
+        """Test that segment transcripts are joined in order and summarized."""
+        def whisper(path):
+            return f"part {os.path.basename(path)[8:13]}"
+
+        with app.app_context(), \
+             patch('website.routes.stream_segments', fake_segments(3)), \
+             patch('website.routes._whisper', side_effect=whisper), \
+             patch('website.routes.summarize_text', return_value='Summary') as mock_summary:
+            title, transcript, summary, timings = run_streaming_pipeline('dQw4w9WgXcQ')
+
+        assert title == 'Streamed Title'
+        assert transcript == 'part 00000 part 00001 part 00002'
+        assert summary == 'Summary'
+        mock_summary.assert_called_once_with(transcript)
+        assert set(timings) == {'download', 'transcription', 'summarization'}
+        mock_get_video_title.assert_not_called()
+
+    def test_transcription_starts_before_download_finishes(self, app):
+        """Test that the first segment is transcribed while later ones are still coming."""
+        released = threading.Event()
+
+        def whisper(path):
+            released.set()
+            return os.path.basename(path)
+
+        with app.app_context(), \
+             patch('website.routes.stream_segments', fake_segments(2, released)), \
+             patch('website.routes._whisper', side_effect=whisper), \
+             patch('website.routes.summarize_text', return_value='Summary'):
+            _, transcript, _, _ = run_streaming_pipeline('dQw4w9WgXcQ')
+
+        assert transcript == 'segment_00000.mp3 segment_00001.mp3'
+
+    def test_partial_summaries_are_combined(self, app):
+        """Test that long transcripts are summarized piece by piece and then combined."""
+        app.config['SUMMARY_CHUNK_TOKENS'] = 5
+        with app.app_context(), \
+             patch('website.routes.stream_segments', fake_segments(3)), \
+             patch('website.routes._whisper', return_value='word ' * 30), \
+             patch('website.routes._complete', return_value='P') as mock_complete:
+            _, _, summary, _ = run_streaming_pipeline('dQw4w9WgXcQ')
+
+        assert summary == 'P'
+        # Three partial summaries, then one call combining them.
+        assert mock_complete.call_count == 4
+
+    def test_run_pipeline_uses_streaming_mode(self, app):
+        """Test that PIPELINE_MODE=streaming routes jobs through the streaming pipeline."""
+        app.config['PIPELINE_MODE'] = 'streaming'
+        with app.app_context(), \
+             patch('website.routes.stream_segments', fake_segments(1)), \
+             patch('website.routes._whisper', return_value='Hello world'), \
+             patch('website.routes.summarize_text', return_value='Summary'), \
+             patch('website.routes.download_audio') as mock_download:
+            result = run_pipeline('dQw4w9WgXcQ')
+
+        mock_download.assert_not_called()
+        assert result == {'video_id': 'dQw4w9WgXcQ', 'video_title': 'Streamed Title',
+                          'transcript': 'Hello world', 'transcript_source': 'whisper',
+                          'summary': 'Summary', 'language': 'en',
+                          'summaries': {'en': 'Summary'}}
+
+    def test_failed_segment_stops_the_download(self, app):
+        """Test that yt-dlp and ffmpeg are killed when a segment fails to transcribe."""
+        processes, popen = [], subprocess.Popen
+
+        def start(command, **kwargs):
+            # Stand-ins for a long download: ffmpeg cuts a segment every 0.1s, then both hang.
+            script = "import time; time.sleep(30)"
+            if command[0] == 'ffmpeg':
+                script = (f"import time\nfor i in range(20):\n"
+                          f"    open({command[-1]!r} % i, 'wb').close(); time.sleep(0.1)\n"
+                          f"time.sleep(30)")
+            processes.append(popen([sys.executable, '-c', script], **kwargs))
+            return processes[-1]
+
+        started = time.monotonic()
+        with app.app_context(), \
+             patch('website.audio.subprocess.Popen', side_effect=start), \
+             patch('website.routes._whisper', side_effect=['part one', RuntimeError('boom')]):
+            with pytest.raises(PipelineError):
+                run_streaming_pipeline('dQw4w9WgXcQ')
+
+        assert len(processes) == 2
+        assert all(process.poll() is not None for process in processes)
+        assert time.monotonic() - started < 10
@@ -0,0 +1,175 @@
+"""Unit tests for streaming the summary to job followers."""
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock, AsyncMock
+import openai
+import pytest
+from website.async_pipeline import _complete_async
+from website.jobs import Job
+from website.llm import StreamInterrupted
+from website.routes import _complete, _follow_job, SUMMARY_MODEL, SUMMARY_PROMPT_VERSION
+
+def chunk(text=None, usage=None):
+    """Build one chunk of a streamed chat completion."""
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=text))] if text is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+def stream(*texts):
+    """Build the chunks of a streamed completion of ``texts``, ending with its usage."""
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=len(texts), total_tokens=13)
+    return [chunk(text) for text in texts] + [chunk(usage=usage)]
+
+def connection_error():
+    """Build the error the SDK raises when the connection drops."""
+    return openai.APIConnectionError(request=MagicMock())
+
+def broken_stream(*texts):
+    """Yield ``texts`` as chunks, then fail as a dropped connection would."""
+    for text in texts:
+        yield chunk(text)
+    raise connection_error()
+
+@pytest.fixture
+def streaming_app(app):
+    """The test app with summary streaming turned on."""
+    app.config['SUMMARY_STREAMING'] = True
+    return app
+
+class TestStreamedCompletion:
+    """Test forwarding a streamed completion while assembling it."""
+
+    def test_deltas_and_text(self, app):
+        """Test that each piece is forwarded and the whole text returned."""
+        deltas = []
+        with app.app_context(), \
+             patch('openai.chat.completions.create',
+                   return_value=stream('A ', 'summary.')) as create, \
+             patch('website.metrics.record_tokens') as record_tokens:
+            assert _complete("prompt", on_delta=deltas.append) == 'A summary.'
+        assert deltas == ['A ', 'summary.']
+        assert create.call_args.kwargs['stream'] is True
+        record_tokens.assert_called_once_with(SUMMARY_MODEL, 10, 2)
+
+    def test_failure_before_first_token_is_retried(self, app):
+        """Test that a stream failing before any text is retried."""
+        with app.app_context(), \
+             patch('openai.chat.completions.create',
+                   side_effect=[broken_stream(), stream('Retried.')]):
+            assert _complete("prompt", on_delta=lambda text: None) == 'Retried.'
+
+    def test_failure_after_first_token_is_not_retried(self, app):
+        """Test that text already forwarded is never repeated by a retry."""
+        deltas = []
+        with app.app_context(), \
+             patch('openai.chat.completions.create',
+                   side_effect=[broken_stream('Half '), stream('Again.')]) as create:
+            with pytest.raises(StreamInterrupted):
+                _complete("prompt", on_delta=deltas.append)
+        assert deltas == ['Half ']
+        assert create.call_count == 1
+
+    def test_async_stream(self, app):
+        """Test streaming through the async client."""
+        async def chunks():
+            for item in stream('Async ', 'summary.'):
+                yield item
+
+        sdk = MagicMock()
+        sdk.chat.completions.create = AsyncMock(return_value=chunks())
+        deltas = []
+        with app.app_context(), patch('website.async_pipeline.get_async_openai',
+                                      return_value=sdk):
+            text = asyncio.run(_complete_async("prompt", on_delta=deltas.append))
+        assert text == 'Async summary.'
+        assert deltas == ['Async ', 'summary.']
+
+class TestJobFollowing:
+    """Test following a job's stages and summary together."""
+
+    def test_follow_job(self):
+        """Test that summary pieces come between the summarizing and done events."""
+        job = Job('dQw4w9WgXcQ')
+        job.set_stage('summarizing')
+        events = _follow_job(job)
+        assert next(events)[1]['stage'] == 'summarizing'
+
+        job.add_summary('A ')
+        job.add_summary('summary.')
+        job.finish({'summary': 'A summary.'})
+        assert next(events) == ('summary', 'A summary.')
+        assert next(events)[1]['stage'] == 'done'
+        assert next(events, None) is None
+
+    def test_follow_waits_for_text(self):
+        """Test that a follower wakes for summary text without a stage change."""
+        job = Job('dQw4w9WgXcQ')
+        version, _, _ = job.follow(-1, 0)
+        threading.Timer(0.05, job.add_summary, ('Hello',)).start()
+        assert job.follow(version, 0, timeout=5) == (version, None, ['Hello'])
+        assert job.follow(version, 1, timeout=0.01) == (version, None, [])
+
+class TestSummaryEndpoints:
+    """Test the NDJSON and SSE summary streams."""
+
+    def submit(self, client):
+        """Queue a video and return its job links."""
+        response = client.post('/api/process',
+                               json={"youtube_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ"})
+        assert response.status_code == 202
+        return response.get_json()
+
+    def test_ndjson_summary(self, streaming_app, mock_download_audio, mock_transcribe_audio):
+        """Test that API clients get the summary piece by piece, then whole, and it is cached."""
+        client = streaming_app.test_client()
+        with patch('openai.chat.completions.create', return_value=stream('A ', 'summary.')):
+            job = self.submit(client)
+            response = client.get(job['summary_url'])
+            lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+        assert response.mimetype == 'application/x-ndjson'
+        assert ''.join(line.get('delta', '') for line in lines) == 'A summary.'
+        assert lines[-1] == {'summary': 'A summary.'}
+        with streaming_app.app_context():
+            cache = streaming_app.extensions['result_cache']
+            summary = cache.get_summary('dQw4w9WgXcQ', SUMMARY_MODEL, SUMMARY_PROMPT_VERSION)
+        assert summary == 'A summary.'
+
+    def test_sse_summary_events(self, streaming_app, mock_download_audio, mock_transcribe_audio):
+        """Test that the event stream carries summary deltas before the done event."""
+        client = streaming_app.test_client()
+        with patch('openai.chat.completions.create', return_value=stream('Streamed.')):
+            job = self.submit(client)
+            body = client.get(job['events_url']).get_data(as_text=True)
+
+        assert 'event: summary\ndata: {"delta": "Streamed."}' in body
+        assert body.index('event: summary') < body.index('event: done')
+
+    def test_failed_job(self, streaming_app, mock_download_audio):
+        """Test that the NDJSON stream ends with the error of a failed job."""
+        client = streaming_app.test_client()
+        with patch('website.routes.transcribe_audio', return_value=None):
+            job = self.submit(client)
+            lines = client.get(job['summary_url']).get_data(as_text=True).splitlines()
+        assert json.loads(lines[-1]) == {'error': 'Failed to transcribe the audio'}
+
+    def test_result_page_streams_summary(self, streaming_app, mock_download_audio,
+                                         mock_transcribe_audio):
+        """Test that the page shows the transcript while the summary is still being written."""
+        release = threading.Event()
+
+        def slow_stream(**kwargs): #pylint: disable=unused-argument
+            release.wait(5)
+            yield from stream('Late summary.')
+
+        client = streaming_app.test_client()
+        with patch('openai.chat.completions.create', side_effect=slow_stream):
+            response = client.post('/process', data={
+                "youtube_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ"})
+            release.set()
+        page = response.get_data(as_text=True)
+        assert response.status_code == 200
+        assert 'This is a test transcript.' in page
+        assert 'Summarizing…' in page
+        assert 'new EventSource("/api/jobs/' in page
@@ -0,0 +1,97 @@
+"""Unit tests for the pluggable transcription engines."""
+import threading
+from types import SimpleNamespace
+import pytest
+from unittest.mock import patch, MagicMock
+from website.transcription import LocalWhisperEngine, choose_engine
+from website.routes import transcribe_audio
+
+def fake_faster_whisper(batched=True):
+    """Build a stand-in for the faster_whisper module."""
+    segments = [SimpleNamespace(text=" Hello there."), SimpleNamespace(text=" General Kenobi. ")]
+    model = MagicMock()
+    model.transcribe.return_value = (iter(segments), None)
+    pipeline = MagicMock()
+    pipeline.transcribe.side_effect = lambda *a, **kw: (iter(segments), None)
+    module = SimpleNamespace(WhisperModel=MagicMock(return_value=model))
+    if batched:
+        module.BatchedInferencePipeline = MagicMock(return_value=pipeline)
+    return module, model, pipeline
+
+class TestLocalWhisperEngine:
+    """Test the faster-whisper engine."""
+
+    def test_model_is_loaded_once_and_batched(self):
+        """Test that concurrent calls share one warm model and decode in batches."""
+        module, _, pipeline = fake_faster_whisper()
+        with patch('website.transcription.faster_whisper', module):
+            engine = LocalWhisperEngine('tiny', workers=2, batch_size=4)
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(engine.transcribe("a.mp3")))
+                       for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert results == ["Hello there. General Kenobi."] * 4
+        module.WhisperModel.assert_called_once_with('tiny', device='cpu', compute_type='int8',
+                                                    num_workers=2)
+        assert pipeline.transcribe.call_args.kwargs == {'batch_size': 4}
+
+    def test_without_batched_pipeline(self):
+        """Test that older faster-whisper releases use the model directly."""
+        module, model, _ = fake_faster_whisper(batched=False)
+        with patch('website.transcription.faster_whisper', module):
+            text = LocalWhisperEngine('tiny').transcribe("a.mp3")
+
+        assert text == "Hello there. General Kenobi."
+        model.transcribe.assert_called_once_with("a.mp3")
+
+    def test_requires_faster_whisper(self):
+        """Test that a missing optional dependency is reported clearly."""
+        with patch('website.transcription.faster_whisper', None):
+            with pytest.raises(RuntimeError):
+                LocalWhisperEngine()
+
+class TestChooseEngine:
+    """Test selecting an engine per file size."""
+
+    def test_fixed_engines(self):
+        """Test that "openai" and "local" ignore the size."""
+        assert choose_engine('openai', 1, 10) == 'openai'
+        assert choose_engine('local', 100, 10) == 'local'
+
+    def test_auto_by_size(self):
+        """Test that "auto" keeps small files local and sends large ones to the API."""
+        with patch('website.transcription.faster_whisper', object()):
+            assert choose_engine('auto', 10, 10) == 'local'
+            assert choose_engine('auto', 11, 10) == 'openai'
+
+    def test_auto_without_faster_whisper(self):
+        """Test that "auto" falls back to the API when the local engine is unavailable."""
+        with patch('website.transcription.faster_whisper', None):
+            assert choose_engine('auto', 1, 10) == 'openai'
+
+    def test_unknown_engine(self):
+        """Test that a misconfigured engine is rejected."""
+        with pytest.raises(ValueError):
+            choose_engine('whisper.cpp', 1, 10)
+
+class TestTranscribeWithLocalEngine:
+    """Test that transcribe_audio honours TRANSCRIBE_ENGINE."""
+
+    def test_local_engine_skips_api(self, tmp_path, mock_openai_transcribe):
+        """Test that the local engine is used, without the API or chunking."""
+        audio = tmp_path / "audio.mp3"
+        audio.write_bytes(b"\0" * 100)
+        engine = MagicMock()
+        engine.transcribe.return_value = "Local transcript"
+
+        with patch('config.Config.TRANSCRIBE_ENGINE', 'local'), \
+             patch('config.Config.TRANSCRIBE_CHUNK_THRESHOLD', 10), \
+             patch('website.routes.get_local_engine', return_value=engine):
+            assert transcribe_audio(str(audio)) == "Local transcript"
+
+        engine.transcribe.assert_called_once_with(str(audio))
+        mock_openai_transcribe.assert_not_called()
@@ -0,0 +1,105 @@
+"""Unit tests for parsing YouTube links."""
+import random
+import string
+import pytest
+from website.urls import parse_video_url, parse_timestamp, playlist_url, VideoRef, VIDEO_ID_RE
+
+VIDEO = 'dQw4w9WgXcQ'
+PLAYLIST = 'PLrAXtmErZgOeiKm4sgNOknGvNjby9efdf'
+ID_CHARS = string.ascii_letters + string.digits + '-_'
+
+class TestParseVideoUrl:
+    """Test the URL shapes a video or playlist may be shared as."""
+
+    @pytest.mark.parametrize('url', [
+        f"https://www.youtube.com/watch?v={VIDEO}",
+        f"http://youtube.com/watch?v={VIDEO}",
+        f"https://m.youtube.com/watch?v={VIDEO}",
+        f"https://music.youtube.com/watch?v={VIDEO}",
+        f"https://www.youtube.com/watch?feature=share&v={VIDEO}",
+        f"https://youtu.be/{VIDEO}",
+        f"https://www.youtube.com/shorts/{VIDEO}",
+        f"https://www.youtube.com/live/{VIDEO}?si=abc",
+        f"https://www.youtube.com/embed/{VIDEO}",
+        f"https://www.youtube-nocookie.com/embed/{VIDEO}",
+        f"https://www.youtube.com/v/{VIDEO}",
+        f"www.youtube.com/watch?v={VIDEO}",
+        f"youtu.be/{VIDEO}",
+        f"  {VIDEO}  ",
+    ])
+    def test_video_shapes(self, url):
+        """Test that each shape yields the video ID alone."""
+        assert parse_video_url(url) == VideoRef(VIDEO, None, None)
+
+    def test_playlist_and_start(self):
+        """Test that the playlist and start time come back with the video."""
+        ref = parse_video_url(f"https://www.youtube.com/watch?list={PLAYLIST}&v={VIDEO}&t=1m30s")
+        assert ref == VideoRef(VIDEO, PLAYLIST, 90)
+        assert parse_video_url(f"https://youtu.be/{VIDEO}?t=42").start == 42
+        assert parse_video_url(f"https://www.youtube.com/embed/{VIDEO}?start=7").start == 7
+        assert parse_video_url(f"https://www.youtube.com/watch?v={VIDEO}#t=1h2s").start == 3602
+
+    def test_playlist_only(self):
+        """Test that playlist links have no video ID."""
+        expected = VideoRef(None, PLAYLIST, None)
+        assert parse_video_url(f"https://www.youtube.com/playlist?list={PLAYLIST}") == expected
+        assert parse_video_url(
+            f"https://www.youtube.com/embed/videoseries?list={PLAYLIST}") == expected
+        assert playlist_url(PLAYLIST) == f"https://www.youtube.com/playlist?list={PLAYLIST}"
+
+    @pytest.mark.parametrize('url', [
+        None,
+        '',
+        'not a url',
+        f"https://example.com/watch?v={VIDEO}",
+        f"https://notyoutube.com/watch?v={VIDEO}",
+        f"ftp://www.youtube.com/watch?v={VIDEO}",
+        "https://www.youtube.com/watch?v=short",
+        f"https://www.youtube.com/watch?v={VIDEO}X",
+        f"https://youtu.be/{VIDEO}X?t=42",
+        "https://www.youtube.com/channel/UCuAXFkgsw1L7xaCfnd5JJOw",
+        "https://[::1/watch",
+    ])
+    def test_rejects(self, url):
+        """Test that non-YouTube links and malformed or overlong IDs are rejected."""
+        assert parse_video_url(url) is None
+
+    def test_parse_timestamp(self):
+        """Test the accepted ``t=`` formats."""
+        assert parse_timestamp('90') == 90
+        assert parse_timestamp('90s') == 90
+        assert parse_timestamp('2h') == 7200
+        assert parse_timestamp('') is None
+        assert parse_timestamp('soon') is None
+
+class TestFuzz:
+    """Randomized checks over generated and mangled links."""
+
+    SHAPES = [
+        'https://www.youtube.com/watch?v={id}', 'https://youtu.be/{id}',
+        'https://m.youtube.com/shorts/{id}', 'youtube.com/embed/{id}?rel=0',
+        'https://music.youtube.com/watch?a=1&v={id}&list=PL{id}', '{id}',
+    ]
+
+    def test_generated_links_round_trip(self):
+        """Test that every generated link gives back its video ID."""
+        rng = random.Random(22)
+        for _ in range(2000):
+            video_id = ''.join(rng.choices(ID_CHARS, k=11))
+            url = rng.choice(self.SHAPES).format(id=video_id)
+            assert parse_video_url(url).video_id == video_id, url
+
+    def test_mangled_input_never_raises(self):
+        """Test that arbitrary text parses to None or to well-formed IDs."""
+        rng = random.Random(23)
+        alphabet = ID_CHARS + ':/?&=#%[]@. \t'
+        for _ in range(5000):
+            base = rng.choice(self.SHAPES).format(id=''.join(rng.choices(ID_CHARS, k=11)))
+            chars = list(base)
+            for _ in range(rng.randint(1, 4)):
+                chars.insert(rng.randrange(len(chars) + 1), rng.choice(alphabet))
+            ref = parse_video_url(''.join(chars))
+            if ref is not None:
+                assert ref.video_id is None or VIDEO_ID_RE.fullmatch(ref.video_id)
+                assert ref.video_id or ref.playlist_id
+                assert ref.start is None or ref.start >= 0
@@ -1,10 +1,28 @@
 ''' package website '''
 from flask import Flask
-from website.routes import main
+from website import admission, cache, jobs, limits, llm, metrics, scratch, search, shared, storage
+from website.async_pipeline import run_pipeline_async
+from website.routes import main, run_pipeline
 
-def create_app():
+def create_app(test_config=None):
     """Create and configure the Flask application."""
     app = Flask(__name__)
+    app.config.from_object('config.Config')
+    if test_config:
+        app.config.update(test_config)
+    if not app.config.get('DATA_DIR'):
+        app.config['DATA_DIR'] = app.instance_path
+
+    cache.init_app(app)
+    storage.init_app(app)
+    search.init_app(app)
+    shared.init_app(app)
+    scratch.init_app(app)
+    limits.init_app(app)
+    admission.init_app(app)
+    llm.init_app(app)
+    jobs.init_app(app, run_pipeline, run_pipeline_async)
+    metrics.init_app(app)
 
     app.register_blueprint(main)
 
@@ -0,0 +1,186 @@
+'''Admission control: deciding from a video's metadata how, and whether, to transcribe it.
+
+Before any audio is fetched the pipeline probes the video's duration, audio
+formats and caption tracks, estimates the size of the download and of the
+upload to Whisper, and picks a strategy:
+
+- "captions": an acceptable caption track exists, so no audio is needed;
+- "single": the audio fits in one Whisper request;
+- "chunked": the audio is over TRANSCRIBE_CHUNK_THRESHOLD and will be split;
+- "reject": the video is live, or longer or larger than the configured limits.
+
+Minutes of audio to be transcribed are charged to the requesting client's
+AudioQuota.
+'''
+import re
+import threading
+import time
+from collections import namedtuple
+
+# yt-dlp's default MP3 extraction (VBR quality 5) averages about this many bits per second.
+MP3_BITRATE = 128000
+
+Plan = namedtuple('Plan', 'strategy minutes download_bytes upload_bytes reason fallback',
+                  defaults=(None, None))
+Plan.__doc__ = """How a video will be transcribed, with the estimates behind the choice.
+
+``fallback`` is the audio plan to use when a "captions" plan's track turns
+out to be unusable; sizes are None when the metadata gave no way to tell.
+"""
+
+
+def caption_patterns(languages):
+    """Compile a CAPTION_LANGUAGES setting into patterns, most preferred first."""
+    return [re.compile(pattern.strip() + '$') for pattern in languages.split(',')
+            if pattern.strip()]
+
+
+def parse_bitrate(value):
+    """Return a bitrate such as "32k" or "128000" in bits per second."""
+    value = str(value).strip().lower()
+    if value.endswith('k'):
+        return int(float(value[:-1]) * 1000)
+    return int(float(value))
+
+
+def estimate_download_bytes(metadata):
+    """Estimate the bytes of the best audio stream, which is what yt-dlp fetches, or None.
+
+    Audio-only formats are preferred, as yt-dlp's "bestaudio" does.
+    """
+    formats = [fmt for fmt in metadata.get('formats') or ()
+               if fmt.get('abr') or fmt.get('filesize')]
+    audio_only = [fmt for fmt in formats if fmt.get('vcodec') in (None, 'none')]
+    formats = audio_only or formats
+    if not formats:
+        return None
+    best = max(formats, key=lambda fmt: fmt.get('abr') or 0)
+    if best.get('filesize'):
+        return int(best['filesize'])
+    if metadata.get('duration'):
+        return int(best['abr'] * 1000 / 8 * metadata['duration'])
+    return None
+
+
+class AdmissionPolicy:
+    """Plans each video from its probed metadata, reading the settings from ``config``."""
+
+    def __init__(self, config):
+        self.config = config
+
+    def has_captions(self, metadata):
+        """Whether the video lists a caption track CAPTIONS_MODE and CAPTION_LANGUAGES accept."""
+        mode = self.config['CAPTIONS_MODE']
+        if mode == 'off':
+            return False
+        languages = list(metadata.get('caption_languages') or ())
+        if mode == 'any':
+            languages += metadata.get('auto_caption_languages') or ()
+        return any(pattern.match(language)
+                   for pattern in caption_patterns(self.config['CAPTION_LANGUAGES'])
+                   for language in languages)
+
+    def upload_bytes(self, duration, download_bytes):
+        """Estimate the size of the file sent to Whisper, after any transcoding, or None."""
+        if not duration:
+            return download_bytes
+        if self.config['AUDIO_FORMAT'] == 'native':
+            stored = download_bytes
+        else:
+            stored = int(MP3_BITRATE / 8 * duration)
+        threshold = self.config['AUDIO_TRANSCODE_THRESHOLD']
+        if stored is not None and (threshold <= 0 or stored <= threshold):
+            return stored
+        return int(parse_bitrate(self.config['AUDIO_SPEECH_BITRATE']) / 8 * duration)
+
+    def plan(self, metadata, captions=True):
+        """Return the Plan for a video's probe_video metadata.
+
+        With ``captions`` False the caption tracks are ignored, as when the
+        ones listed turned out to be unusable.
+        """
+        duration = metadata.get('duration') or 0
+        minutes = duration / 60
+        if metadata.get('is_live'):
+            return Plan('reject', minutes, None, None, "Live streams cannot be processed")
+        if captions and self.has_captions(metadata):
+            return Plan('captions', 0, 0, 0, "Captions are available",
+                        self.plan(metadata, captions=False))
+
+        download_bytes = estimate_download_bytes(metadata)
+        upload_bytes = self.upload_bytes(duration, download_bytes)
+        max_minutes = self.config['ADMISSION_MAX_MINUTES']
+        max_download_bytes = self.config['ADMISSION_MAX_DOWNLOAD_BYTES']
+        if max_minutes and minutes > max_minutes:
+            return Plan('reject', minutes, download_bytes, upload_bytes,
+                        f"Videos longer than {max_minutes} minutes are not accepted")
+        if max_download_bytes and (download_bytes or 0) > max_download_bytes:
+            return Plan('reject', minutes, download_bytes, upload_bytes,
+                        "The video's audio is too large to download")
+        if upload_bytes is not None and upload_bytes > self.config['TRANSCRIBE_CHUNK_THRESHOLD']:
+            return Plan('chunked', minutes, download_bytes, upload_bytes,
+                        "The audio is too large for one Whisper request")
+        return Plan('single', minutes, download_bytes, upload_bytes,
+                    "The audio fits in one Whisper request")
+
+
+class AudioQuota:
+    """Rolling budget of audio minutes each client may have transcribed.
+
+    A client may be charged at most ``minutes`` within any ``window``
+    seconds; a ``minutes`` of 0 leaves clients unlimited.
+    """
+
+    def __init__(self, minutes, window=24 * 3600):
+        self.minutes = minutes
+        self.window = window
+        self._charges = {}
+        self._lock = threading.Lock()
+
+    def _live(self, client):
+        """Return the client's charges still inside the window; call with the lock held."""
+        cutoff = time.time() - self.window
+        charges = [charge for charge in self._charges.get(client, ()) if charge[0] > cutoff]
+        if charges:
+            self._charges[client] = charges
+        else:
+            self._charges.pop(client, None)
+        return charges
+
+    def used(self, client):
+        """Return the minutes charged to ``client`` within the window."""
+        with self._lock:
+            return sum(minutes for _, minutes in self._live(client))
+
+    def remaining(self, client):
+        """Return the minutes ``client`` may still be charged, or None when unlimited."""
+        if not self.minutes:
+            return None
+        return max(0.0, self.minutes - self.used(client))
+
+    def charge(self, client, minutes):
+        """Charge ``minutes`` to ``client`` if they fit in its budget; return whether they did."""
+        if not self.minutes:
+            return True
+        with self._lock:
+            if sum(used for _, used in self._live(client)) + minutes > self.minutes:
+                return False
+            self._charges.setdefault(client, []).append((time.time(), minutes))
+            return True
+
+    def refund(self, client, minutes):
+        """Return a charge of ``minutes`` whose work was not done."""
+        with self._lock:
+            charges = self._live(client)
+            for index in range(len(charges) - 1, -1, -1):
+                if charges[index][1] == minutes:
+                    del charges[index]
+                    return
+
+
+def init_app(app):
+    """Attach an AdmissionPolicy, when ADMISSION_ENABLED is set, and the AudioQuota."""
+    app.extensions['admission'] = (AdmissionPolicy(app.config)
+                                   if app.config['ADMISSION_ENABLED'] else None)
+    app.extensions['audio_quota'] = AudioQuota(app.config['AUDIO_QUOTA_MINUTES'],
+                                               app.config['AUDIO_QUOTA_WINDOW'])
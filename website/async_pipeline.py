@@ -0,0 +1,373 @@
+'''The processing pipeline as coroutines, for JOB_BACKEND "asyncio".
+
+yt-dlp runs through ``asyncio.create_subprocess_exec`` and OpenAI through the
+AsyncOpenAI client, so a job waiting on either holds no thread and one event
+loop can carry hundreds of videos. Disk and CPU bound steps (ffmpeg, SQLite,
+artifact writes, the local Whisper model) run in the loop's thread pool, and
+PIPELINE_MODE "streaming" runs the threaded streaming pipeline there whole.
+'''
+import asyncio
+import os
+import subprocess
+import tempfile
+from contextlib import nullcontext
+
+from flask import current_app
+
+from website import routes
+from website.audio import merge_transcripts
+from website.chunking import Memo, count_tokens, split_by_tokens
+from website.languages import language_name
+from website.llm import get_async_openai, get_client
+from website.metrics import timed
+from website.routes import (PipelineError, StreamedText, get_setting, TRANSCRIBE_MODEL,
+                            SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, SUMMARY_PROMPT, CHUNK_PROMPT,
+                            COMBINE_PROMPT, TRANSLATE_PROMPT)
+from website.segments import Transcript, segments_of, shift_segments
+from website.storage import TIMESTAMPED_TRANSCRIPT
+
+
+async def run_command(command):
+    """Run a command without blocking the event loop; return a CompletedProcess with text output."""
+    process = await asyncio.create_subprocess_exec(*command, stdout=asyncio.subprocess.PIPE,
+                                                   stderr=asyncio.subprocess.PIPE)
+    try:
+        stdout, stderr = await process.communicate()
+    except asyncio.CancelledError:
+        process.kill()
+        raise
+    return subprocess.CompletedProcess(command, process.returncode,
+                                       stdout.decode('utf-8', 'replace'),
+                                       stderr.decode('utf-8', 'replace'))
+
+
+async def gather_limited(coroutines, limit):
+    """Await ``coroutines``, at most ``limit`` at a time; return their results in order."""
+    slots = asyncio.Semaphore(max(1, limit))
+
+    async def run(coroutine):
+        async with slots:
+            return await coroutine
+    return await asyncio.gather(*(run(coroutine) for coroutine in coroutines))
+
+
+async def probe_video_async(video_id):
+    """Coroutine version of routes.probe_video.
+
+    The in-process download backend has no async interface, so it runs in a
+    thread.
+    """
+    try:
+        if get_setting('DOWNLOAD_BACKEND') == 'inprocess':
+            return await asyncio.to_thread(routes.probe_video, video_id)
+        result = await run_command(routes.probe_command(video_id))
+        if result.returncode != 0:
+            raise RuntimeError(f"yt-dlp failed: {result.stderr}")
+        info = routes.first_json_line(result.stdout)
+        return routes.parse_video_metadata(info) if info else None
+    except Exception as e: #pylint: disable=broad-except
+        print(f"❌ Error probing video: {e}")
+        return None
+
+
+async def plan_admission_async(video_id):
+    """Coroutine version of routes.plan_admission."""
+    policy = current_app.extensions.get('admission')
+    if policy is None:
+        return None
+    return routes.plan_probed(video_id, policy, await probe_video_async(video_id))
+
+
+@timed('fetch_captions')
+async def fetch_captions_async(video_id):
+    """Coroutine version of routes.fetch_captions."""
+    try:
+        with tempfile.TemporaryDirectory(prefix="captions_") as work_dir:
+            result = await run_command(routes.captions_command(video_id, work_dir))
+            if result.returncode != 0:
+                raise RuntimeError(f"yt-dlp failed: {result.stderr}")
+            info = routes.first_json_line(result.stdout) or {}
+            return await asyncio.to_thread(routes.pick_captions, video_id, info, work_dir)
+    except Exception as e: #pylint: disable=broad-except
+        print(f"❌ Error fetching captions: {e}")
+        return None
+
+
+@timed('download', ok=lambda result: result[0])
+async def download_audio_async(video_id):
+    """Coroutine version of routes.download_audio; returns ``(audio_file, title)``.
+
+    The in-process download backend has no async interface, so it runs in a
+    thread.
+    """
+    try:
+        if get_setting('DOWNLOAD_BACKEND') == 'inprocess':
+            return await asyncio.to_thread(routes.download_audio, video_id)
+
+        scratch = current_app.extensions.get('audio_scratch')
+        reused = scratch.find(video_id) if scratch else None
+        if reused:
+            print(f"✅ Reusing downloaded audio: {reused[0]}")
+            audio_file, metadata = reused
+        else:
+            url = f"https://www.youtube.com/watch?v={video_id}"
+            print(f"Downloading audio from: {url}")
+            audio_file = routes.download_target(video_id, scratch)
+            command = routes.yt_dlp_command(url, audio_file,
+                                             get_setting('AUDIO_FORMAT') == 'native')
+            result = await run_command(command)
+            if result.returncode != 0:
+                raise RuntimeError(f"yt-dlp failed: {result.stderr}")
+            audio_file, metadata = await asyncio.to_thread(
+                routes.finish_download, video_id, audio_file,
+                routes.first_json_line(result.stdout), scratch)
+        return audio_file, metadata['title'] or "Unknown Video"
+    except Exception as e: #pylint: disable=broad-except
+        print(f"❌ Error downloading audio: {e}")
+        return None, None
+
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@timed('openai_transcription')
+async def _whisper_async(audio_file):
+    """Send one audio file to the Whisper API and return its Transcript, with timed segments."""
+    audio = (os.path.basename(audio_file), await asyncio.to_thread(_read_bytes, audio_file))
+    sdk = get_async_openai()
+
+    async def send(timeout):
+        return await sdk.audio.transcriptions.create(
+            model=TRANSCRIBE_MODEL,
+            file=audio,
+            response_format="verbose_json",
+            timeout=timeout
+        )
+    transcript = await get_client().acall(TRANSCRIBE_MODEL, send)
+    return Transcript(transcript.text, segments_of(transcript))
+
+
+async def transcribe_in_chunks_async(audio_file):
+    """Coroutine version of routes.transcribe_in_chunks."""
+    with tempfile.TemporaryDirectory(prefix="chunks_") as chunk_dir:
+        chunks = await asyncio.to_thread(routes.split_audio, audio_file, chunk_dir,
+                                         get_setting('TRANSCRIBE_CHUNK_SECONDS'),
+                                         get_setting('TRANSCRIBE_CHUNK_OVERLAP'))
+        print(f"Transcribing {len(chunks)} chunks...")
+        texts = await gather_limited([_whisper_async(path) for path, _ in chunks],
+                                     get_setting('TRANSCRIBE_WORKERS'))
+
+    segments = shift_segments((start, getattr(text, 'segments', ()))
+                              for (_, start), text in zip(chunks, texts))
+    return Transcript(merge_transcripts(texts), segments)
+
+
+@timed('transcribe')
+async def transcribe_audio_async(audio_file, strategy=None):
+    """Coroutine version of routes.transcribe_audio; the local engine runs in a thread."""
+    try:
+        if not os.path.exists(audio_file):
+            print(f"❌ File not found: {audio_file}")
+            return None
+
+        file_size = os.path.getsize(audio_file)
+        if routes.select_engine(file_size) == 'local':
+            return await asyncio.to_thread(routes.local_whisper, audio_file)
+        if routes.needs_chunks(file_size, strategy):
+            return await transcribe_in_chunks_async(audio_file)
+        return await _whisper_async(audio_file)
+    except Exception as e: #pylint: disable=broad-except
+        print(f"❌ Error transcribing audio: {e}")
+        return None
+
+
+@timed('openai_completion')
+async def _complete_async(prompt, max_tokens=500, on_delta=None):
+    """Run one summarization chat completion and return its text, streaming it to ``on_delta``."""
+    sdk = get_async_openai()
+
+    async def send(timeout):
+        arguments = routes.completion_request(prompt, max_tokens, timeout)
+        if on_delta is None:
+            return routes.completion_text(await sdk.chat.completions.create(**arguments))
+        with StreamedText(on_delta) as streamed:
+            stream = await sdk.chat.completions.create(
+                stream=True, stream_options={'include_usage': True}, **arguments)
+            async for chunk in stream:
+                streamed.add(chunk)
+        return streamed.text()
+    return await get_client().acall(SUMMARY_MODEL, send,
+                                    tokens=count_tokens(prompt) + max_tokens)
+
+
+async def summarize_chunk_async(text, part, total):
+    """Summarize one chunk of a transcript, sharing routes' memo of chunk summaries."""
+    key = Memo.key(SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, part, total, text)
+    summary = routes.chunk_summaries.get(key)
+    if summary is None:
+        summary = await _complete_async(CHUNK_PROMPT.format(part=part, total=total, text=text))
+        routes.chunk_summaries.put(key, summary)
+    return summary
+
+
+async def map_reduce_summary_async(text, max_tokens, workers, on_delta=None, language='en'): #pylint: disable=too-many-arguments,too-many-positional-arguments
+    """Coroutine version of routes.map_reduce_summary."""
+    chunks = split_by_tokens(text, max_tokens)
+    print(f"Summarizing {len(chunks)} chunks...")
+    partials = await gather_limited([summarize_chunk_async(chunk, i + 1, len(chunks))
+                                     for i, chunk in enumerate(chunks)], workers)
+
+    combined = "\n\n".join(partials)
+    if count_tokens(combined) > max_tokens and len(partials) > 1:
+        return await map_reduce_summary_async(combined, max_tokens, workers, on_delta, language)
+    return await _complete_async(
+        COMBINE_PROMPT.format(text=combined, language=language_name(language)), on_delta=on_delta)
+
+
+@timed('summarize')
+async def summarize_text_async(text, on_delta=None, language=None):
+    """Coroutine version of routes.summarize_text."""
+    try:
+        language = language or get_setting('SUMMARY_LANGUAGE')
+        max_tokens = get_setting('SUMMARY_CHUNK_TOKENS')
+        if count_tokens(text) <= max_tokens:
+            return await _complete_async(
+                SUMMARY_PROMPT.format(text=text, language=language_name(language)),
+                on_delta=on_delta)
+        return await map_reduce_summary_async(text, max_tokens, get_setting('SUMMARY_WORKERS'),
+                                              on_delta, language)
+    except Exception as e: #pylint: disable=broad-except
+        print(f"❌ Error summarizing text: {e}")
+        return None
+
+
+@timed('translate')
+async def translate_summary_async(summary, language, on_delta=None):
+    """Coroutine version of routes.translate_summary."""
+    try:
+        return await _complete_async(
+            TRANSLATE_PROMPT.format(text=summary, language=language_name(language)),
+            routes.translation_tokens(summary), on_delta=on_delta)
+    except Exception as e: #pylint: disable=broad-except
+        print(f"❌ Error translating summary into {language}: {e}")
+        return None
+
+
+async def add_translations_async(result, languages, on_stage, on_summary=None):
+    """Coroutine version of routes.add_translations."""
+    summaries, missing = await asyncio.to_thread(routes.summaries_to_translate,
+                                                 result, languages)
+    if missing:
+        limiter = current_app.extensions['stage_limiter']
+        stream = routes.summary_stream(on_summary)
+        on_stage('summarizing')
+
+        async def translate(language):
+            async with limiter.astage('llm'):
+                return await translate_summary_async(
+                    result['summary'], language, **(stream if language == languages[0] else {}))
+
+        translations = await gather_limited([translate(language) for language in missing],
+                                            get_setting('SUMMARY_WORKERS'))
+        for language, translation in zip(missing, translations):
+            summaries[language] = translation
+            await asyncio.to_thread(routes.save_summary,
+                                    result['video_id'], translation, language)
+    return routes.language_result(result, languages, summaries)
+
+
+async def _transcribe_video_async(video_id, on_stage, client=None):
+    """Coroutine version of routes.transcribe_video."""
+    limiter = current_app.extensions['stage_limiter']
+    plan = await plan_admission_async(video_id)
+    if get_setting('CAPTIONS_MODE') != 'off' and (plan is None or plan.strategy == 'captions'):
+        async with limiter.astage('download'):
+            on_stage('downloading')
+            captions = await fetch_captions_async(video_id)
+        if captions:
+            await asyncio.to_thread(current_app.extensions['artifact_store'].write_text,
+                                    video_id, TIMESTAMPED_TRANSCRIPT, captions['timestamped'])
+            transcript = Transcript(captions['text'], captions.get('segments', ()))
+            return captions['title'], transcript, None, captions['source']
+        plan = plan.fallback if plan else None
+
+    with routes.audio_allowance(plan, client):
+        if get_setting('PIPELINE_MODE') == 'streaming':
+            video_title, transcript, summary, _ = await asyncio.to_thread(
+                routes.run_streaming_pipeline, video_id, on_stage)
+            return video_title, transcript, summary, 'whisper'
+        video_title, transcript = await _download_and_transcribe_async(
+            video_id, on_stage, plan.strategy if plan else None)
+    return video_title, transcript, None, 'whisper'
+
+
+async def _download_and_transcribe_async(video_id, on_stage, strategy=None):
+    """Coroutine version of routes.download_and_transcribe."""
+    limiter = current_app.extensions['stage_limiter']
+    scratch = current_app.extensions.get('audio_scratch')
+    with scratch.pin(video_id) if scratch else nullcontext():
+        async with limiter.astage('download'):
+            on_stage('downloading')
+            audio_file, video_title = await download_audio_async(video_id)
+        if not audio_file:
+            raise PipelineError('Failed to download audio from the video')
+
+        async with limiter.astage('transcribe'):
+            on_stage('transcribing')
+            transcript = await transcribe_audio_async(audio_file, strategy=strategy)
+        if not transcript:
+            raise PipelineError('Failed to transcribe the audio')
+    return video_title, transcript
+
+
+async def claim_shared_async(video_id, cached):
+    """Coroutine version of routes.claim_shared; waiting on another instance holds no thread."""
+    coordinator = current_app.extensions.get('coordinator')
+    if coordinator is None or (cached and cached[3] is not None):
+        return None, None
+    return await coordinator.aclaim(routes.shared_key(video_id))
+
+
+async def run_pipeline_async(video_id, on_stage=None, on_summary=None, client=None, #pylint: disable=too-many-arguments,too-many-locals
+                             languages=None):
+    """Coroutine version of routes.run_pipeline, returning the same result."""
+    on_stage = on_stage or (lambda stage: None)
+    limiter = current_app.extensions['stage_limiter']
+    languages = routes.summary_languages(languages)
+    base = get_setting('SUMMARY_LANGUAGE')
+    stream = routes.summary_stream(on_summary) if languages[0] == base else {}
+
+    cached = await asyncio.to_thread(routes.load_cached, video_id)
+    shared, lease = await claim_shared_async(video_id, cached)
+    if shared is not None:
+        result = await asyncio.to_thread(routes.adopt_shared, video_id, shared)
+        return await add_translations_async(result, languages, on_stage, on_summary)
+
+    summary, segments = None, ()
+    try:
+        if cached:
+            video_title, transcript, source, summary = cached
+        else:
+            video_title, transcript, summary, source = await _transcribe_video_async(
+                video_id, on_stage, client)
+            segments = getattr(transcript, 'segments', ())
+            transcript = await asyncio.to_thread(routes.save_transcript,
+                                                 video_id, video_title, transcript, source)
+
+        if summary is None:
+            async with limiter.astage('llm'):
+                on_stage('summarizing')
+                summary = await summarize_text_async(transcript, language=base, **stream)
+            await asyncio.to_thread(routes.save_summary, video_id, summary)
+
+        if lease and summary is not None:
+            await asyncio.to_thread(lease.publish, video_title, Transcript(transcript, segments),
+                                    source, summary)
+    finally:
+        if lease:
+            await asyncio.to_thread(lease.release)
+
+    result = routes.pipeline_result(video_id, video_title, transcript, source, summary)
+    return await add_translations_async(result, languages, on_stage, on_summary)
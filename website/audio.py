@@ -0,0 +1,235 @@
+'''Audio helpers built on ffmpeg: probing, silence detection and chunking.'''
+import glob
+import os
+import re
+import subprocess
+import time
+
+SILENCE_RE = re.compile(r'silence_(start|end): (-?\d+(?:\.\d+)?)')
+WORD_RE = re.compile(r"[\w']+")
+
+# Containers the Whisper API accepts as uploads.
+WHISPER_FORMATS = {'flac', 'm4a', 'mp3', 'mp4', 'mpeg', 'mpga', 'oga', 'ogg', 'wav', 'webm'}
+
+
+def find_output_file(base):
+    """Return the finished file yt-dlp wrote for an ``base.%(ext)s`` template, or None."""
+    matches = [path for path in glob.glob(glob.escape(base) + ".*")
+               if not path.endswith(('.part', '.ytdl', '.json'))]
+    return max(matches, key=os.path.getmtime) if matches else None
+
+
+def transcode_for_speech(audio_file, bitrate='32k'):
+    """Re-encode audio as mono 16 kHz Opus tuned for speech; return the new path."""
+    output = os.path.splitext(audio_file)[0] + ".speech.ogg"
+    command = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", audio_file,
+        "-vn", "-ac", "1", "-ar", "16000",
+        "-c:a", "libopus", "-b:a", bitrate, "-application", "voip",
+        output
+    ]
+    subprocess.run(command, capture_output=True, text=True, check=True)
+    return output
+
+
+def prepare_for_whisper(audio_file, threshold, bitrate='32k'):
+    """Return a file Whisper accepts, transcoding only when it is needed.
+
+    Audio in an unsupported container, or larger than ``threshold`` bytes, is
+    re-encoded with :func:`transcode_for_speech`; the smaller of the two files
+    is kept. A ``threshold`` of 0 disables the size check. Sizes and encode
+    time are logged.
+    """
+    size = os.path.getsize(audio_file)
+    ext = os.path.splitext(audio_file)[1].lstrip('.').lower()
+    print(f"Downloaded audio: {audio_file} ({ext}, {size} bytes)")
+    if ext in WHISPER_FORMATS and (threshold <= 0 or size <= threshold):
+        return audio_file
+
+    start = time.perf_counter()
+    output = transcode_for_speech(audio_file, bitrate)
+    elapsed = time.perf_counter() - start
+    new_size = os.path.getsize(output)
+    print(f"Transcoded for speech in {elapsed:.2f}s: {size} -> {new_size} bytes")
+
+    if ext in WHISPER_FORMATS and new_size >= size:
+        os.remove(output)
+        return audio_file
+    os.remove(audio_file)
+    return output
+
+
+def stream_segments(url, out_dir, segment_seconds=120, cookies_path=None, poll_interval=0.25):
+    """Download audio and yield fixed-length segments as soon as each is complete.
+
+    yt-dlp writes the audio stream to stdout, where ffmpeg's segment muxer cuts
+    it into mono MP3 files. A segment is complete once the next one has been
+    started or ffmpeg has exited. The video's info JSON is written to
+    ``out_dir`` alongside the segments. Raises RuntimeError if either process
+    fails; closing the generator early kills both.
+    """
+    download = [
+        "yt-dlp",
+        *(["--cookies", cookies_path] if cookies_path else []),
+        "-f", "bestaudio/best",
+        "--write-info-json",
+        "-o", "-",
+        "-o", f"infojson:{os.path.join(out_dir, 'video')}",
+        url
+    ]
+    segment = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", "pipe:0",
+        "-vn", "-ac", "1", "-b:a", "64k",
+        "-f", "segment", "-segment_time", str(segment_seconds), "-reset_timestamps", "1",
+        os.path.join(out_dir, "segment_%05d.mp3")
+    ]
+
+    with subprocess.Popen(download, stdout=subprocess.PIPE,
+                          stderr=subprocess.DEVNULL) as downloader:
+        with subprocess.Popen(segment, stdin=downloader.stdout,
+                              stderr=subprocess.PIPE) as segmenter:
+            downloader.stdout.close()
+            emitted, finished = 0, False
+            try:
+                while True:
+                    running = segmenter.poll() is None
+                    segments = sorted(glob.glob(os.path.join(glob.escape(out_dir),
+                                                             "segment_*.mp3")))
+                    complete = segments if not running else segments[:-1]
+                    yield from complete[emitted:]
+                    emitted = max(emitted, len(complete))
+                    if not running:
+                        break
+                    time.sleep(poll_interval)
+                finished = True
+            finally:
+                # Abandoned early, e.g. when a segment failed to transcribe:
+                # stop both rather than wait for the rest of the download.
+                if not finished:
+                    downloader.kill()
+                    segmenter.kill()
+            stderr = segmenter.stderr.read().decode('utf-8', 'replace')
+
+    if downloader.returncode != 0:
+        raise RuntimeError(f"yt-dlp exited with status {downloader.returncode}")
+    if segmenter.returncode != 0:
+        raise RuntimeError(f"ffmpeg segmenting failed: {stderr}")
+
+
+def probe_duration(audio_file):
+    """Return the duration of an audio file in seconds using ffprobe."""
+    command = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        audio_file
+    ]
+    result = subprocess.run(command, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip())
+
+
+def detect_silences(audio_file, noise_db=-35, min_silence=0.4):
+    """Return ``(start, end)`` pairs of the silent stretches in an audio file."""
+    command = [
+        "ffmpeg", "-hide_banner", "-nostats", "-i", audio_file,
+        "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}",
+        "-f", "null", "-"
+    ]
+    result = subprocess.run(command, capture_output=True, text=True, check=True)
+
+    silences, start = [], None
+    for kind, value in SILENCE_RE.findall(result.stderr):
+        if kind == 'start':
+            start = max(float(value), 0.0)
+        elif start is not None:
+            silences.append((start, float(value)))
+            start = None
+    return silences
+
+
+def plan_chunks(duration, chunk_seconds, overlap_seconds=0.0, silences=()):
+    """Split ``duration`` seconds into ``(start, end)`` windows of at most ``chunk_seconds``.
+
+    When a silence falls in the last quarter of a window the cut is moved to its
+    midpoint so words are not split. Every window after the first starts
+    ``overlap_seconds`` before the previous cut.
+    """
+    if chunk_seconds <= overlap_seconds:
+        raise ValueError("chunk_seconds must be larger than overlap_seconds")
+
+    midpoints = sorted((start + end) / 2 for start, end in silences)
+    chunks, start = [], 0.0
+    while start < duration:
+        end = start + chunk_seconds
+        if end >= duration:
+            chunks.append((start, duration))
+            break
+        window_start = end - chunk_seconds / 4
+        candidates = [m for m in midpoints if window_start <= m < end]
+        if candidates:
+            end = candidates[-1]
+        chunks.append((start, end))
+        start = max(end - overlap_seconds, chunks[-1][0] + 1.0)
+    return chunks
+
+
+def split_audio(audio_file, out_dir, chunk_seconds=600, overlap_seconds=2.0, use_silence=True):
+    """Cut an audio file into mono MP3 chunks in ``out_dir``.
+
+    Returns ``(path, start)`` for each chunk in order, ``start`` being where
+    the chunk begins in the original audio, in seconds.
+    """
+    duration = probe_duration(audio_file)
+    silences = detect_silences(audio_file) if use_silence else ()
+    chunks = []
+    for index, (start, end) in enumerate(plan_chunks(duration, chunk_seconds,
+                                                     overlap_seconds, silences)):
+        path = os.path.join(out_dir, f"chunk_{index:04d}.mp3")
+        command = [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+            "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}",
+            "-i", audio_file,
+            "-vn", "-ac", "1", "-b:a", "64k",
+            path
+        ]
+        subprocess.run(command, capture_output=True, text=True, check=True)
+        chunks.append((path, start))
+    return chunks
+
+
+def _normalize(word):
+    return word.lower().strip("'")
+
+
+def merge_transcripts(texts, max_overlap_words=40):
+    """Join chunk transcripts in order, dropping words repeated across chunk overlaps.
+
+    For each pair of neighbouring chunks the longest run of words that ends the
+    previous text and starts the next one (ignoring case and punctuation) is
+    removed from the next text.
+    """
+    merged = ''
+    for text in texts:
+        text = (text or '').strip()
+        if not text:
+            continue
+        if not merged:
+            merged = text
+            continue
+
+        tail = [_normalize(w) for w in WORD_RE.findall(merged)[-max_overlap_words:]]
+        head_matches = list(WORD_RE.finditer(text))[:max_overlap_words]
+        head = [_normalize(m.group()) for m in head_matches]
+
+        skip = 0
+        for size in range(min(len(tail), len(head)), 0, -1):
+            if tail[-size:] == head[:size]:
+                skip = head_matches[size - 1].end()
+                break
+
+        rest = text[skip:].lstrip(" ,.;:!?-")
+        if rest:
+            merged = f"{merged} {rest}"
+    return merged
@@ -0,0 +1,193 @@
+'''Persistent result cache for the video processing pipeline.'''
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    title TEXT,
+    transcript TEXT NOT NULL,
+    transcript_model TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS videos_accessed_at ON videos (accessed_at);
+CREATE TABLE IF NOT EXISTS summaries (
+    video_id TEXT NOT NULL REFERENCES videos (video_id) ON DELETE CASCADE,
+    model TEXT NOT NULL,
+    prompt_version INTEGER NOT NULL,
+    summary TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (video_id, model, prompt_version)
+);
+"""
+
+# Applied in order to databases created by older versions; PRAGMA user_version
+# records how many have run.
+MIGRATIONS = [
+    "ALTER TABLE videos ADD COLUMN transcript_source TEXT NOT NULL DEFAULT 'whisper'",
+    # Summaries are kept per language; those cached before were all English.
+    """CREATE TABLE summaries_by_language (
+        video_id TEXT NOT NULL REFERENCES videos (video_id) ON DELETE CASCADE,
+        model TEXT NOT NULL,
+        prompt_version INTEGER NOT NULL,
+        language TEXT NOT NULL,
+        summary TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (video_id, model, prompt_version, language)
+    )""",
+    "INSERT INTO summaries_by_language (video_id, model, prompt_version, language, summary, "
+    "created_at) SELECT video_id, model, prompt_version, 'en', summary, created_at FROM summaries",
+    "DROP TABLE summaries",
+    "ALTER TABLE summaries_by_language RENAME TO summaries",
+]
+
+
+def migrate(conn):
+    """Bring a database created with SCHEMA up to date with MIGRATIONS."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, statement in enumerate(MIGRATIONS[version:], start=version + 1):
+            conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {number}")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def connect(path):
+    """Open a SQLite database in WAL mode, creating its directory if needed."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+class ResultCache:
+    """SQLite-backed cache of titles, transcripts and summaries keyed by video_id.
+
+    Entries older than ``ttl`` seconds are ignored and purged. When the cache holds
+    more than ``max_entries`` videos or ``max_bytes`` of transcript text, the least
+    recently used videos are evicted together with their summaries.
+    """
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_entries=5000, max_bytes=512 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        """Return this thread's connection, creating the database on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.path)
+            conn.execute("PRAGMA foreign_keys=ON")
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(SCHEMA)
+                    migrate(conn)
+                    self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    def get_video(self, video_id, transcript_model):
+        """Return the cached title and transcript for a video, or None."""
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT title, transcript, transcript_source FROM videos "
+            "WHERE video_id = ? AND transcript_model = ? AND created_at >= ?",
+            (video_id, transcript_model, now - self.ttl)
+        ).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute("UPDATE videos SET accessed_at = ? WHERE video_id = ?", (now, video_id))
+        return {'title': row['title'], 'transcript': row['transcript'],
+                'source': row['transcript_source']}
+
+    def put_video(self, video_id, title, transcript, transcript_model, source='whisper'): #pylint: disable=too-many-arguments,too-many-positional-arguments
+        """Store the title and transcript for a video, dropping any stale summaries.
+
+        ``source`` records where the transcript came from, e.g. "whisper" or
+        "manual_captions".
+        """
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.execute("DELETE FROM videos WHERE video_id = ?", (video_id,))
+            conn.execute(
+                "INSERT INTO videos (video_id, title, transcript, transcript_model, "
+                "transcript_source, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (video_id, title, transcript, transcript_model, source,
+                 len(transcript.encode('utf-8')), now, now)
+            )
+        self.evict()
+
+    def get_summary(self, video_id, model, prompt_version, language='en'):
+        """Return the cached summary for a video, model, prompt version and language, or None."""
+        row = self._connect().execute(
+            "SELECT summary FROM summaries WHERE video_id = ? AND model = ? "
+            "AND prompt_version = ? AND language = ? AND created_at >= ?",
+            (video_id, model, prompt_version, language, time.time() - self.ttl)
+        ).fetchone()
+        return row['summary'] if row else None
+
+    def put_summary(self, video_id, model, prompt_version, summary, language='en'): #pylint: disable=too-many-arguments,too-many-positional-arguments
+        """Store a summary in ``language``; the video's transcript must already be cached."""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO summaries (video_id, model, prompt_version, language, "
+                "summary, created_at) SELECT video_id, ?, ?, ?, ?, ? FROM videos "
+                "WHERE video_id = ?",
+                (model, prompt_version, language, summary, time.time(), video_id)
+            )
+
+    def evict(self):
+        """Purge expired videos, then least recently used ones until within budget."""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM videos WHERE created_at < ?", (time.time() - self.ttl,))
+            count, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM videos").fetchone()
+            if count <= self.max_entries and total <= self.max_bytes:
+                return
+            victims = []
+            for row in conn.execute("SELECT video_id, size FROM videos ORDER BY accessed_at"):
+                if count <= self.max_entries and total <= self.max_bytes:
+                    break
+                victims.append((row['video_id'],))
+                count -= 1
+                total -= row['size']
+            conn.executemany("DELETE FROM videos WHERE video_id = ?", victims)
+
+    def clear(self):
+        """Remove every cached entry."""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM videos")
+
+
+def init_app(app):
+    """Attach a ResultCache configured from ``app.config`` to the application."""
+    if not app.config.get('RESULT_CACHE_ENABLED', True):
+        app.extensions['result_cache'] = None
+        return
+    app.extensions['result_cache'] = ResultCache(
+        os.path.join(app.config['DATA_DIR'], 'results.sqlite3'),
+        ttl=app.config['RESULT_CACHE_TTL'],
+        max_entries=app.config['RESULT_CACHE_MAX_ENTRIES'],
+        max_bytes=app.config['RESULT_CACHE_MAX_BYTES']
+    )
@@ -0,0 +1,87 @@
+'''Parsing of WebVTT and SRT caption tracks into plain and timestamped text.'''
+import html
+import re
+from collections import namedtuple
+
+Cue = namedtuple('Cue', 'start end text')
+
+TIME = r'(?:\d+:)?\d{1,2}:\d{2}[.,]\d{3}'
+TIMING_RE = re.compile(rf'({TIME})\s*-->\s*({TIME})')
+TAG_RE = re.compile(r'<[^>]*>')
+
+# How many recent lines to compare against when dropping the lines that
+# YouTube's auto-generated captions repeat from one cue to the next.
+ROLLING_WINDOW = 3
+
+
+def parse_timestamp(value):
+    """Convert ``HH:MM:SS.mmm``, ``MM:SS.mmm`` or the SRT ``,`` form to seconds."""
+    parts = value.replace(',', '.').split(':')
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def format_timestamp(seconds):
+    """Format seconds as ``HH:MM:SS``."""
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def _clean(line):
+    return html.unescape(TAG_RE.sub('', line)).replace('\xa0', ' ').strip()
+
+
+def parse_cues(text):
+    """Parse a WebVTT or SRT document into cues, in order.
+
+    Both formats are blocks separated by blank lines whose timing line holds
+    ``start --> end``; anything else before the timing line (cue numbers,
+    identifiers) is ignored, as are blocks without one (headers, NOTE and
+    STYLE blocks). Markup and inline timestamps are removed from the text.
+    """
+    cues = []
+    for block in re.split(r'\n\s*\n', text.replace('\r\n', '\n').replace('\r', '\n')):
+        lines = block.strip('\n').split('\n')
+        for index, line in enumerate(lines):
+            match = TIMING_RE.search(line)
+            if match:
+                body = [_clean(l) for l in lines[index + 1:]]
+                cue_text = '\n'.join(l for l in body if l)
+                if cue_text:
+                    cues.append(Cue(parse_timestamp(match.group(1)),
+                                    parse_timestamp(match.group(2)), cue_text))
+                break
+    return cues
+
+
+def dedupe_cues(cues):
+    """Drop the lines auto-generated captions repeat as they scroll.
+
+    YouTube's automatic tracks show each line twice, first as the bottom line
+    of one cue and again as the top line of the next, and add short cues that
+    only repeat the previous text. Each returned cue keeps only its new lines.
+    """
+    recent, result = [], []
+    for cue in cues:
+        new_lines = []
+        for line in cue.text.split('\n'):
+            if line in recent:
+                continue
+            new_lines.append(line)
+            recent = (recent + [line])[-ROLLING_WINDOW:]
+        if new_lines:
+            result.append(Cue(cue.start, cue.end, ' '.join(new_lines)))
+    return result
+
+
+def to_plain_text(cues):
+    """Join cues into running text, as a transcription would read."""
+    return ' '.join(' '.join(cue.text.split()) for cue in cues)
+
+
+def to_timestamped_text(cues):
+    """Render one ``[HH:MM:SS] text`` line per cue."""
+    return '\n'.join(f"[{format_timestamp(cue.start)}] {' '.join(cue.text.split())}"
+                     for cue in cues)
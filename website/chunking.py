@@ -0,0 +1,103 @@
+'''Token-aware text chunking and memoization for map-reduce summarization.'''
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+SENTENCE_RE = re.compile(r'[^.!?\n]+(?:[.!?]+|\n+|$)\s*')
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text):
+    """Count tokens with tiktoken when installed, else estimate at 4 characters per token."""
+    if tiktoken is not None:
+        return len(_encoding().encode(text))
+    return (len(text) + 3) // 4
+
+
+def split_by_tokens(text, max_tokens):
+    """Split text into chunks of at most ``max_tokens``, breaking between sentences.
+
+    A single sentence longer than ``max_tokens`` is split between words.
+    Each sentence or word is tokenized once and chunk sizes are kept as
+    running totals, so the sizes are the sum of their pieces' counts rather
+    than a recount of the joined text.
+    """
+    pieces = []
+    for sentence in SENTENCE_RE.findall(text):
+        tokens = count_tokens(sentence)
+        if tokens <= max_tokens:
+            pieces.append((sentence, tokens))
+            continue
+        piece, piece_tokens = '', 0
+        for word in sentence.split(' '):
+            word = f" {word}" if piece else word
+            word_tokens = count_tokens(word)
+            if piece and piece_tokens + word_tokens > max_tokens:
+                pieces.append((piece, piece_tokens))
+                word = word[1:]
+                piece, piece_tokens = '', count_tokens(word)
+            else:
+                piece_tokens += word_tokens
+            piece += word
+        pieces.append((piece, piece_tokens))
+
+    chunks, current, current_tokens = [], '', 0
+    for piece, tokens in pieces:
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(current.strip())
+            current, current_tokens = '', 0
+        current += piece
+        current_tokens += tokens
+    if current.strip():
+        chunks.append(current.strip())
+    return chunks
+
+
+class Memo:
+    """Thread-safe, size-bounded LRU map from content hashes to computed values."""
+
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts):
+        """Build a stable key from the given strings."""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the memoized value for ``key``, or None."""
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        """Remember ``value`` under ``key``, evicting the oldest entry when full."""
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        """Forget every memoized value."""
+        with self._lock:
+            self._items.clear()
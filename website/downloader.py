@@ -0,0 +1,91 @@
+'''In-process yt-dlp backend that reuses warm YoutubeDL instances.'''
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+try:
+    import yt_dlp
+except ImportError:  # pragma: no cover - optional dependency
+    yt_dlp = None
+
+
+class YoutubeDLPool:
+    """A fixed-size pool of ``yt_dlp.YoutubeDL`` instances.
+
+    Each instance keeps its extractors initialized and its cookie jar loaded
+    between calls, so a request only pays for the network work. Instances are
+    created lazily, up to ``size``, and callers block while all are in use.
+    With ``audio_format=None`` the native audio stream is kept as downloaded.
+    """
+
+    def __init__(self, size=2, cookies_path=None, audio_format='mp3'):
+        if yt_dlp is None:
+            raise RuntimeError("The in-process download backend requires the yt_dlp package")
+        self.size = size
+        self.cookies_path = cookies_path
+        self.audio_format = audio_format
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _params(self):
+        params = {
+            'quiet': True,
+            'no_warnings': True,
+            'noprogress': True,
+            'format': 'bestaudio[ext=m4a]/bestaudio[ext=webm]/bestaudio/best'
+        }
+        if self.audio_format:
+            params['postprocessors'] = [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': self.audio_format
+            }]
+        if self.cookies_path and os.path.exists(self.cookies_path):
+            params['cookiefile'] = self.cookies_path
+        return params
+
+    @contextmanager
+    def acquire(self):
+        """Borrow an instance for the duration of the ``with`` block."""
+        try:
+            ydl = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            ydl = yt_dlp.YoutubeDL(self._params()) if create else self._idle.get()
+        try:
+            yield ydl
+        finally:
+            self._idle.put(ydl)
+
+    def extract_info(self, video_id):
+        """Return the info dict for a video without downloading it."""
+        with self.acquire() as ydl:
+            info = ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}",
+                                    download=False)
+            return ydl.sanitize_info(info)
+
+    def download(self, video_id, audio_file):
+        """Download a video's audio to ``audio_file`` and return its info dict."""
+        base, _ = os.path.splitext(audio_file)
+        with self.acquire() as ydl:
+            ydl.params['outtmpl'] = {'default': f"{base}.%(ext)s"}
+            info = ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}",
+                                    download=True)
+            return ydl.sanitize_info(info)
+
+
+_pool = {}
+_pool_lock = threading.Lock()
+
+
+def get_pool(size, cookies_path, audio_format='mp3'):
+    """Return the process-wide pool for these settings, creating it on first use."""
+    key = (size, cookies_path, audio_format)
+    with _pool_lock:
+        if key not in _pool:
+            _pool[key] = YoutubeDLPool(size, cookies_path, audio_format)
+        return _pool[key]
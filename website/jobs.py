@@ -0,0 +1,343 @@
+'''Background job queue for running the processing pipeline outside the request.'''
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+
+from website import metrics
+
+STAGES = ('queued', 'downloading', 'transcribing', 'summarizing', 'done', 'failed')
+
+# The job whose runner is executing, so init_app's runners can hand it to the pipeline.
+_current_job = ContextVar('current_job', default=None)
+
+
+class Job: #pylint: disable=too-many-instance-attributes
+    """A single pipeline run whose stage can be polled or waited on.
+
+    ``client`` identifies who submitted it, for their audio quota, and
+    ``languages`` the summary languages asked for (None for the default).
+    """
+
+    def __init__(self, video_id, client=None, languages=None):
+        self.id = uuid.uuid4().hex
+        self.video_id = video_id
+        self.client = client
+        self.languages = tuple(languages) if languages else None
+        self.stage = 'queued'
+        self.result = None
+        self.error = None
+        self.status_code = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.version = 0
+        self.summary_parts = []
+        self._callbacks = []
+        self._cond = threading.Condition()
+
+    @property
+    def key(self):
+        """What the job computes; submissions with the same key share it."""
+        return self.video_id, self.languages
+
+    @property
+    def finished(self):
+        """Whether the job has completed, successfully or not."""
+        return self.stage in ('done', 'failed')
+
+    def _update(self, stage, **fields):
+        with self._cond:
+            self.stage = stage
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.updated_at = time.time()
+            self.version += 1
+            self._cond.notify_all()
+            callbacks = self._callbacks if self.finished else []
+            if self.finished:
+                self._callbacks = []
+        for callback in callbacks:
+            callback(self)
+
+    def add_done_callback(self, callback):
+        """Call ``callback(job)`` once the job finishes, immediately if it already has."""
+        with self._cond:
+            if not self.finished:
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def set_stage(self, stage):
+        """Record that the job has moved on to ``stage``."""
+        if stage not in STAGES:
+            raise ValueError(f"Unknown job stage: {stage}")
+        self._update(stage)
+
+    def add_summary(self, text):
+        """Append a piece of the summary as it is generated, waking followers."""
+        with self._cond:
+            self.summary_parts.append(text)
+            self._cond.notify_all()
+
+    def finish(self, result):
+        """Mark the job as done with its result."""
+        self._update('done', result=result)
+
+    def fail(self, error, status_code=500):
+        """Mark the job as failed with a user-facing error message."""
+        self._update('failed', error=error, status_code=status_code)
+
+    def wait(self, timeout=None):
+        """Block until the job finishes or ``timeout`` expires; return whether it finished."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.finished, timeout)
+
+    def wait_for_change(self, version, timeout=None):
+        """Block until the job's version differs from ``version``.
+
+        Returns the new version and a snapshot of the job, or ``(version, None)``
+        if nothing changed before the timeout.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.version != version, timeout):
+                return version, None
+            return self.version, self.to_dict()
+
+    def wait_for_stage(self, stages, timeout=None):
+        """Block until the job reaches one of ``stages`` or finishes; return whether it did."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.stage in stages or self.finished, timeout)
+
+    def follow(self, version, offset, timeout=None):
+        """Block until the stage changes from ``version`` or summary text passes ``offset``.
+
+        Returns ``(version, snapshot, parts)``: the snapshot is None unless the
+        stage changed, and ``parts`` are the summary pieces after ``offset``,
+        possibly none if the timeout expired.
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self.version != version or len(self.summary_parts) > offset, timeout)
+            snapshot = self.to_dict() if self.version != version else None
+            return self.version, snapshot, self.summary_parts[offset:]
+
+    def to_dict(self):
+        """Return the job's status as a JSON-serializable dict."""
+        status = {
+            'job_id': self.id,
+            'video_id': self.video_id,
+            'stage': self.stage,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+        if self.languages:
+            status['languages'] = list(self.languages)
+        if self.error is not None:
+            status['error'] = self.error
+        return status
+
+
+class JobManager: #pylint: disable=too-many-instance-attributes
+    """Runs pipeline jobs on a bounded thread pool.
+
+    Submitting a video that already has a job in flight returns that job instead
+    of starting a second one. A job for other summary languages of a video
+    being processed waits for it, so the video is transcribed once and the
+    later job only translates the cached summary. Finished jobs are kept for
+    ``retention`` seconds so their status and result can still be fetched.
+    """
+
+    def __init__(self, runner, max_workers=2, retention=3600):
+        self._runner = runner
+        self.max_workers = max_workers
+        self._executor = None
+        self.retention = retention
+        self._jobs = {}
+        self._in_flight = {}
+        self._processing = {}
+        self._lock = threading.Lock()
+
+    def submit(self, video_id, client=None, languages=None):
+        """Queue a pipeline run for ``video_id`` on behalf of ``client``; return ``(job, created)``.
+
+        A job already in flight for the video and the same summary
+        ``languages`` is shared, and stays charged to the client that started it.
+        One for other languages is queued until the video's running job settles.
+        """
+        with self._lock:
+            self._purge()
+            job = Job(video_id, client, languages)
+            running = self._in_flight.get(job.key)
+            if running is not None:
+                return running, False
+            self._jobs[job.id] = job
+            self._in_flight[job.key] = job
+            processing = self._processing.get(video_id)
+            if processing is None:
+                self._processing[video_id] = job
+                self._start(job)
+        if processing is not None:
+            processing.add_done_callback(lambda done: self._start_deferred(job, done))
+        return job, True
+
+    def get(self, job_id):
+        """Return the job with ``job_id``, or None if it is unknown or expired."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _start(self, job):
+        """Begin running a new job; called with the lock held."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='pipeline')
+        self._executor.submit(self._run, job)
+
+    def _start_deferred(self, job, waited_on):
+        """Start a job that waited for ``waited_on``, another job on its video.
+
+        After a success the video is cached and the job can start at once.
+        After a failure the first waiter to get here processes the video
+        again and the others wait for it in turn.
+        """
+        with self._lock:
+            processing = None
+            if waited_on.stage == 'failed':
+                processing = self._processing.setdefault(job.video_id, job)
+            if processing is None or processing is job:
+                self._start(job)
+                return
+        processing.add_done_callback(lambda done: self._start_deferred(job, done))
+
+    def _run(self, job):
+        result, error = None, None
+        _current_job.set(job)
+        try:
+            result = self._runner(job.video_id, job.set_stage)
+        except Exception as e: #pylint: disable=broad-except
+            print(f"❌ Job {job.id} failed: {e}")
+            error = e
+        self._settle(job, result, error)
+
+    def _settle(self, job, result, error):
+        # Leave the in-flight map before waking waiters so a resubmission starts afresh.
+        with self._lock:
+            if self._in_flight.get(job.key) is job:
+                del self._in_flight[job.key]
+            if self._processing.get(job.video_id) is job:
+                del self._processing[job.video_id]
+
+        if error is not None:
+            job.fail(getattr(error, 'message', str(error)), getattr(error, 'status_code', 500))
+        else:
+            job.finish(result)
+
+    def _purge(self):
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and job.updated_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs and optionally wait for running ones."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+
+class AsyncJobManager(JobManager):
+    """Runs pipeline coroutines on one event loop, in a background thread.
+
+    A job waiting on a subprocess or an HTTP response holds no thread, so up
+    to ``max_workers`` jobs can be in flight at once at the cost of one
+    thread; further jobs wait their turn on the loop. ``runner`` must be a
+    coroutine function.
+    """
+
+    def __init__(self, runner, max_workers=500, retention=3600):
+        super().__init__(runner, max_workers, retention)
+        self._loop = None
+        self._thread = None
+        self._slots = None
+        self._tasks = set()
+
+    def _start(self, job):
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._slots = asyncio.Semaphore(self.max_workers)
+            self._thread = threading.Thread(target=self._loop.run_forever,
+                                            name='pipeline-loop', daemon=True)
+            self._thread.start()
+        self._loop.call_soon_threadsafe(self._create_task, job)
+
+    def _create_task(self, job):
+        task = self._loop.create_task(self._run_async(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_async(self, job):
+        result, error = None, None
+        async with self._slots:
+            _current_job.set(job)
+            try:
+                result = await self._runner(job.video_id, job.set_stage)
+            except Exception as e: #pylint: disable=broad-except
+                print(f"❌ Job {job.id} failed: {e}")
+                error = e
+        self._settle(job, result, error)
+
+    async def _drain(self):
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def shutdown(self, wait=True):
+        """Stop the event loop, after the running jobs finish when ``wait`` is set."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+        if loop is None:
+            return
+        if wait:
+            asyncio.run_coroutine_threadsafe(self._drain(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        if wait:
+            thread.join()
+
+
+def init_app(app, pipeline, async_pipeline=None):
+    """Attach a job manager that runs the pipeline in an app context.
+
+    JOB_BACKEND "threads" runs
+    ``pipeline(video_id, on_stage, on_summary, client, languages)`` on a
+    pool of JOB_WORKERS threads; "asyncio" awaits ``async_pipeline`` on an
+    event loop, with up to ASYNC_MAX_JOBS jobs in flight. ``on_summary``
+    receives the summary text as it is generated; ``client`` and
+    ``languages`` are the job's.
+    """
+    def runner(video_id, on_stage):
+        job = _current_job.get()
+        with app.app_context(), metrics.logged_trace(app.config['METRICS_LOG_REQUESTS'],
+                                                     kind='job', video_id=video_id):
+            return pipeline(video_id, on_stage=on_stage, on_summary=job.add_summary,
+                            client=job.client, languages=job.languages)
+
+    async def async_runner(video_id, on_stage):
+        job = _current_job.get()
+        with app.app_context(), metrics.logged_trace(app.config['METRICS_LOG_REQUESTS'],
+                                                     kind='job', video_id=video_id):
+            return await async_pipeline(video_id, on_stage=on_stage,
+                                        on_summary=job.add_summary, client=job.client,
+                                        languages=job.languages)
+
+    if app.config['JOB_BACKEND'] == 'asyncio' and async_pipeline is not None:
+        app.extensions['job_manager'] = AsyncJobManager(
+            async_runner,
+            max_workers=app.config['ASYNC_MAX_JOBS'],
+            retention=app.config['JOB_RETENTION']
+        )
+        return
+    app.extensions['job_manager'] = JobManager(
+        runner,
+        max_workers=app.config['JOB_WORKERS'],
+        retention=app.config['JOB_RETENTION']
+    )
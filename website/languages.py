@@ -0,0 +1,63 @@
+'''Languages summaries are written in: parsing requested ones and naming them in prompts.'''
+import re
+
+# "en", "pt-BR", "zh-Hant"
+LANGUAGE_RE = re.compile(r'([a-z]{2,3})(?:-([a-z]{2}|[a-z]{4}))?', re.IGNORECASE)
+
+LANGUAGE_NAMES = {
+    'ar': 'Arabic', 'de': 'German', 'en': 'English', 'es': 'Spanish', 'fr': 'French',
+    'hi': 'Hindi', 'it': 'Italian', 'ja': 'Japanese', 'ko': 'Korean', 'nl': 'Dutch',
+    'pl': 'Polish', 'pt': 'Portuguese', 'ru': 'Russian', 'tr': 'Turkish', 'uk': 'Ukrainian',
+    'zh': 'Chinese',
+}
+
+
+def normalize_language(code):
+    """Return a language code in its canonical case ("pt-br" -> "pt-BR"), or None if invalid."""
+    match = LANGUAGE_RE.fullmatch(str(code or '').strip())
+    if not match:
+        return None
+    language, subtag = match.groups()
+    if not subtag:
+        return language.lower()
+    return f"{language.lower()}-{subtag.upper() if len(subtag) == 2 else subtag.title()}"
+
+
+def language_name(code):
+    """Name a language for a prompt: "French", "Portuguese (BR)", or the code itself."""
+    language, _, subtag = code.partition('-')
+    name = LANGUAGE_NAMES.get(language, code)
+    return f"{name} ({subtag})" if subtag and name != code else name
+
+
+def supported_languages(supported):
+    """Return the valid codes of a comma-separated string, in order and without repeats."""
+    return tuple(dict.fromkeys(language for language in map(normalize_language,
+                                                             supported.split(','))
+                               if language))
+
+
+def parse_languages(requested, supported, limit, default):
+    """Return the requested languages as a tuple of codes, in order and without repeats.
+
+    ``requested`` is a list of codes or a comma-separated string, and
+    ``supported`` a comma-separated string of the codes allowed; nothing
+    requested means ``(default,)``. Raises ValueError naming the problem.
+    """
+    if isinstance(requested, str):
+        requested = requested.split(',')
+    if not isinstance(requested, (list, tuple)) and requested is not None:
+        raise ValueError('Languages must be a list of language codes')
+    allowed = supported_languages(supported)
+    languages = []
+    for code in requested or ():
+        if not str(code).strip():
+            continue
+        language = normalize_language(code)
+        if language is None or language not in allowed:
+            raise ValueError(f"Unsupported summary language: {code}")
+        if language not in languages:
+            languages.append(language)
+    if len(languages) > limit:
+        raise ValueError(f"At most {limit} summary languages can be requested at once")
+    return tuple(languages) or (default,)
@@ -0,0 +1,70 @@
+'''Per-stage concurrency limits shared by every pipeline run in the process.'''
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+
+
+class StageLimiter:
+    """Caps how many pipeline runs may be inside each stage at once.
+
+    ``limits`` maps a stage name to its maximum concurrency; stages that are
+    not listed, or have a limit of 0, are unbounded.
+    """
+
+    def __init__(self, limits):
+        self.limits = dict(limits)
+        self._semaphores = {stage: threading.BoundedSemaphore(limit)
+                            for stage, limit in self.limits.items() if limit > 0}
+        self._active = {stage: 0 for stage in self.limits}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """Hold one slot of stage ``name`` for the duration of the block."""
+        semaphore = self._semaphores.get(name)
+        if semaphore is not None:
+            semaphore.acquire()
+        with self._lock:
+            self._active[name] = self._active.get(name, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active[name] -= 1
+            if semaphore is not None:
+                semaphore.release()
+
+    @asynccontextmanager
+    async def astage(self, name, poll_interval=0.05):
+        """Like :meth:`stage`, for coroutines: waiting for a slot does not block the loop.
+
+        The slots are shared with threads using :meth:`stage`, so a coroutine
+        polls for one instead of awaiting it.
+        """
+        semaphore = self._semaphores.get(name)
+        if semaphore is not None:
+            while not semaphore.acquire(blocking=False):
+                await asyncio.sleep(poll_interval)
+        with self._lock:
+            self._active[name] = self._active.get(name, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active[name] -= 1
+            if semaphore is not None:
+                semaphore.release()
+
+    def active(self):
+        """Return how many runs are currently inside each stage."""
+        with self._lock:
+            return dict(self._active)
+
+
+def init_app(app):
+    """Attach a StageLimiter configured from ``app.config`` to the application."""
+    app.extensions['stage_limiter'] = StageLimiter({
+        'download': app.config['DOWNLOAD_CONCURRENCY'],
+        'transcribe': app.config['TRANSCRIBE_CONCURRENCY'],
+        'llm': app.config['LLM_CONCURRENCY']
+    })
@@ -0,0 +1,283 @@
+'''Shared OpenAI access: per-model rate limits, retries with backoff and deadlines.'''
+import asyncio
+import random
+import threading
+import time
+import weakref
+from collections import Counter
+from contextlib import asynccontextmanager
+
+import openai
+
+from config import Config
+
+# Status codes worth retrying: timeouts, conflicts, rate limits and server errors.
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call cannot finish, including its retries, before its deadline."""
+
+
+class StreamInterrupted(RuntimeError):
+    """Raised when a streamed response fails after part of it was passed on.
+
+    It is not retried, as the text already forwarded cannot be taken back.
+    """
+
+
+class TokenBucket:
+    """Refills ``per_minute`` units a minute, holding at most a minute's worth.
+
+    Callers reserve units and sleep for the returned delay, so the bucket may
+    go into debt and concurrent callers are queued fairly in arrival order.
+    A rate of 0 disables the bucket.
+    """
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.capacity = per_minute
+        self._level = float(per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount=1):
+        """Take ``amount`` units and return how many seconds to wait before using them."""
+        if self.per_minute <= 0 or amount <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._level = min(self.capacity,
+                              self._level + (now - self._updated) * self.per_minute / 60)
+            self._updated = now
+            # A request larger than the bucket could never be admitted otherwise.
+            self._level -= min(amount, self.capacity)
+            return max(0.0, -self._level * 60 / self.per_minute)
+
+    def refund(self, amount=1):
+        """Give back units from a reservation that will not be used."""
+        if self.per_minute <= 0 or amount <= 0:
+            return
+        with self._lock:
+            self._level = min(self.capacity, self._level + min(amount, self.capacity))
+
+
+def parse_rate_limits(spec):
+    """Parse ``"model=rpm:tpm,..."`` into ``{model: (rpm, tpm)}``; 0 means unlimited."""
+    limits = {}
+    for entry in (spec or '').split(','):
+        if not entry.strip():
+            continue
+        model, _, rates = entry.partition('=')
+        rpm, _, tpm = rates.partition(':')
+        limits[model.strip()] = (int(rpm or 0), int(tpm or 0))
+    return limits
+
+
+def is_retryable(error):
+    """Whether an OpenAI error is transient: a connection failure, timeout, 429 or 5xx."""
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    return getattr(error, 'status_code', None) in RETRY_STATUSES
+
+
+def _retry_after(error):
+    """Return the server's Retry-After delay in seconds, if it sent one."""
+    response = getattr(error, 'response', None)
+    try:
+        return float(response.headers.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class OpenAIClient:
+    """Runs OpenAI requests within per-model rate limits, retrying transient failures.
+
+    ``rate_limits`` maps a model to its ``(requests, tokens)`` per minute. At
+    most ``max_concurrency`` requests are in flight at once. Failed requests
+    are retried up to ``max_retries`` times with full-jitter exponential
+    backoff (or the server's Retry-After), as long as the retry can still
+    start before the call's ``deadline`` seconds are up. Each attempt's HTTP
+    timeout is capped at ``timeout`` and at the time left.
+    """
+
+    # Seconds of the first backoff window and the cap it doubles up to.
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 30.0
+    # Seconds between attempts to take a concurrency slot from a coroutine.
+    SLOT_POLL_INTERVAL = 0.01
+
+    def __init__(self, rate_limits=None, max_concurrency=8, max_retries=5, timeout=120.0,
+                 deadline=600.0):
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.deadline = deadline
+        self.stats = Counter(requests=0, retries=0, failures=0, throttled_seconds=0.0)
+        self._buckets = {model: (TokenBucket(rpm), TokenBucket(tpm))
+                         for model, (rpm, tpm) in (rate_limits or {}).items()}
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency > 0 else None
+        self._lock = threading.Lock()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def _throttle_delay(self, model, tokens, deadline):
+        """Reserve the call's share of the model's limits; return how long to wait first.
+
+        A call refused for its deadline gives its reservation back, so
+        rejected calls do not push out later ones.
+        """
+        requests_bucket, tokens_bucket = self._buckets.get(model, (None, None))
+        if requests_bucket is None:
+            return 0.0
+        delay = max(requests_bucket.reserve(1), tokens_bucket.reserve(tokens))
+        if delay <= 0:
+            return 0.0
+        if time.monotonic() + delay >= deadline:
+            requests_bucket.refund(1)
+            tokens_bucket.refund(tokens)
+            raise DeadlineExceeded(f"Rate limit for {model} would delay the call past its deadline")
+        self._count('throttled_seconds', delay)
+        return delay
+
+    def _retry_delay(self, model, attempt, error, deadline):
+        """Return how long to wait before retrying after ``error``, or raise it."""
+        if not is_retryable(error) or attempt >= self.max_retries:
+            self._count('failures')
+            raise error
+        delay = self._backoff(attempt, error)
+        if time.monotonic() + delay >= deadline:
+            self._count('failures')
+            raise DeadlineExceeded(f"Deadline exceeded retrying {model}: {error}") from error
+        print(f"⚠️ {model} request failed ({error}); retrying in {delay:.1f}s")
+        self._count('retries')
+        return delay
+
+    def _backoff(self, attempt, error):
+        delay = _retry_after(error)
+        if delay is None:
+            delay = random.uniform(0, min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2 ** attempt))
+        return delay
+
+    def call(self, model, request, tokens=0, deadline=None):
+        """Run ``request(timeout=...)`` for ``model`` and return its result.
+
+        ``tokens`` is the estimated token cost counted against the model's
+        tokens-per-minute limit. Non-transient errors are raised at once;
+        DeadlineExceeded is raised when the deadline leaves no time to retry.
+        """
+        deadline = time.monotonic() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            time.sleep(self._throttle_delay(model, tokens, deadline))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"Deadline exceeded calling {model}")
+            try:
+                self._count('requests')
+                if self._slots is None:
+                    return request(timeout=min(self.timeout, remaining))
+                with self._slots:
+                    return request(timeout=min(self.timeout, remaining))
+            except Exception as e: #pylint: disable=broad-except
+                time.sleep(self._retry_delay(model, attempt, e, deadline))
+                attempt += 1
+
+    @asynccontextmanager
+    async def _async_slot(self):
+        """Hold one of the ``max_concurrency`` slots without blocking the event loop.
+
+        The slots are shared with :meth:`call`, so they are polled rather than
+        awaited.
+        """
+        if self._slots is None:
+            yield
+            return
+        while not self._slots.acquire(blocking=False): #pylint: disable=consider-using-with
+            await asyncio.sleep(self.SLOT_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    async def acall(self, model, request, tokens=0, deadline=None):
+        """Like :meth:`call`, for a coroutine function ``request(timeout=...)``.
+
+        Throttling and backoff are awaited, so a waiting call holds no thread.
+        """
+        deadline = time.monotonic() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._throttle_delay(model, tokens, deadline))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"Deadline exceeded calling {model}")
+            try:
+                self._count('requests')
+                async with self._async_slot():
+                    return await request(timeout=min(self.timeout, remaining))
+            except Exception as e: #pylint: disable=broad-except
+                await asyncio.sleep(self._retry_delay(model, attempt, e, deadline))
+                attempt += 1
+
+    def metrics(self):
+        """Return counters describing the calls made so far."""
+        with self._lock:
+            return dict(self.stats)
+
+
+_client = None #pylint: disable=invalid-name
+_client_lock = threading.Lock()
+# One AsyncOpenAI per event loop, as its connection pool belongs to the loop it first ran on.
+_async_sdks = weakref.WeakKeyDictionary()
+
+
+def get_client():
+    """Return the process-wide client, so every request shares its rate limits."""
+    with _client_lock:
+        if _client is None:
+            configure(vars(Config))
+        return _client
+
+
+def get_async_openai():
+    """Return the AsyncOpenAI SDK client for the running event loop.
+
+    It follows the ``openai`` module's key and base URL, and leaves retries
+    to :meth:`OpenAIClient.acall`.
+    """
+    loop = asyncio.get_running_loop()
+    with _client_lock:
+        sdk = _async_sdks.get(loop)
+        if sdk is None:
+            sdk = openai.AsyncOpenAI(api_key=openai.api_key, base_url=openai.base_url,
+                                     max_retries=0)
+            _async_sdks[loop] = sdk
+        return sdk
+
+
+def configure(config):
+    """Build the process-wide client and point the ``openai`` module at its settings.
+
+    The SDK's own retries are turned off so that only this layer retries, and
+    OPENAI_BASE_URL can point the app at a local fake server for load tests.
+    """
+    global _client #pylint: disable=global-statement
+    openai.max_retries = 0
+    if config.get('OPENAI_BASE_URL'):
+        openai.base_url = config['OPENAI_BASE_URL']
+    _async_sdks.clear()
+    _client = OpenAIClient(
+        rate_limits=parse_rate_limits(config.get('OPENAI_RATE_LIMITS')),
+        max_concurrency=config.get('OPENAI_MAX_CONCURRENCY', 8),
+        max_retries=config.get('OPENAI_MAX_RETRIES', 5),
+        timeout=config.get('OPENAI_TIMEOUT', 120.0),
+        deadline=config.get('OPENAI_DEADLINE', 600.0)
+    )
+    return _client
+
+
+def init_app(app):
+    """Configure the process-wide OpenAI client from ``app.config`` and attach it."""
+    app.extensions['openai_client'] = configure(app.config)
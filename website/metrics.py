@@ -0,0 +1,331 @@
+'''Timing spans and counters for the pipeline, exported in the Prometheus text format.'''
+import bisect
+import functools
+import inspect
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, request
+
+# Seconds; spans range from a regex match to a multi-minute transcription.
+DURATION_BUCKETS = (0.001, 0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+AUDIO_BUCKETS = (30, 60, 300, 600, 1200, 1800, 3600, 7200, 14400)
+
+
+def _label_text(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    """A monotonically increasing value per label combination."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """Add ``amount`` to the series for ``labels``."""
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        """Yield ``(suffix, label_text, value)`` for every series."""
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield '_total', _label_text(self.labelnames, key), value
+
+
+class Histogram:
+    """Counts observations into cumulative buckets per label combination."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Record one observation in the series for ``labels``."""
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        """Yield ``(suffix, label_text, value)`` for every bucket, sum and count."""
+        with self._lock:
+            series = {key: (list(counts), total, count)
+                      for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                labels = _label_text(self.labelnames + ('le',), key + (bound,))
+                yield '_bucket', labels, cumulative
+            yield '_sum', _label_text(self.labelnames, key), total
+            yield '_count', _label_text(self.labelnames, key), count
+
+
+class Registry:
+    """Holds the process's metrics and renders them for a Prometheus scrape."""
+
+    def __init__(self, prefix='youtube_analyzer_'):
+        self.prefix = prefix
+        self._metrics = []
+
+    def counter(self, name, documentation, labelnames=()):
+        """Create and register a Counter."""
+        metric = Counter(self.prefix + name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        """Create and register a Histogram."""
+        metric = Histogram(self.prefix + name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self, gauges=()):
+        """Return every metric, plus ``gauges`` read at scrape time, as text.
+
+        ``gauges`` holds ``(name, help, samples)`` tuples, where ``samples``
+        maps a dict of labels, as a tuple of pairs, to a value.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                name = metric.name if suffix == '_total' and metric.name.endswith('_total') \
+                    else metric.name + suffix
+                lines.append(f"{name}{labels} {value}")
+        for name, documentation, samples in gauges:
+            lines.append(f"# HELP {self.prefix}{name} {documentation}")
+            lines.append(f"# TYPE {self.prefix}{name} gauge")
+            for labels, value in sorted(samples.items()):
+                label_text = _label_text([k for k, _ in labels], [v for _, v in labels])
+                lines.append(f"{self.prefix}{name}{label_text} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram(
+    'stage_duration_seconds', 'Time spent in each pipeline stage.', ('stage', 'outcome'))
+HTTP_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Time spent handling HTTP requests.',
+    ('endpoint', 'method', 'status'))
+DOWNLOAD_BYTES = REGISTRY.counter(
+    'download_bytes_total', 'Bytes of audio downloaded from YouTube.')
+AUDIO_SECONDS = REGISTRY.histogram(
+    'audio_duration_seconds', 'Duration of the videos downloaded.', buckets=AUDIO_BUCKETS)
+ADMISSIONS = REGISTRY.counter(
+    'admissions_total', 'Videos planned before download, by strategy.', ('strategy',))
+TOKENS = REGISTRY.counter(
+    'openai_tokens_total', 'Tokens used by OpenAI chat completions.', ('model', 'kind'))
+
+# The trace of the request or job running in this context, if any.
+_trace = ContextVar('trace', default=None)
+_trace_lock = threading.Lock()
+
+
+def _begin(fields):
+    current = dict(fields, spans=[])
+    return current, _trace.set(current), time.perf_counter()
+
+
+def _end(current, token, start):
+    current['duration_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    try:
+        _trace.reset(token)
+    except ValueError:
+        # A streamed response finishes in a different context than it started in.
+        _trace.set(None)
+
+
+@contextmanager
+def trace(**fields):
+    """Collect the spans and totals recorded inside the block into one dict.
+
+    The dict starts as ``fields`` and gains ``duration_ms``, ``spans`` and any
+    totals passed to :func:`record`.
+    """
+    current, token, start = _begin(fields)
+    try:
+        yield current
+    finally:
+        _end(current, token, start)
+
+
+@contextmanager
+def span(stage):
+    """Time the block as ``stage``; it counts as an error if it raises."""
+    start = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except BaseException:
+        outcome = 'error'
+        raise
+    finally:
+        _finish_span(stage, start, outcome)
+
+
+def _finish_span(stage, start, outcome):
+    elapsed = time.perf_counter() - start
+    STAGE_SECONDS.observe(elapsed, stage=stage, outcome=outcome)
+    current = _trace.get()
+    if current is not None:
+        with _trace_lock:
+            current['spans'].append({'stage': stage, 'ms': round(elapsed * 1000, 2),
+                                     'outcome': outcome})
+
+
+def timed(stage, ok=bool):
+    """Decorate a function so each call is recorded as a ``stage`` span.
+
+    ``ok(result)`` decides whether a call that returned succeeded, since most
+    pipeline functions report failure by returning None. Coroutine functions
+    are timed until they complete.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                outcome = 'error'
+                try:
+                    result = await func(*args, **kwargs)
+                    if ok(result):
+                        outcome = 'ok'
+                    return result
+                finally:
+                    _finish_span(stage, start, outcome)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = 'error'
+            try:
+                result = func(*args, **kwargs)
+                if ok(result):
+                    outcome = 'ok'
+                return result
+            finally:
+                _finish_span(stage, start, outcome)
+        return wrapper
+    return decorator
+
+
+def _add(name, value):
+    current = _trace.get()
+    if current is not None:
+        with _trace_lock:
+            current[name] = current.get(name, 0) + value
+
+
+def record_download(size, duration=None):
+    """Count a finished download of ``size`` bytes and ``duration`` seconds of audio."""
+    DOWNLOAD_BYTES.inc(size)
+    _add('download_bytes', size)
+    if duration:
+        AUDIO_SECONDS.observe(duration)
+        _add('audio_seconds', duration)
+
+
+def record_admission(strategy, minutes):
+    """Count a video admitted, or rejected, with ``strategy`` for ``minutes`` of audio."""
+    ADMISSIONS.inc(strategy=strategy)
+    _add('planned_audio_minutes', minutes)
+
+
+def record_tokens(model, prompt_tokens, completion_tokens):
+    """Count the tokens one chat completion used."""
+    TOKENS.inc(prompt_tokens, model=model, kind='prompt')
+    TOKENS.inc(completion_tokens, model=model, kind='completion')
+    _add('tokens', prompt_tokens + completion_tokens)
+
+
+def carry_trace(func):
+    """Wrap ``func`` so that, run on a worker thread, it records into the caller's trace."""
+    current = _trace.get()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _trace.set(current)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _trace.reset(token)
+    return wrapper
+
+
+def log(event):
+    """Print a trace as one JSON line."""
+    print(json.dumps(event, default=str))
+
+
+@contextmanager
+def logged_trace(enabled=True, **fields):
+    """Like :func:`trace`, then print the trace as a JSON line when ``enabled``."""
+    current = {}
+    try:
+        with trace(**fields) as current:
+            yield current
+    except Exception as e:
+        current['error'] = str(e)
+        raise
+    finally:
+        if enabled:
+            log(current)
+
+
+def init_app(app):
+    """Time every request and log it as a JSON line when METRICS_LOG_REQUESTS is set."""
+    log_requests = app.config['METRICS_LOG_REQUESTS']
+
+    @app.before_request
+    def start_trace():
+        g.metrics_trace = _begin({'kind': 'request', 'method': request.method,
+                                  'path': request.path})
+
+    @app.after_request
+    def remember_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def finish_trace(error=None):
+        started = g.pop('metrics_trace', None)
+        if started is None:
+            return
+        _end(*started)
+        event = started[0]
+        event['status'] = g.pop('metrics_status', 500 if error else None)
+        HTTP_SECONDS.observe(event['duration_ms'] / 1000,
+                             endpoint=request.endpoint or 'unknown',
+                             method=request.method, status=event['status'])
+        if log_requests:
+            log(event)
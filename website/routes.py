@@ -1,10 +1,36 @@
 '''Views for the Flask application.'''
+#pylint: disable=too-many-lines
+import glob
+import json
 import os
-import re
+import queue
 import subprocess
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager, nullcontext
+from flask import (Blueprint, render_template, request, redirect, url_for, flash, jsonify,
+                   send_file, current_app, has_app_context, stream_with_context,
+                   Response)
 import openai
 from dotenv import load_dotenv
+from config import Config
+from website.admission import caption_patterns
+from website.captions import Cue, parse_cues, dedupe_cues, to_plain_text, to_timestamped_text
+from website.audio import (split_audio, merge_transcripts, find_output_file, prepare_for_whisper,
+                           stream_segments)
+from website.chunking import Memo, count_tokens, split_by_tokens
+from website.downloader import get_pool
+from website.languages import language_name, parse_languages, supported_languages
+from website.llm import StreamInterrupted, get_client
+from website import metrics
+from website.metrics import timed, carry_trace
+from website.search import query_terms
+from website.segments import Transcript, SegmentIndex, encode, segments_of, shift_segments
+from website.storage import TRANSCRIPT, TIMESTAMPED_TRANSCRIPT, SEGMENTS
+from website.transcription import choose_engine, get_local_engine
+from website.urls import parse_video_url, playlist_url
 
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
@@ -14,22 +40,35 @@ main = Blueprint('main', __name__)
 STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
 os.makedirs(STATIC_DIR, exist_ok=True)
 
+TRANSCRIBE_MODEL = "whisper-1"
+SUMMARY_MODEL = "gpt-3.5-turbo"
+# Bump whenever the summarization or translation prompts change so cached summaries are
+# recomputed.
+SUMMARY_PROMPT_VERSION = 3
 
-def extract_video_id(url):
-    """Extract the YouTube video ID from a URL."""
-    patterns = [
-        r'(?:youtube\.com\/watch\?v=|youtu\.be\/)([A-Za-z0-9_-]{11})',
-        r'youtube\.com\/embed\/([A-Za-z0-9_-]{11})',
-        r'youtube\.com\/v\/([A-Za-z0-9_-]{11})'
-    ]
 
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
+class PipelineError(Exception):
+    """Raised when a stage of the processing pipeline fails."""
+
+    def __init__(self, message, status_code=500):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def get_setting(name):
+    """Read a setting from the app config, falling back to the Config defaults."""
+    if has_app_context():
+        return current_app.config.get(name, getattr(Config, name))
+    return getattr(Config, name)
 
-    return None
 
+def extract_video_id(url):
+    """Extract the YouTube video ID from a URL, or None; see website.urls.parse_video_url."""
+    ref = parse_video_url(url)
+    return ref.video_id if ref else None
+
+@timed('get_video_title', ok=lambda title: title != "Unknown Video")
 def get_video_title(video_id):
     """Fetch the video title using yt-dlp."""
     try:
@@ -45,45 +84,387 @@ def get_video_title(video_id):
         return "Unknown Video"
 
 
-def download_audio(video_id):
-    """Download audio from YouTube using yt-dlp and get title.""" ##with the cookies now
-    try:
-        url = f"https://www.youtube.com/watch?v={video_id}"
-        print(f"Downloading audio from: {url}")
+COOKIES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cookies.txt")
+# Prefer audio-only streams Whisper accepts as-is (AAC in m4a, Opus in webm).
+NATIVE_AUDIO_FORMATS = "bestaudio[ext=m4a]/bestaudio[ext=webm]/bestaudio/best"
+
+
+def parse_video_metadata(info):
+    """Reduce a yt-dlp info dict to the fields the pipeline uses."""
+    return {
+        'video_id': info.get('id'),
+        'title': info.get('title'),
+        'duration': info.get('duration'),
+        'channel': info.get('channel') or info.get('uploader'),
+        'is_live': bool(info.get('is_live')),
+        'caption_languages': sorted(info.get('subtitles') or {}),
+        'auto_caption_languages': sorted(info.get('automatic_captions') or {}),
+        'formats': [
+            {
+                'format_id': fmt.get('format_id'),
+                'ext': fmt.get('ext'),
+                'acodec': fmt.get('acodec'),
+                'vcodec': fmt.get('vcodec'),
+                'abr': fmt.get('abr'),
+                'filesize': fmt.get('filesize') or fmt.get('filesize_approx')
+            }
+            for fmt in info.get('formats') or []
+            if fmt.get('acodec') not in (None, 'none')
+        ]
+    }
+
 
-        audio_file = os.path.join(STATIC_DIR, f"video_audio_{video_id}.mp3")
-        cookies_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cookies.txt")
+def _downloaded_path(info, base):
+    """Return the path yt-dlp wrote the audio to for the template ``base.%(ext)s``."""
+    downloads = (info or {}).get('requested_downloads') or [{}]
+    path = downloads[0].get('filepath') or (info or {}).get('_filename')
+    if path and os.path.exists(path):
+        return path
+    return find_output_file(base)
 
+
+def first_json_line(output):
+    """Return the first JSON object printed by yt-dlp, or None."""
+    for line in (output or '').splitlines():
+        line = line.strip()
+        if line.startswith('{'):
+            try:
+                return json.loads(line)
+            except ValueError:
+                continue
+    return None
+
+
+def expand_playlist(url):
+    """Return the video IDs of a playlist using a single flat yt-dlp metadata call."""
+    try:
         command = [
             "yt-dlp",
-            "--cookies", cookies_path, 
-            "-x",
-            "--audio-format", "mp3",
-            "-o", audio_file,
+            "--cookies", COOKIES_PATH,
+            "--flat-playlist",
+            "--dump-single-json",
             url
         ]
+        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        info = first_json_line(result.stdout) or {}
+        return [entry['id'] for entry in info.get('entries') or [] if entry.get('id')]
+    except Exception as e: #pylint: disable=broad-except
+        print(f"❌ Error expanding playlist: {e}")
+        return None
 
-        print(f"Executing command: {' '.join(command)}")
-        result = subprocess.run(command, capture_output=True, text=True)#pylint: disable=subprocess-run-check)
 
-        if result.returncode != 0:
-            print(f"❌ Error executing yt-dlp: {result.stderr}")
-            return None, None
+def _ydl_pool():
+    """Return the warm YoutubeDL pool used by the in-process download backend."""
+    audio_format = None if get_setting('AUDIO_FORMAT') == 'native' else 'mp3'
+    return get_pool(get_setting('DOWNLOAD_POOL_SIZE'), COOKIES_PATH, audio_format)
 
-        print(f"✅ Successfully downloaded audio to: {audio_file}")
 
-        video_title = get_video_title(video_id)
+def probe_command(video_id):
+    """Return the yt-dlp command that prints a video's info JSON without downloading it."""
+    return [
+        "yt-dlp",
+        "--cookies", COOKIES_PATH,
+        "--dump-json",
+        "--skip-download",
+        f"https://www.youtube.com/watch?v={video_id}"
+    ]
+
 
-        return audio_file, video_title
+def probe_video(video_id):
+    """Fetch video metadata (title, duration, channel, formats) without downloading."""
+    try:
+        if get_setting('DOWNLOAD_BACKEND') == 'inprocess':
+            return parse_video_metadata(_ydl_pool().extract_info(video_id))
+
+        result = subprocess.run(probe_command(video_id), capture_output=True, text=True,
+                                check=True)
+        info = first_json_line(result.stdout)
+        return parse_video_metadata(info) if info else None
+    except Exception as e: #pylint: disable=broad-except
+        print(f"❌ Error probing video: {e}")
+        return None
+
+
+def yt_dlp_command(url, audio_file, native):
+    """Return the yt-dlp command that downloads audio and prints the video's info JSON."""
+    base = os.path.splitext(audio_file)[0]
+    if native:
+        format_args = ["-f", NATIVE_AUDIO_FORMATS, "-o", f"{base}.%(ext)s"]
+    else:
+        format_args = ["-x", "--audio-format", "mp3", "-o", audio_file]
+
+    return [
+        "yt-dlp",
+        "--cookies", COOKIES_PATH,
+        *format_args,
+        "--dump-json", "--no-simulate",
+        url
+    ]
+
+
+def _yt_dlp_download(url, audio_file, native):
+    """Run the yt-dlp CLI once to download audio and print the video's info JSON.
+
+    Returns the info dict, or None if yt-dlp printed none; raises on failure.
+    """
+    command = yt_dlp_command(url, audio_file, native)
+    print(f"Executing command: {' '.join(command)}")
+    result = subprocess.run(command, capture_output=True, text=True)#pylint: disable=subprocess-run-check)
+
+    if result.returncode != 0:
+        raise RuntimeError(f"yt-dlp failed: {result.stderr}")
+
+    return first_json_line(result.stdout)
+
+
+def download_audio_with_metadata(video_id):
+    """Download audio and read the video's metadata in a single yt-dlp run.
+
+    DOWNLOAD_BACKEND selects between spawning the yt-dlp CLI ("subprocess")
+    and a pool of warm in-process YoutubeDL instances ("inprocess").
+    AUDIO_FORMAT "mp3" re-encodes every download to MP3; "native" keeps the
+    source audio stream and only transcodes when Whisper needs it to.
+
+    Inside the app, audio lives in the managed scratch area and a file already
+    downloaded for the same video is reused.
+
+    Returns ``(audio_file, metadata)``, or ``(None, None)`` on failure.
+    """
+    try:
+        scratch = current_app.extensions.get('audio_scratch') if has_app_context() else None
+        if scratch:
+            reused = scratch.find(video_id)
+            if reused:
+                print(f"✅ Reusing downloaded audio: {reused[0]}")
+                return reused
+
+        url = f"https://www.youtube.com/watch?v={video_id}"
+        print(f"Downloading audio from: {url}")
+
+        native = get_setting('AUDIO_FORMAT') == 'native'
+        audio_file = download_target(video_id, scratch)
+
+        if get_setting('DOWNLOAD_BACKEND') == 'inprocess':
+            info = _ydl_pool().download(video_id, audio_file)
+        else:
+            info = _yt_dlp_download(url, audio_file, native)
+        return finish_download(video_id, audio_file, info, scratch)
 
     except Exception as e: #pylint: disable=broad-except
         print(f"❌ Error downloading audio: {e}")
         return None, None
 
 
+def download_target(video_id, scratch):
+    """Return the path to download a video's audio to: in the scratch area, if there is one."""
+    audio_dir = scratch.directory() if scratch else STATIC_DIR
+    return os.path.join(audio_dir, f"video_audio_{video_id}.mp3")
+
+
+def finish_download(video_id, audio_file, info, scratch):
+    """Locate, measure and prepare downloaded audio; return ``(audio_file, metadata)``.
+
+    ``info`` is the info dict yt-dlp printed, if any. Raises when the
+    download cannot be found.
+    """
+    if get_setting('AUDIO_FORMAT') == 'native':
+        audio_file = _downloaded_path(info, os.path.splitext(audio_file)[0])
+        if not audio_file:
+            raise RuntimeError("yt-dlp did not report the downloaded file")
+
+    print(f"✅ Successfully downloaded audio to: {audio_file}")
+
+    if info:
+        metadata = parse_video_metadata(info)
+    else:
+        metadata = {'video_id': video_id, 'title': get_video_title(video_id),
+                    'duration': None, 'channel': None, 'formats': []}
+
+    if get_setting('AUDIO_FORMAT') == 'native' or os.path.exists(audio_file):
+        metrics.record_download(os.path.getsize(audio_file), metadata.get('duration'))
+        audio_file = prepare_for_whisper(audio_file,
+                                         get_setting('AUDIO_TRANSCODE_THRESHOLD'),
+                                         get_setting('AUDIO_SPEECH_BITRATE'))
+
+    if scratch:
+        scratch.save_metadata(video_id, metadata)
+        scratch.sweep()
+
+    return audio_file, metadata
+
+
+@timed('download', ok=lambda result: result[0])
+def download_audio(video_id):
+    """Download audio from YouTube using yt-dlp and get title."""
+    audio_file, metadata = download_audio_with_metadata(video_id)
+    if not audio_file:
+        return None, None
+    return audio_file, metadata['title'] or "Unknown Video"
 
-def transcribe_audio(audio_file):
-    """Transcribe audio file using OpenAI Whisper API."""
+
+CAPTION_SOURCES = {'manual': 'manual_captions', 'auto': 'auto_captions'}
+
+
+def _caption_tracks(info, work_dir):
+    """Yield ``(kind, language, path)`` for the caption files yt-dlp wrote, best first.
+
+    Manual tracks come before automatic ones; within each kind the order of
+    CAPTION_LANGUAGES is kept.
+    """
+    manual = set((info or {}).get('subtitles') or {})
+    files = [path for path in glob.glob(os.path.join(glob.escape(work_dir), "captions.*"))
+             if path.endswith(('.vtt', '.srt'))]
+    tracks = []
+    for path in files:
+        language = os.path.basename(path)[len("captions."):].rsplit('.', 1)[0]
+        tracks.append(('manual' if language in manual else 'auto', language, path))
+
+    patterns = caption_patterns(get_setting('CAPTION_LANGUAGES'))
+    def rank(track):
+        kind, language, _ = track
+        order = next((i for i, p in enumerate(patterns) if p.match(language)), len(patterns))
+        return (kind != 'manual', order, language)
+    yield from sorted(tracks, key=rank)
+
+
+@timed('fetch_captions')
+def fetch_captions(video_id):
+    """Fetch the video's best acceptable caption track with yt-dlp, without the media.
+
+    CAPTIONS_MODE "manual" only accepts captions uploaded by the channel;
+    "any" also accepts YouTube's automatic ones. Tracks with fewer than
+    CAPTIONS_MIN_WORDS words are rejected.
+
+    Returns a dict with the title, plain ``text``, ``timestamped`` text, the
+    cues as ``(start, end, text)`` ``segments``, the ``source``
+    ("manual_captions" or "auto_captions") and ``language``, or None when
+    there is no acceptable track or yt-dlp fails.
+    """
+    try:
+        with tempfile.TemporaryDirectory(prefix="captions_") as work_dir:
+            command = captions_command(video_id, work_dir)
+            result = subprocess.run(command, capture_output=True, text=True, check=True)
+            return pick_captions(video_id, first_json_line(result.stdout) or {}, work_dir)
+    except Exception as e: #pylint: disable=broad-except
+        print(f"❌ Error fetching captions: {e}")
+        return None
+
+
+def captions_command(video_id, work_dir):
+    """Return the yt-dlp command that writes a video's caption tracks to ``work_dir``."""
+    return [
+        "yt-dlp",
+        "--cookies", COOKIES_PATH,
+        "--skip-download",
+        "--write-subs",
+        *(["--write-auto-subs"] if get_setting('CAPTIONS_MODE') == 'any' else []),
+        "--sub-langs", get_setting('CAPTION_LANGUAGES'),
+        "--sub-format", "vtt/srt/best",
+        "-o", os.path.join(work_dir, "captions.%(ext)s"),
+        "--dump-json", "--no-simulate",
+        f"https://www.youtube.com/watch?v={video_id}"
+    ]
+
+
+def pick_captions(video_id, info, work_dir):
+    """Return the best acceptable track yt-dlp wrote to ``work_dir``, as fetch_captions does."""
+    for kind, language, path in _caption_tracks(info, work_dir):
+        with open(path, encoding='utf-8') as f:
+            cues = parse_cues(f.read())
+        if kind == 'auto':
+            cues = dedupe_cues(cues)
+        text = to_plain_text(cues)
+        if len(text.split()) < get_setting('CAPTIONS_MIN_WORDS'):
+            continue
+        print(f"✅ Using {kind} {language} captions for {video_id}")
+        return {
+            'title': info.get('title') or get_video_title(video_id),
+            'text': text,
+            'timestamped': to_timestamped_text(cues),
+            'segments': [tuple(cue) for cue in cues],
+            'source': CAPTION_SOURCES[kind],
+            'language': language
+        }
+    print(f"No acceptable captions for {video_id}; transcribing the audio")
+    return None
+
+
+@timed('openai_transcription')
+def _whisper(audio_file):
+    """Send one audio file to the Whisper API and return its Transcript, with timed segments."""
+    with open(audio_file, "rb") as audio:
+        def send(timeout):
+            audio.seek(0)
+            return openai.audio.transcriptions.create(
+                model=TRANSCRIBE_MODEL,
+                file=audio,
+                response_format="verbose_json",
+                timeout=timeout
+            )
+        transcript = get_client().call(TRANSCRIBE_MODEL, send)
+    return Transcript(transcript.text, segments_of(transcript))
+
+
+@timed('local_transcription')
+def local_whisper(audio_file):
+    """Transcribe one audio file with the warm local faster-whisper model."""
+    engine = get_local_engine(get_setting('LOCAL_WHISPER_MODEL'),
+                              get_setting('LOCAL_WHISPER_COMPUTE_TYPE'),
+                              get_setting('LOCAL_WHISPER_WORKERS'),
+                              get_setting('LOCAL_WHISPER_BATCH_SIZE'))
+    return engine.transcribe(audio_file)
+
+
+def select_engine(file_size):
+    """Return the TRANSCRIBE_ENGINE that should handle a file of ``file_size`` bytes."""
+    return choose_engine(get_setting('TRANSCRIBE_ENGINE'), file_size,
+                         get_setting('LOCAL_WHISPER_MAX_BYTES'))
+
+
+def _transcribe_file(audio_file):
+    """Transcribe one file small enough for a single request, with the selected engine."""
+    if get_setting('TRANSCRIBE_ENGINE') != 'openai' and \
+            select_engine(os.path.getsize(audio_file)) == 'local':
+        return local_whisper(audio_file)
+    return _whisper(audio_file)
+
+
+def transcribe_in_chunks(audio_file):
+    """Transcribe a long audio file as overlapping chunks on a thread pool."""
+    chunk_seconds = get_setting('TRANSCRIBE_CHUNK_SECONDS')
+    overlap_seconds = get_setting('TRANSCRIBE_CHUNK_OVERLAP')
+    workers = get_setting('TRANSCRIBE_WORKERS')
+
+    with tempfile.TemporaryDirectory(prefix="chunks_") as chunk_dir:
+        chunks = split_audio(audio_file, chunk_dir, chunk_seconds, overlap_seconds)
+        print(f"Transcribing {len(chunks)} chunks with {workers} workers...")
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as pool:
+            texts = list(pool.map(carry_trace(_whisper), [path for path, _ in chunks]))
+
+    segments = shift_segments((start, getattr(text, 'segments', ()))
+                              for (_, start), text in zip(chunks, texts))
+    return Transcript(merge_transcripts(texts), segments)
+
+
+def needs_chunks(file_size, strategy=None):
+    """Whether to split an audio file for the Whisper API.
+
+    A "chunked" admission plan is followed even when the file came out
+    smaller than estimated; any file over TRANSCRIBE_CHUNK_THRESHOLD is
+    split, whatever the plan, since the API would reject it.
+    """
+    return strategy == 'chunked' or file_size > get_setting('TRANSCRIBE_CHUNK_THRESHOLD')
+
+
+@timed('transcribe')
+def transcribe_audio(audio_file, strategy=None):
+    """Transcribe audio file using OpenAI Whisper API or the local engine.
+
+    TRANSCRIBE_ENGINE picks the engine, by file size when it is "auto". Files
+    sent to the API above the chunking threshold (it rejects uploads over
+    25MB) are split and transcribed in parallel, as are all files of an
+    admission Plan whose ``strategy`` is "chunked".
+    """
     try:
         print(f"Transcribing: {audio_file}")
 
@@ -93,50 +474,699 @@ def transcribe_audio(audio_file):
 
         file_size = os.path.getsize(audio_file)
         print(f"File size: {file_size} bytes")
-        if file_size > 25 * 1024 * 1024:
-            print("❌ File too large for OpenAI API (>25MB)")
-            return "File too large for transcription. Please try a shorter video."
-
-        with open(audio_file, "rb") as audio:
+        if select_engine(file_size) == 'local':
+            print("Transcribing with the local Whisper model...")
+            text = local_whisper(audio_file)
+        elif needs_chunks(file_size, strategy):
+            text = transcribe_in_chunks(audio_file)
+        else:
             print("Sending file to OpenAI Whisper API...")
-            transcript = openai.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio
-            )
+            text = _whisper(audio_file)
 
         print("✅ Transcription successful")
-
-        transcript_path = os.path.join(STATIC_DIR, "transcription.txt")
-        with open(transcript_path, "w") as f: #pylint: disable=unspecified-encoding
-            f.write(transcript.text)
-
-        return transcript.text
+        return text
 
     except Exception as e:#pylint: disable=broad-except
         print(f"❌ Error transcribing audio: {e}")
         return None
 
 
-def summarize_text(text):
-    """Summarize transcribed text using OpenAI GPT-3.5."""
+SUMMARY_SYSTEM_PROMPT = "You are assistant that summarizes video transcripts."
+SUMMARY_PROMPT = "Please summarize the following transcript concisely in {language}:\n\n{text}"
+CHUNK_PROMPT = ("This is part {part} of {total} of a video transcript. "
+                "Summarize the key points of this part concisely:\n\n{text}")
+OPEN_CHUNK_PROMPT = ("This is part {part} of a video transcript that is still being "
+                     "transcribed. Summarize the key points of this part concisely:\n\n{text}")
+COMBINE_PROMPT = ("These are summaries of consecutive parts of one video transcript. "
+                  "Combine them into a single concise summary in {language}:\n\n{text}")
+TRANSLATE_PROMPT = ("Translate this summary of a video transcript into {language}. Keep its "
+                    "structure and reply with the translation only:\n\n{text}")
+
+chunk_summaries = Memo()
+
+
+def completion_request(prompt, max_tokens, timeout):
+    """Return the chat completion arguments for summarizing with ``prompt``."""
+    return {
+        'model': SUMMARY_MODEL,
+        'messages': [
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        'max_tokens': max_tokens,
+        'timeout': timeout
+    }
+
+
+def _record_usage(usage):
+    if isinstance(getattr(usage, 'total_tokens', None), int):
+        metrics.record_tokens(SUMMARY_MODEL, usage.prompt_tokens, usage.completion_tokens)
+
+
+def completion_text(response):
+    """Record a chat completion's token usage and return its text."""
+    _record_usage(getattr(response, 'usage', None))
+    return response.choices[0].message.content
+
+
+class StreamedText:
+    """Assembles a streamed completion, passing each piece of text to ``on_delta``.
+
+    Used as a context manager around reading the stream: an error after some
+    text was passed on is raised as StreamInterrupted, so it is not retried.
+    """
+
+    def __init__(self, on_delta):
+        self.on_delta = on_delta
+        self.parts = []
+
+    def add(self, chunk):
+        """Take one stream chunk, recording token usage if it reports it."""
+        _record_usage(getattr(chunk, 'usage', None))
+        choices = getattr(chunk, 'choices', None)
+        text = (choices[0].delta.content or '') if choices else ''
+        if text:
+            self.parts.append(text)
+            self.on_delta(text)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, error, traceback):
+        if isinstance(error, Exception) and self.parts:
+            raise StreamInterrupted(f"Summary stream interrupted: {error}") from error
+
+    def text(self):
+        """The text received so far."""
+        return ''.join(self.parts)
+
+
+@timed('openai_completion')
+def _complete(prompt, max_tokens=500, on_delta=None):
+    """Run one summarization chat completion and return its text.
+
+    With ``on_delta`` the completion is streamed and each piece of text is
+    passed to it as it arrives; a stream that fails before its first piece
+    is retried like any other call.
+    """
+    def send(timeout):
+        arguments = completion_request(prompt, max_tokens, timeout)
+        if on_delta is None:
+            return completion_text(openai.chat.completions.create(**arguments))
+        with StreamedText(on_delta) as streamed:
+            for chunk in openai.chat.completions.create(
+                    stream=True, stream_options={'include_usage': True}, **arguments):
+                streamed.add(chunk)
+        return streamed.text()
+    return get_client().call(SUMMARY_MODEL, send, tokens=count_tokens(prompt) + max_tokens)
+
+
+def summarize_chunk(text, part, total=None):
+    """Summarize one chunk of a transcript, memoized on its content and position.
+
+    ``total`` is None while the transcript is still streaming in.
+    """
+    key = Memo.key(SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, part, total, text)
+    summary = chunk_summaries.get(key)
+    if summary is None:
+        prompt = CHUNK_PROMPT if total else OPEN_CHUNK_PROMPT
+        summary = _complete(prompt.format(part=part, total=total, text=text))
+        chunk_summaries.put(key, summary)
+    return summary
+
+
+def map_reduce_summary(text, max_tokens, workers, on_delta=None, language='en'): #pylint: disable=too-many-arguments,too-many-positional-arguments
+    """Summarize chunks of ``text`` in parallel, then combine the partial summaries.
+
+    The combine step recurses while the joined partial summaries are still too
+    long for a single request, and writes the summary in ``language``. Only
+    the final combine is streamed to ``on_delta``.
+    """
+    chunks = split_by_tokens(text, max_tokens)
+    print(f"Summarizing {len(chunks)} chunks with {workers} workers...")
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as pool:
+        futures = [pool.submit(carry_trace(summarize_chunk), chunk, i + 1, len(chunks))
+                   for i, chunk in enumerate(chunks)]
+        partials = [future.result() for future in futures]
+
+    combined = "\n\n".join(partials)
+    if count_tokens(combined) > max_tokens and len(partials) > 1:
+        return map_reduce_summary(combined, max_tokens, workers, on_delta, language)
+    return _complete(COMBINE_PROMPT.format(text=combined, language=language_name(language)),
+                     on_delta=on_delta)
+
+
+@timed('summarize')
+def summarize_text(text, on_delta=None, language=None):
+    """Summarize transcribed text using OpenAI GPT-3.5, in ``language`` (SUMMARY_LANGUAGE).
+
+    Transcripts longer than SUMMARY_CHUNK_TOKENS are summarized map-reduce
+    style; chunk summaries are memoized so a retry only redoes failed chunks.
+    With ``on_delta`` the final summary is streamed to it as it is generated.
+    """
     try:
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-            {"role": "system", "content":"You are assistant that summarizes video transcripts."},
-    {"role": "user", "content": f"Please summarize the following transcript concisely:\n\n{text}"}
-            ],
-            max_tokens=500
-        )
-        return response.choices[0].message.content
+        language = language or get_setting('SUMMARY_LANGUAGE')
+        max_tokens = get_setting('SUMMARY_CHUNK_TOKENS')
+        if count_tokens(text) <= max_tokens:
+            return _complete(SUMMARY_PROMPT.format(text=text, language=language_name(language)),
+                             on_delta=on_delta)
+        return map_reduce_summary(text, max_tokens, get_setting('SUMMARY_WORKERS'), on_delta,
+                                  language)
     except Exception as e: #pylint: disable=broad-except
         print(f"❌ Error summarizing text: {e}")
         return None
 
+
+def translation_tokens(summary):
+    """Return the completion tokens to allow for translating ``summary``.
+
+    Other scripts can take more tokens for the same text.
+    """
+    return max(500, 2 * count_tokens(summary))
+
+
+@timed('translate')
+def translate_summary(summary, language, on_delta=None):
+    """Translate a summary into ``language`` with a single completion, or return None on failure."""
+    try:
+        return _complete(TRANSLATE_PROMPT.format(text=summary, language=language_name(language)),
+                         translation_tokens(summary), on_delta=on_delta)
+    except Exception as e: #pylint: disable=broad-except
+        print(f"❌ Error translating summary into {language}: {e}")
+        return None
+
+class IncrementalSummarizer:
+    """Summarizes a transcript as it arrives, one SUMMARY_CHUNK_TOKENS piece at a time."""
+
+    def __init__(self, executor, limiter, max_tokens):
+        self._executor = executor
+        self._limiter = limiter
+        self.max_tokens = max_tokens
+        self._buffer = ''
+        self._buffer_tokens = 0
+        self._partials = []
+
+    def _summarize_part(self, text, part):
+        with self._limiter.stage('llm'):
+            return summarize_chunk(text, part)
+
+    def add(self, text):
+        """Append transcript text, starting a partial summary once enough has built up."""
+        text = text.strip()
+        if not text:
+            return
+        self._buffer = f"{self._buffer} {text}" if self._buffer else text
+        # A running total, so the buffer is not re-tokenized for every segment.
+        self._buffer_tokens += count_tokens(text)
+        if self._buffer_tokens >= self.max_tokens:
+            self._partials.append(self._executor.submit(
+                carry_trace(self._summarize_part), self._buffer, len(self._partials) + 1))
+            self._buffer, self._buffer_tokens = '', 0
+
+    def finish(self, transcript):
+        """Return the summary of the whole transcript, combining any partial summaries."""
+        language = get_setting('SUMMARY_LANGUAGE')
+        if not self._partials:
+            with self._limiter.stage('llm'):
+                return summarize_text(transcript)
+
+        summaries = [future.result() for future in self._partials]
+        if self._buffer:
+            summaries.append(self._summarize_part(self._buffer, len(summaries) + 1))
+        combined = "\n\n".join(summaries)
+        with self._limiter.stage('llm'):
+            if count_tokens(combined) > self.max_tokens:
+                return map_reduce_summary(combined, self.max_tokens,
+                                          get_setting('SUMMARY_WORKERS'), language=language)
+            return _complete(COMBINE_PROMPT.format(text=combined,
+                                                   language=language_name(language)))
+
+
+def _read_info_json(directory):
+    """Return the first yt-dlp info JSON written to ``directory``, or None."""
+    for path in glob.glob(os.path.join(glob.escape(directory), "*.info.json")):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return None
+
+
+def _transcribe_segments(segments, summarizer, on_stage, on_downloaded):
+    """Transcribe segments in parallel as they arrive, feeding texts to ``summarizer`` in order."""
+    texts, pending = [], deque()
+    with ThreadPoolExecutor(max_workers=max(1, get_setting('TRANSCRIBE_WORKERS'))) as pool:
+        def collect(block):
+            while pending and (block or pending[0].done()):
+                texts.append(pending.popleft().result())
+                summarizer.add(texts[-1])
+
+        for segment in segments:
+            if not texts and not pending:
+                on_stage('transcribing')
+            pending.append(pool.submit(carry_trace(_transcribe_file), segment))
+            collect(block=False)
+        on_downloaded()
+        collect(block=True)
+    # Segments are cut back to back, so there is no overlap to remove when joining them.
+    seconds = get_setting('STREAM_SEGMENT_SECONDS')
+    return Transcript(" ".join(text.strip() for text in texts if text and text.strip()),
+                      shift_segments((index * seconds, getattr(text, 'segments', ()))
+                                     for index, text in enumerate(texts)))
+
+
+def run_streaming_pipeline(video_id, on_stage=None):
+    """Overlap download, transcription and summarization for one video.
+
+    Segments are sent to Whisper as soon as the segmenter finishes them, and
+    once enough transcript has accumulated a partial summary is started for
+    it, so total latency approaches that of the slowest stage rather than the
+    sum of all three. Segment boundaries are hard cuts, so a word spanning one
+    may be transcribed imperfectly.
+
+    Returns ``(video_title, transcript, summary, timings)``, where ``timings``
+    holds the seconds from the start at which each stage finished; raises
+    PipelineError.
+    """
+    on_stage = on_stage or (lambda stage: None)
+    limiter = current_app.extensions['stage_limiter']
+    started = time.perf_counter()
+    timings = {}
+
+    with tempfile.TemporaryDirectory(prefix="stream_") as work_dir, \
+         ThreadPoolExecutor(max_workers=max(1, get_setting('SUMMARY_WORKERS'))) as llm_pool:
+        summarizer = IncrementalSummarizer(llm_pool, limiter, get_setting('SUMMARY_CHUNK_TOKENS'))
+        try:
+            with limiter.stage('download'), limiter.stage('transcribe'), \
+                 metrics.span('stream_transcribe'):
+                on_stage('downloading')
+                with closing(stream_segments(f"https://www.youtube.com/watch?v={video_id}",
+                                             work_dir, get_setting('STREAM_SEGMENT_SECONDS'),
+                                             COOKIES_PATH)) as segments:
+                    transcript = _transcribe_segments(
+                        segments, summarizer, on_stage,
+                        lambda: timings.setdefault('download', time.perf_counter() - started))
+                timings['transcription'] = time.perf_counter() - started
+        except Exception as e: #pylint: disable=broad-except
+            print(f"❌ Error in streaming pipeline: {e}")
+            raise PipelineError('Failed to download and transcribe the audio') from e
+        if not transcript:
+            raise PipelineError('Failed to transcribe the audio')
+        info = _read_info_json(work_dir) or {}
+
+        on_stage('summarizing')
+        try:
+            summary = summarizer.finish(transcript)
+        except Exception as e: #pylint: disable=broad-except
+            print(f"❌ Error summarizing text: {e}")
+            summary = None
+    timings['summarization'] = time.perf_counter() - started
+
+    print(f"⏱ Stage timings for {video_id}: " +
+          ", ".join(f"{stage} done at {seconds:.1f}s" for stage, seconds in timings.items()))
+    return info.get('title') or get_video_title(video_id), transcript, summary, timings
+
+
+def summary_languages(languages=None):
+    """Return the languages to summarize in: ``languages``, or SUMMARY_LANGUAGE alone."""
+    return tuple(languages or ()) or (get_setting('SUMMARY_LANGUAGE'),)
+
+
+def _cached_summaries(video_id, languages):
+    """Return the cached summaries of a video among ``languages``, by language."""
+    cache = current_app.extensions.get('result_cache')
+    summaries = {}
+    for language in languages if cache else ():
+        summary = cache.get_summary(video_id, SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, language)
+        if summary is not None:
+            summaries[language] = summary
+    return summaries
+
+
+def get_cached_result(video_id, languages=None):
+    """Return the complete cached result for a video in ``languages``, or None on a miss."""
+    cache = current_app.extensions.get('result_cache')
+    if not cache:
+        return None
+
+    cached = cache.get_video(video_id, TRANSCRIBE_MODEL)
+    if not cached:
+        return None
+    languages = summary_languages(languages)
+    summaries = _cached_summaries(video_id, languages)
+    if len(summaries) < len(languages):
+        return None
+
+    return pipeline_result(video_id, cached['title'], cached['transcript'], cached['source'],
+                           summaries[languages[0]], {language: summaries[language]
+                                                     for language in languages})
+
+
+def download_and_transcribe(video_id, on_stage, strategy=None):
+    """Run the download and transcription stages one after the other.
+
+    ``strategy`` is the admission Plan's, if there is one; see transcribe_audio.
+    """
+    limiter = current_app.extensions['stage_limiter']
+    scratch = current_app.extensions.get('audio_scratch')
+    with scratch.pin(video_id) if scratch else nullcontext():
+        with limiter.stage('download'):
+            on_stage('downloading')
+            audio_file, video_title = download_audio(video_id)
+        if not audio_file:
+            raise PipelineError('Failed to download audio from the video')
+
+        with limiter.stage('transcribe'):
+            on_stage('transcribing')
+            transcript = transcribe_audio(audio_file, strategy=strategy)
+        if not transcript:
+            raise PipelineError('Failed to transcribe the audio')
+
+    return video_title, transcript
+
+
+def plan_admission(video_id):
+    """Probe a video and return the admission Plan for it, before anything is downloaded.
+
+    Returns None when admission control is off or the probe failed, in which
+    case the video is processed as it would be without it.
+    """
+    policy = current_app.extensions.get('admission')
+    if policy is None:
+        return None
+    return plan_probed(video_id, policy, probe_video(video_id))
+
+
+def plan_probed(video_id, policy, metadata):
+    """Return ``policy``'s Plan for a video's probe_video ``metadata``, as plan_admission does."""
+    if metadata is None:
+        print(f"⚠️ Could not probe {video_id}; admitting it without a plan")
+        return None
+    plan = policy.plan(metadata)
+    metrics.record_admission(plan.strategy, plan.minutes)
+    print(f"Admission plan for {video_id}: {plan.strategy} ({plan.reason}; "
+          f"{plan.minutes:.1f} min, ~{plan.upload_bytes} bytes to transcribe)")
+    return plan
+
+
+@contextmanager
+def audio_allowance(plan, client):
+    """Admit a plan's audio for the block, charging its minutes to ``client``'s quota.
+
+    Raises PipelineError when the plan rejects the video or the minutes do
+    not fit in the client's quota. The minutes are refunded if the block
+    fails.
+    """
+    if plan is None:
+        yield
+        return
+    if plan.strategy == 'reject':
+        raise PipelineError(plan.reason, 413)
+    quota = current_app.extensions['audio_quota']
+    if client is None or not plan.minutes:
+        yield
+        return
+    if not quota.charge(client, plan.minutes):
+        remaining = quota.remaining(client)
+        raise PipelineError(f"Audio quota exceeded: this video is {plan.minutes:.0f} minutes "
+                            f"and {remaining:.0f} remain", 429)
+    try:
+        yield
+    except BaseException:
+        quota.refund(client, plan.minutes)
+        raise
+
+
+def transcribe_video(video_id, on_stage, client=None):
+    """Produce a video's transcript, from its captions when they are acceptable.
+
+    With admission control on, the video is planned from its metadata first:
+    captions are only fetched when it lists suitable tracks, and audio is
+    only downloaded once the plan is admitted for ``client``.
+
+    Returns ``(video_title, transcript, summary, source)``; ``summary`` is
+    only set when the streaming pipeline already produced one.
+    """
+    plan = plan_admission(video_id)
+    if get_setting('CAPTIONS_MODE') != 'off' and (plan is None or plan.strategy == 'captions'):
+        with current_app.extensions['stage_limiter'].stage('download'):
+            on_stage('downloading')
+            captions = fetch_captions(video_id)
+        if captions:
+            current_app.extensions['artifact_store'].write_text(
+                video_id, TIMESTAMPED_TRANSCRIPT, captions['timestamped'])
+            transcript = Transcript(captions['text'], captions.get('segments', ()))
+            return captions['title'], transcript, None, captions['source']
+        plan = plan.fallback if plan else None
+
+    with audio_allowance(plan, client):
+        if get_setting('PIPELINE_MODE') == 'streaming':
+            video_title, transcript, summary, _ = run_streaming_pipeline(video_id, on_stage)
+            return video_title, transcript, summary, 'whisper'
+        video_title, transcript = download_and_transcribe(video_id, on_stage,
+                                                          plan.strategy if plan else None)
+    return video_title, transcript, None, 'whisper'
+
+
+def _store_segments(video_id, transcript, source):
+    """Write the timed segments a transcript carries, if any, as the video's SEGMENTS artifact."""
+    segments = getattr(transcript, 'segments', None)
+    if not segments:
+        return
+    store = current_app.extensions['artifact_store']
+    store.write_bytes(video_id, SEGMENTS, encode(segments))
+    if source == 'whisper':
+        store.write_text(video_id, TIMESTAMPED_TRANSCRIPT,
+                         to_timestamped_text(Cue(*segment) for segment in segments))
+
+
+def load_cached(video_id):
+    """Return ``(video_title, transcript, source, summary)`` from the cache, or None.
+
+    ``summary`` is the one in SUMMARY_LANGUAGE, None when only the transcript
+    is cached.
+    """
+    cache = current_app.extensions.get('result_cache')
+    cached = cache.get_video(video_id, TRANSCRIBE_MODEL) if cache else None
+    if not cached:
+        return None
+    print(f"✅ Cache hit for {video_id}")
+    summary = cache.get_summary(video_id, SUMMARY_MODEL, SUMMARY_PROMPT_VERSION,
+                                get_setting('SUMMARY_LANGUAGE'))
+    return cached['title'], cached['transcript'], cached['source'], summary
+
+
+def save_transcript(video_id, video_title, transcript, source):
+    """Store a new transcript's artifacts, cache entry and search index entry.
+
+    Returns the transcript as plain text; its segments are served from disk.
+    """
+    _store_segments(video_id, transcript, source)
+    transcript = str(transcript)
+    current_app.extensions['artifact_store'].write_text(video_id, TRANSCRIPT, transcript)
+    cache = current_app.extensions.get('result_cache')
+    if cache:
+        cache.put_video(video_id, video_title, transcript, TRANSCRIBE_MODEL, source)
+    search_index = current_app.extensions.get('search_index')
+    if search_index:
+        search_index.add(video_id, video_title, transcript)
+    return transcript
+
+
+def save_summary(video_id, summary, language=None):
+    """Cache a summary in ``language`` (SUMMARY_LANGUAGE), unless summarization failed."""
+    cache = current_app.extensions.get('result_cache')
+    if cache and summary is not None:
+        cache.put_summary(video_id, SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, summary,
+                          language or get_setting('SUMMARY_LANGUAGE'))
+
+
+def pipeline_result(video_id, video_title, transcript, source, summary, summaries=None): #pylint: disable=too-many-arguments,too-many-positional-arguments
+    """Return a pipeline run's result as served by the API.
+
+    ``summaries`` maps each language asked for to its summary, the first
+    being ``summary``'s; by default ``summary`` is the one in SUMMARY_LANGUAGE.
+    """
+    summaries = summaries or {get_setting('SUMMARY_LANGUAGE'): summary}
+    return {
+        'video_id': video_id,
+        'video_title': video_title,
+        'transcript': transcript,
+        'transcript_source': source,
+        'summary': summary,
+        'language': next(iter(summaries)),
+        'summaries': summaries
+    }
+
+
+def summaries_to_translate(result, languages):
+    """Return ``(summaries, missing)`` for a result with its SUMMARY_LANGUAGE summary.
+
+    ``summaries`` holds those already known of ``languages`` by language, and
+    ``missing`` the languages still to translate that summary into; there are
+    none when summarization failed.
+    """
+    base = get_setting('SUMMARY_LANGUAGE')
+    if result['summary'] is None:
+        return {}, []
+    summaries = {base: result['summary']}
+    summaries.update(_cached_summaries(result['video_id'],
+                                       [language for language in languages if language != base]))
+    return summaries, [language for language in languages if language not in summaries]
+
+
+def language_result(result, languages, summaries):
+    """Return ``result`` with its summary in the first of ``languages`` and all of them listed."""
+    return pipeline_result(result['video_id'], result['video_title'], result['transcript'],
+                           result['transcript_source'], summaries.get(languages[0]),
+                           {language: summaries.get(language) for language in languages})
+
+
+def add_translations(result, languages, on_stage, on_summary=None):
+    """Give a pipeline result its summary in each of ``languages``.
+
+    The SUMMARY_LANGUAGE summary is translated into those not cached yet, in
+    parallel and with one completion each, and the translations are cached.
+    Only the first language's translation is streamed to ``on_summary``.
+    """
+    summaries, missing = summaries_to_translate(result, languages)
+    if missing:
+        limiter = current_app.extensions['stage_limiter']
+        stream = summary_stream(on_summary)
+        on_stage('summarizing')
+
+        def translate(language):
+            with limiter.stage('llm'):
+                return translate_summary(result['summary'], language,
+                                         **(stream if language == languages[0] else {}))
+
+        workers = max(1, min(len(missing), get_setting('SUMMARY_WORKERS')))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            translations = list(pool.map(carry_trace(translate), missing))
+        for language, translation in zip(missing, translations):
+            summaries[language] = translation
+            save_summary(result['video_id'], translation, language)
+    return language_result(result, languages, summaries)
+
+
+def claim_shared(video_id, cached):
+    """Return ``(shared_result, lease)`` from the instance coordinator.
+
+    Without a coordinator, or when the local cache already has the summary,
+    both are None. Otherwise this waits while another instance processes
+    the video; see Coordinator.claim.
+    """
+    coordinator = current_app.extensions.get('coordinator')
+    if coordinator is None or (cached and cached[3] is not None):
+        return None, None
+    return coordinator.claim(shared_key(video_id))
+
+
+def shared_key(video_id):
+    """Return the key instances coordinate ``video_id`` under, for its current models."""
+    return (f"{video_id}:{TRANSCRIBE_MODEL}:{SUMMARY_MODEL}:{SUMMARY_PROMPT_VERSION}:"
+            f"{get_setting('SUMMARY_LANGUAGE')}")
+
+
+def adopt_shared(video_id, shared):
+    """Keep a result processed by another instance locally and return it."""
+    print(f"✅ Reusing the result another instance processed for {video_id}")
+    video_title, transcript, source, summary = shared
+    transcript = save_transcript(video_id, video_title, transcript, source)
+    save_summary(video_id, summary)
+    return pipeline_result(video_id, video_title, transcript, source, summary)
+
+
+def summary_stream(on_summary):
+    """Return the keyword arguments that stream a summary to ``on_summary``, if enabled."""
+    return {'on_delta': on_summary} if on_summary and get_setting('SUMMARY_STREAMING') else {}
+
+
+def run_pipeline(video_id, on_stage=None, on_summary=None, client=None, languages=None): #pylint: disable=too-many-arguments,too-many-positional-arguments
+    """Download, transcribe and summarize a video, reusing cached results when available.
+
+    ``on_stage`` is called with the name of each stage as it starts, and
+    ``on_summary`` with each piece of the summary while SUMMARY_STREAMING
+    streams it (a summary from the cache is not passed to it). Each
+    stage waits for a slot of its own concurrency limit first. Captions are
+    used instead of transcribing the audio when CAPTIONS_MODE allows it. With
+    PIPELINE_MODE "streaming" the stages overlap instead of running in turn.
+    With a SHARED_BACKEND_URL, only one instance processes a video at a time
+    and the others reuse its result. Audio transcribed is charged to
+    ``client``'s quota; see audio_allowance.
+
+    The transcript is summarized once, in SUMMARY_LANGUAGE, and that summary
+    translated into any other of ``languages``; see add_translations.
+    """
+    on_stage = on_stage or (lambda stage: None)
+    limiter = current_app.extensions['stage_limiter']
+    languages = summary_languages(languages)
+    # Stream the SUMMARY_LANGUAGE summary only when it is the one asked for first.
+    stream = summary_stream(on_summary) if languages[0] == get_setting('SUMMARY_LANGUAGE') else {}
+
+    cached = load_cached(video_id)
+    shared, lease = claim_shared(video_id, cached)
+    if shared is not None:
+        return add_translations(adopt_shared(video_id, shared), languages, on_stage, on_summary)
+
+    try:
+        summary, segments = None, ()
+        if cached:
+            video_title, transcript, source, summary = cached
+        else:
+            video_title, transcript, summary, source = transcribe_video(video_id, on_stage,
+                                                                         client)
+            segments = getattr(transcript, 'segments', ())
+            transcript = save_transcript(video_id, video_title, transcript, source)
+
+        if summary is None:
+            with limiter.stage('llm'):
+                on_stage('summarizing')
+                summary = summarize_text(transcript, language=get_setting('SUMMARY_LANGUAGE'),
+                                         **stream)
+            save_summary(video_id, summary)
+
+        if lease and summary is not None:
+            lease.publish(video_title, Transcript(transcript, segments), source, summary)
+    finally:
+        if lease:
+            lease.release()
+
+    return add_translations(pipeline_result(video_id, video_title, transcript, source, summary),
+                            languages, on_stage, on_summary)
+
+
+def _client_id():
+    """Identify the client a request's audio minutes are charged to.
+
+    QUOTA_CLIENT_HEADER names a header set by a trusted proxy, such as an
+    API key ID; without it clients are told apart by address.
+    """
+    header = get_setting('QUOTA_CLIENT_HEADER')
+    return (header and request.headers.get(header)) or request.remote_addr
+
+
+def _job_links(job):
+    """Return the job's status along with the URLs to follow it."""
+    status = job.to_dict()
+    status.update({
+        'status_url': url_for('main.job_status', job_id=job.id),
+        'result_url': url_for('main.job_result', job_id=job.id),
+        'events_url': url_for('main.job_events', job_id=job.id),
+        'summary_url': url_for('main.job_summary', job_id=job.id)
+    })
+    return status
+
+def requested_languages(requested):
+    """Parse the summary languages a request asks for; see website.languages.parse_languages."""
+    return parse_languages(requested, get_setting('SUMMARY_LANGUAGES'),
+                           get_setting('SUMMARY_MAX_LANGUAGES'), get_setting('SUMMARY_LANGUAGE'))
+
+
 @main.route('/')
 def index():
     """Render the main page."""
-    return render_template('index.html')
+    languages = supported_languages(get_setting('SUMMARY_LANGUAGES'))
+    return render_template('index.html', default_language=get_setting('SUMMARY_LANGUAGE'),
+                           languages=[(code, language_name(code)) for code in languages])
 
 @main.route('/process', methods=['POST'])
 def process_video():
@@ -152,31 +1182,103 @@ def process_video():
         flash('Invalid YouTube URL')
         return redirect(url_for('main.index'))
 
-    audio_file, video_title = download_audio(video_id)
-    if not audio_file:
-        flash('Failed to download audio from the video')
+    try:
+        languages = requested_languages(request.form.getlist('language'))
+    except ValueError as e:
+        flash(str(e))
         return redirect(url_for('main.index'))
 
-    transcript = transcribe_audio(audio_file)
-    if not transcript:
-        flash('Failed to transcribe the audio')
-        return redirect(url_for('main.index'))
+    result, job_links = get_cached_result(video_id, languages), None
+    if result is None:
+        job, _ = current_app.extensions['job_manager'].submit(video_id, _client_id(), languages)
+        cached = None
+        if get_setting('SUMMARY_STREAMING'):
+            # Show the transcript as soon as it is ready and let the page stream the summary in.
+            job.wait_for_stage(('summarizing',))
+            cached = None if job.finished else load_cached(video_id)
+        if cached:
+            result = pipeline_result(video_id, *cached[:3], None, dict.fromkeys(languages))
+            job_links = _job_links(job)
+        else:
+            job.wait()
+            if job.stage == 'failed':
+                flash(job.error)
+                return redirect(url_for('main.index'))
+            result = job.result
+
+    has_segments = current_app.extensions['artifact_store'].exists(video_id, SEGMENTS)
+    return render_template('result.html', has_segments=has_segments, job=job_links,
+                           page_size=get_setting('SEGMENTS_PAGE_SIZE'),
+                           language_label=language_name(result['language']), **result)
+
+
+def _names_encoding(encoding):
+    """Whether the request's Accept-Encoding lists ``encoding`` with a quality above 0.
+
+    A bare ``*`` is not taken as acceptance, so clients only get stored
+    bytes in a codec they asked for by name.
+    """
+    return any(value == encoding and quality > 0 for value, quality in request.accept_encodings)
 
-    summary = summarize_text(transcript)
 
-    return render_template('result.html',
-                           video_id=video_id,
-                           video_title=video_title,
-                           transcript=transcript,
-                           summary=summary)
+def _send_text_artifact(video_id, name, download_name=None):
+    """Serve a text artifact, or return None if the video has none.
+
+    A compressed artifact whose codec the client names in Accept-Encoding
+    (gzip, or zstd without a dictionary) is sent as its stored bytes with a matching
+    Content-Encoding. Clients that accept gzip but not the stored codec get
+    a gzip copy, written the first time it is asked for; others get the
+    artifact decompressed. Either way ETag/Last-Modified validators let
+    conditional requests get 304 Not Modified.
+    """
+    store = current_app.extensions['artifact_store']
+    try:
+        if not store.exists(video_id, name):
+            return None
+    except ValueError:
+        return None
+
+    attachment = {'as_attachment': True, 'download_name': download_name} if download_name else {}
+    stored = store.stored_blob(video_id, name)
+    if stored is None:
+        return send_file(store.path(video_id, name), mimetype='text/plain', conditional=True,
+                         etag=True, **attachment)
+
+    served = stored if stored.encoding and _names_encoding(stored.encoding) else None
+    if served is None and _names_encoding('gzip'):
+        served = store.gzip_blob(video_id, name)
+    if served is not None:
+        response = send_file(served.path, mimetype='text/plain', conditional=True,
+                             etag=f"{served.digest}-{served.encoding}", **attachment)
+        response.headers['Content-Encoding'] = served.encoding
+    else:
+        response = Response(store.read_bytes(video_id, name), mimetype='text/plain')
+        response.set_etag(stored.digest)
+        if download_name:
+            response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+        response.make_conditional(request)
+    response.vary.add('Accept-Encoding')
+    return response
 
 
 @main.route('/download/<video_id>')
-def download_transcript(video_id): #pylint: disable=unused-argument
-    """Download the transcript file."""
-    transcript_path = os.path.join(STATIC_DIR, "transcription.txt")
-    if os.path.exists(transcript_path):
-        return send_file(transcript_path, as_attachment=True)
+def download_transcript(video_id):
+    """Download the transcript file for a video, straight from its stored bytes."""
+    store = current_app.extensions['artifact_store']
+    try:
+        missing = not store.exists(video_id, TRANSCRIPT)
+    except ValueError:
+        missing = False
+
+    if missing:
+        cache = current_app.extensions.get('result_cache')
+        cached = cache.get_video(video_id, TRANSCRIBE_MODEL) if cache else None
+        if cached:
+            store.write_text(video_id, TRANSCRIPT, cached['transcript'])
+
+    response = _send_text_artifact(video_id, TRANSCRIPT, f"transcript_{video_id}.txt")
+    if response is not None:
+        return response
 
     flash('Transcript file not found')
     return redirect(url_for('main.index'))
@@ -184,7 +1286,14 @@ def download_transcript(video_id): #pylint: disable=unused-argument
 
 @main.route('/api/process', methods=['POST'])
 def api_process_video():
-    """API endpoint for processing YouTube videos."""
+    """API endpoint for processing YouTube videos.
+
+    ``language`` (a code or comma-separated codes) or ``languages`` (a list)
+    picks the summary languages, SUMMARY_LANGUAGE by default; the result's
+    ``summary`` is in the first and ``summaries`` has each. Cached videos are
+    answered immediately; otherwise a job is queued and its ID returned with
+    a 202 so the client can poll or stream its progress.
+    """
     data = request.json
     url = data.get('youtube_url')
 
@@ -195,19 +1304,347 @@ def api_process_video():
     if not video_id:
         return jsonify({'error': 'Invalid YouTube URL'}), 400
 
-    audio_file, video_title = download_audio(video_id)
-    if not audio_file:
-        return jsonify({'error': 'Failed to download audio from the video'}), 500
+    try:
+        languages = requested_languages(data.get('languages', data.get('language')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    result = get_cached_result(video_id, languages)
+    if result is not None:
+        return jsonify(result)
+
+    job, _ = current_app.extensions['job_manager'].submit(video_id, _client_id(), languages)
+    status = _job_links(job)
+    return jsonify(status), 202, {'Location': status['status_url']}
+
+
+@main.route('/api/batch', methods=['POST'])
+def api_process_batch(): #pylint: disable=too-many-locals
+    """Process a list of YouTube URLs or a playlist, streaming results as NDJSON.
+
+    At most BATCH_CONCURRENCY videos of the batch are in flight at once; a
+    line is written for each video as soon as it finishes, in completion order.
+    Summary languages are chosen as for /api/process.
+    """
+    data = request.json or {}
+    urls = data.get('youtube_urls') or []
+    playlist_link = data.get('playlist_url')
+
+    if not urls and not playlist_link:
+        return jsonify({'error': 'Please provide youtube_urls or a playlist_url'}), 400
+    if not isinstance(urls, list):
+        return jsonify({'error': 'youtube_urls must be a list'}), 400
+    try:
+        languages = requested_languages(data.get('languages', data.get('language')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    lines, video_ids = [], []
+    for url in urls:
+        video_id = extract_video_id(url) if isinstance(url, str) else None
+        if video_id:
+            video_ids.append(video_id)
+        else:
+            lines.append({'youtube_url': url, 'status': 'failed', 'error': 'Invalid YouTube URL'})
+
+    if playlist_link:
+        ref = parse_video_url(playlist_link)
+        playlist_ids = expand_playlist(playlist_url(ref.playlist_id) if ref and ref.playlist_id
+                                       else playlist_link)
+        if playlist_ids is None:
+            return jsonify({'error': 'Failed to expand the playlist'}), 502
+        video_ids.extend(playlist_ids)
+
+    video_ids = list(dict.fromkeys(video_ids))
+    max_videos = get_setting('BATCH_MAX_VIDEOS')
+    if len(video_ids) > max_videos:
+        return jsonify({'error': f"A batch may contain at most {max_videos} videos"}), 400
+
+    manager, client = current_app.extensions['job_manager'], _client_id()
+    concurrency = max(1, get_setting('BATCH_CONCURRENCY'))
+
+    def generate():
+        yield json.dumps({'batch_size': len(video_ids), 'video_ids': video_ids}) + "\n"
+        for line in lines:
+            yield json.dumps(line) + "\n"
+
+        pending, finished, in_flight = list(reversed(video_ids)), queue.Queue(), 0
+        while pending or in_flight:
+            while pending and in_flight < concurrency:
+                video_id = pending.pop()
+                result = get_cached_result(video_id, languages)
+                if result is not None:
+                    yield json.dumps(dict(result, status='done')) + "\n"
+                    continue
+                job, _ = manager.submit(video_id, client, languages)
+                job.add_done_callback(finished.put)
+                in_flight += 1
+            if not in_flight:
+                continue
+
+            job = finished.get()
+            in_flight -= 1
+            if job.stage == 'failed':
+                yield json.dumps({'video_id': job.video_id, 'status': 'failed',
+                                  'error': job.error}) + "\n"
+            else:
+                yield json.dumps(dict(job.result, status='done')) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@main.route('/api/videos/<video_id>')
+def api_video_metadata(video_id):
+    """Return a video's title, duration, channel and audio formats without downloading."""
+    metadata = probe_video(video_id)
+    if metadata is None:
+        return jsonify({'error': 'Failed to fetch video metadata'}), 502
+    return jsonify(metadata)
+
+
+@main.route('/api/videos/<video_id>/transcript')
+def api_video_transcript(video_id):
+    """Return a video's transcript as text, compressed as stored when the client accepts it.
+
+    ``?timestamps=1`` returns the "[HH:MM:SS] text" version instead.
+    """
+    timestamped = request.args.get('timestamps', type=int)
+    response = _send_text_artifact(video_id, TIMESTAMPED_TRANSCRIPT if timestamped else TRANSCRIPT)
+    if response is None:
+        return jsonify({'error': 'Transcript not found'}), 404
+    return response
+
+
+def _segment_index(video_id):
+    """Open a video's segments file, or return None when it has none."""
+    try:
+        return SegmentIndex(current_app.extensions['artifact_store'].path(video_id, SEGMENTS))
+    except (ValueError, FileNotFoundError):
+        return None
+
+
+@main.route('/api/videos/<video_id>/segments')
+def api_video_segments(video_id):
+    """Return a page of a transcript's timed segments.
 
-    transcript = transcribe_audio(audio_file)
-    if not transcript:
-        return jsonify({'error': 'Failed to transcribe the audio'}), 500
+    With ``?start=`` and/or ``?end=`` (seconds) the segments overlapping that
+    window are returned, otherwise those from segment number ``?offset=``; at
+    most ``?limit=`` (capped at SEGMENTS_PAGE_SIZE) either way. ``next_offset``
+    is where the following page starts, or None after the last segment.
+    """
+    segment_index = _segment_index(video_id)
+    if segment_index is None:
+        return jsonify({'error': 'No timed segments for this video'}), 404
 
-    summary = summarize_text(transcript)
+    page_size = get_setting('SEGMENTS_PAGE_SIZE')
+    limit = max(1, min(request.args.get('limit', page_size, type=int), page_size))
+    start = request.args.get('start', type=float)
+    end = request.args.get('end', type=float)
+    if start is not None or end is not None:
+        segments = segment_index.between(start or 0.0, end, limit)
+    else:
+        segments = segment_index.page(request.args.get('offset', 0, type=int), limit)
 
+    next_offset = segments[-1]['index'] + 1 if segments else None
     return jsonify({
         'video_id': video_id,
-        'video_title': video_title,
-        'transcript': transcript,
-        'summary': summary
+        'total': len(segment_index),
+        'segments': segments,
+        'next_offset': next_offset if next_offset is not None and next_offset < len(segment_index)
+                       else None
     })
+
+
+@main.route('/api/videos/<video_id>/segments/search')
+def api_search_segments(video_id):
+    """Return the segments containing ``?q=``, with their start times to jump to."""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Please provide a search query'}), 400
+    segment_index = _segment_index(video_id)
+    if segment_index is None:
+        return jsonify({'error': 'No timed segments for this video'}), 404
+
+    page_size = get_setting('SEGMENTS_PAGE_SIZE')
+    limit = max(1, min(request.args.get('limit', page_size, type=int), page_size))
+    return jsonify({'video_id': video_id, 'query': query,
+                    'segments': segment_index.search(query, limit)})
+
+
+def _timestamp_hits(video_id, terms, limit):
+    """Return up to ``limit`` ``{start, text}`` segments of a video containing any term."""
+    segment_index = _segment_index(video_id)
+    if segment_index is None:
+        return []
+    hits = {}
+    for term in terms:
+        for segment in segment_index.search(term, limit):
+            hits.setdefault(segment['index'], segment)
+    return [{'start': segment['start'], 'text': segment['text']}
+            for _, segment in sorted(hits.items())[:limit]]
+
+
+@main.route('/api/search')
+def api_search():
+    """Find the processed videos whose title or transcript mention every word of ``?q=``.
+
+    Results are ranked by BM25 and include a snippet of the transcript and,
+    for videos with timed segments, the timestamps where the words occur.
+    ``?prefix=1`` lets the last word match longer words, for search-as-you-type,
+    and ``?recent=1`` only ranks the most recently indexed matches, which
+    keeps very common words fast.
+    """
+    search_index = current_app.extensions.get('search_index')
+    if search_index is None:
+        return jsonify({'error': 'Search is not available'}), 503
+    terms = query_terms(request.args.get('q'))
+    if not terms:
+        return jsonify({'error': 'Please provide a search query'}), 400
+
+    max_results = get_setting('SEARCH_MAX_RESULTS')
+    limit = max(1, min(request.args.get('limit', 10, type=int), max_results))
+    started = time.perf_counter()
+    results = search_index.search(terms, limit, prefix=request.args.get('prefix') == '1',
+                                  recent=request.args.get('recent') == '1')
+    took = time.perf_counter() - started
+    for result in results:
+        result['hits'] = _timestamp_hits(result['video_id'], terms,
+                                         get_setting('SEARCH_HITS_PER_VIDEO'))
+    return jsonify({'query': request.args.get('q'), 'results': results,
+                    'took_ms': round(took * 1000, 2)})
+
+
+@main.route('/metrics')
+def prometheus_metrics():
+    """Export stage timings, request latencies and subsystem counters for Prometheus."""
+    gauges = []
+    limiter = current_app.extensions.get('stage_limiter')
+    if limiter:
+        gauges.append(('stage_active', 'Pipeline runs currently inside each stage.',
+                       {(('stage', stage),): count for stage, count in limiter.active().items()}))
+    scratch = current_app.extensions.get('audio_scratch')
+    if scratch:
+        gauges.extend((f'audio_scratch_{name}', 'Audio scratch area counter.', {(): value})
+                      for name, value in scratch.metrics().items())
+    client = current_app.extensions.get('openai_client')
+    if client:
+        gauges.extend((f'openai_{name}', 'OpenAI client counter.', {(): value})
+                      for name, value in client.metrics().items())
+    return Response(metrics.REGISTRY.render(gauges), mimetype='text/plain; version=0.0.4')
+
+
+@main.route('/api/stats/audio')
+def audio_stats():
+    """Report bytes held, bytes evicted and reuse hits for the audio scratch area."""
+    scratch = current_app.extensions.get('audio_scratch')
+    return jsonify(scratch.metrics() if scratch else {})
+
+
+@main.route('/api/quota')
+def audio_quota():
+    """Report the audio minutes the calling client has used and has left."""
+    client, quota = _client_id(), current_app.extensions['audio_quota']
+    return jsonify({
+        'client': client,
+        'used_minutes': round(quota.used(client), 2),
+        'remaining_minutes': quota.remaining(client),
+        'window_seconds': quota.window
+    })
+
+
+@main.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """Report the current stage of a job."""
+    job = current_app.extensions['job_manager'].get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(_job_links(job))
+
+
+@main.route('/api/jobs/<job_id>/result')
+def job_result(job_id):
+    """Return a job's result, optionally long-polling up to ``?wait=`` seconds."""
+    job = current_app.extensions['job_manager'].get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    wait = min(request.args.get('wait', 0, type=float), 60)
+    if wait > 0:
+        job.wait(wait)
+
+    if job.stage == 'failed':
+        return jsonify({'error': job.error}), job.status_code
+    if job.stage != 'done':
+        return jsonify(_job_links(job)), 202
+    return jsonify(job.result)
+
+
+def _follow_job(job, keep_alive=15):
+    """Yield a job's progress as ``(kind, data)`` until it finishes.
+
+    ``kind`` is "stage" with the job's status, "summary" with the next
+    piece of summary text, or "keep-alive" after ``keep_alive`` idle seconds.
+    """
+    version, offset = -1, 0
+    while True:
+        version, snapshot, parts = job.follow(version, offset, timeout=keep_alive)
+        finished = snapshot is not None and snapshot['stage'] in ('done', 'failed')
+        if snapshot is not None and not finished:
+            yield 'stage', snapshot
+        if parts:
+            offset += len(parts)
+            yield 'summary', ''.join(parts)
+        if finished:
+            yield 'stage', snapshot
+            return
+        if snapshot is None and not parts:
+            yield 'keep-alive', None
+
+
+@main.route('/api/jobs/<job_id>/events')
+def job_events(job_id):
+    """Stream a job's stage changes and summary text as server-sent events.
+
+    Stage changes are sent as events named after the stage; while the
+    summary is generated, ``summary`` events carry ``{"delta": text}``.
+    """
+    job = current_app.extensions['job_manager'].get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def generate():
+        for kind, data in _follow_job(job):
+            if kind == 'keep-alive':
+                yield ": keep-alive\n\n"
+            elif kind == 'summary':
+                yield f"event: summary\ndata: {json.dumps({'delta': data})}\n\n"
+            else:
+                yield f"event: {data['stage']}\ndata: {json.dumps(data)}\n\n"
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@main.route('/api/jobs/<job_id>/summary')
+def job_summary(job_id):
+    """Stream a job's summary as NDJSON while it is generated.
+
+    Each ``{"delta": text}`` line carries the next piece of the summary. The
+    last line holds the complete ``{"summary": text}``, which is also what
+    gets cached, or ``{"error": message}`` if the job failed.
+    """
+    job = current_app.extensions['job_manager'].get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def generate():
+        for kind, data in _follow_job(job):
+            if kind == 'summary':
+                yield json.dumps({'delta': data}) + "\n"
+        if job.stage == 'failed':
+            yield json.dumps({'error': job.error}) + "\n"
+        else:
+            yield json.dumps({'summary': job.result['summary']}) + "\n"
+
+    return Response(generate(), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
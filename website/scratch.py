@@ -0,0 +1,174 @@
+'''Managed scratch area for downloaded audio with size-budgeted LRU eviction.'''
+import glob
+import json
+import os
+import shutil
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+METADATA_SUFFIX = ".info.json"
+
+
+class AudioScratch: #pylint: disable=too-many-instance-attributes
+    """Holds downloaded audio under ``root`` and evicts it least recently used first.
+
+    The budget is ``max_bytes`` of audio, lowered further when the disk has less
+    than ``min_free_bytes`` free. Files for videos that are pinned (being
+    transcribed) are never evicted. A daemon thread sweeps every
+    ``sweep_interval`` seconds once the scratch area is first used.
+    """
+
+    def __init__(self, root, max_bytes=2 * 1024 ** 3, min_free_bytes=1024 ** 3,
+                 sweep_interval=60):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.min_free_bytes = min_free_bytes
+        self.sweep_interval = sweep_interval
+        self.stats = Counter(bytes_evicted=0, files_evicted=0, reuse_hits=0, reuse_misses=0)
+        self._pins = Counter()
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._stop = threading.Event()
+
+    def directory(self):
+        """Return the scratch directory, creating it and starting the sweeper on first use."""
+        self._start_sweeper()
+        os.makedirs(self.root, exist_ok=True)
+        return self.root
+
+    def base_path(self, video_id):
+        """Return the path, without extension, that a video's audio is downloaded to."""
+        return os.path.join(self.directory(), f"video_audio_{video_id}")
+
+    def _audio_files(self, video_id='*'):
+        pattern = os.path.join(glob.escape(self.root), f"video_audio_{video_id}.*")
+        return [path for path in glob.glob(pattern)
+                if not path.endswith(('.part', '.ytdl', '.tmp', METADATA_SUFFIX))]
+
+    def find(self, video_id):
+        """Return ``(audio_file, metadata)`` for an already downloaded video, or None."""
+        base = self.base_path(video_id)
+        files = self._audio_files(video_id)
+        metadata = None
+        if files:
+            try:
+                with open(base + METADATA_SUFFIX, encoding='utf-8') as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError):
+                metadata = None
+        if not files or metadata is None:
+            self._count(reuse_misses=1)
+            return None
+
+        audio_file = max(files, key=os.path.getmtime)
+        os.utime(audio_file)
+        self._count(reuse_hits=1)
+        return audio_file, metadata
+
+    def save_metadata(self, video_id, metadata):
+        """Record a video's metadata next to its audio so later jobs can reuse both."""
+        path = self.base_path(video_id) + METADATA_SUFFIX
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f)
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def pin(self, video_id):
+        """Protect a video's audio from eviction for the duration of the block."""
+        with self._lock:
+            self._pins[video_id] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pins[video_id] -= 1
+                if self._pins[video_id] <= 0:
+                    del self._pins[video_id]
+
+    def bytes_held(self):
+        """Total size of the audio currently held."""
+        return sum(os.path.getsize(path) for path in self._audio_files())
+
+    def budget(self):
+        """Bytes of audio allowed right now, accounting for free disk space."""
+        if not os.path.isdir(self.root):
+            return self.max_bytes
+        free = shutil.disk_usage(self.root).free
+        return max(0, min(self.max_bytes, self.bytes_held() + free - self.min_free_bytes))
+
+    def sweep(self):
+        """Evict least recently used audio until within budget; return bytes freed."""
+        entries = []
+        for path in self._audio_files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        held = sum(size for _, size, _ in entries)
+        budget = self.budget()
+
+        freed = 0
+        for _, size, path in sorted(entries):
+            if held - freed <= budget:
+                break
+            video_id = os.path.basename(path)[len("video_audio_"):].split('.', 1)[0]
+            with self._lock:
+                if self._pins.get(video_id):
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                if not self._audio_files(video_id):
+                    metadata_file = os.path.join(self.root,
+                                                 f"video_audio_{video_id}{METADATA_SUFFIX}")
+                    if os.path.exists(metadata_file):
+                        os.remove(metadata_file)
+                self.stats.update(bytes_evicted=size, files_evicted=1)
+            freed += size
+        return freed
+
+    def _count(self, **increments):
+        """Add ``increments`` to the stats; jobs and the sweeper update them concurrently."""
+        with self._lock:
+            self.stats.update(increments)
+
+    def metrics(self):
+        """Return counters describing the scratch area."""
+        with self._lock:
+            stats = dict(self.stats)
+        return dict(stats, bytes_held=self.bytes_held(), budget_bytes=self.budget())
+
+    def _start_sweeper(self):
+        if self.sweep_interval <= 0 or self._sweeper is not None:
+            return
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper = threading.Thread(target=self._sweep_loop, name='audio-sweeper',
+                                             daemon=True)
+            self._sweeper.start()
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e: #pylint: disable=broad-except
+                print(f"❌ Error sweeping audio scratch area: {e}")
+
+    def stop(self):
+        """Stop the background sweeper."""
+        self._stop.set()
+
+
+def init_app(app):
+    """Attach an AudioScratch rooted in ``DATA_DIR/audio`` to the application."""
+    app.extensions['audio_scratch'] = AudioScratch(
+        os.path.join(app.config['DATA_DIR'], 'audio'),
+        max_bytes=app.config['AUDIO_SCRATCH_MAX_BYTES'],
+        min_free_bytes=app.config['AUDIO_SCRATCH_MIN_FREE_BYTES'],
+        sweep_interval=app.config['AUDIO_SWEEP_INTERVAL']
+    )
@@ -0,0 +1,219 @@
+'''Full-text search over every processed transcript, built on SQLite FTS5.'''
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from website.cache import connect
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    video_id TEXT NOT NULL UNIQUE,
+    title TEXT,
+    transcript TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS transcripts USING fts5(
+    title, transcript, content='documents', content_rowid='id',
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+    INSERT INTO transcripts (rowid, title, transcript)
+    VALUES (new.id, new.title, new.transcript);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+    INSERT INTO transcripts (transcripts, rowid, title, transcript)
+    VALUES ('delete', old.id, old.title, old.transcript);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_au AFTER UPDATE ON documents BEGIN
+    INSERT INTO transcripts (transcripts, rowid, title, transcript)
+    VALUES ('delete', old.id, old.title, old.transcript);
+    INSERT INTO transcripts (rowid, title, transcript)
+    VALUES (new.id, new.title, new.transcript);
+END;
+"""
+
+TERM_RE = re.compile(r'\w+')
+# Title matches weigh more than transcript matches when ranking.
+TITLE_WEIGHT, TRANSCRIPT_WEIGHT = 5.0, 1.0
+
+
+def has_fts5():
+    """Whether this Python's SQLite was built with FTS5."""
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.execute("CREATE VIRTUAL TABLE probe USING fts5(text)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+
+def query_terms(query):
+    """Split a user's query into the words to search for."""
+    return TERM_RE.findall(query or '')
+
+
+def match_expression(terms, prefix=False):
+    """Build an FTS5 query matching documents with every term.
+
+    Each term is quoted, so FTS5 operators and syntax in user input are
+    searched for literally instead of being interpreted. With ``prefix`` the
+    last term also matches longer words, for search-as-you-type; short
+    prefixes expand to many words and are much slower to rank.
+    """
+    quoted = [f'"{term}"' for term in terms]
+    if quoted and prefix:
+        quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+class SearchIndex: #pylint: disable=too-many-instance-attributes
+    """Inverted index of video titles and transcripts, updated in the background.
+
+    ``add`` only queues a transcript; a daemon thread writes queued
+    transcripts in batches of up to ``batch_size`` per transaction, so the
+    pipeline never waits on the index. Readers use their own per-thread
+    connections and see each batch once it commits.
+    """
+
+    def __init__(self, path, batch_size=64, candidates=1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.candidates = candidates
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._writer = None
+        self._initialized = False
+
+    def _connect(self):
+        """Return this thread's connection, creating the database on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.path)
+            with self._lock:
+                if not self._initialized:
+                    conn.executescript(SCHEMA)
+                    self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    def add(self, video_id, title, transcript):
+        """Queue a video's transcript for indexing, replacing any earlier version."""
+        self._start_writer()
+        self._queue.put((video_id, title, transcript))
+
+    def flush(self):
+        """Block until every queued transcript has been written."""
+        self._queue.join()
+
+    def _start_writer(self):
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name='search-indexer',
+                                                daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.write(batch)
+            except Exception as e: #pylint: disable=broad-except
+                print(f"❌ Error indexing transcripts: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def write(self, documents):
+        """Index ``(video_id, title, transcript)`` documents in one transaction.
+
+        A video indexed again is deleted and inserted anew rather than
+        updated, so its rowid is the newest and ``recent`` searches see it.
+        """
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            for video_id, title, transcript in documents:
+                conn.execute("DELETE FROM documents WHERE video_id = ?", (video_id,))
+                conn.execute(
+                    "INSERT INTO documents (video_id, title, transcript, indexed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (video_id, title, transcript, now)
+                )
+
+    def search(self, terms, limit=20, prefix=False, snippet_tokens=16, recent=False):
+        """Return the best ``limit`` videos containing every term, best first.
+
+        See match_expression for ``prefix``. Each result has the
+        ``video_id``, ``title``, BM25 ``score`` (lower is better, as in FTS5)
+        and a ``snippet`` of the transcript around the matches, with matched
+        words wrapped in ``**``.
+
+        Every match is ranked, so the time taken grows with the number of
+        matches: terms found in a large share of the index take tens of
+        milliseconds at 100k transcripts. With ``recent`` only the
+        ``candidates`` most recently indexed matches are ranked, which keeps
+        whole-word queries under 10 milliseconds. Snippets are only built for
+        the results returned either way.
+        """
+        if not terms:
+            return []
+        conn, query = self._connect(), match_expression(terms, prefix)
+        if recent:
+            top = conn.execute(
+                "SELECT rowid, score FROM ("
+                "    SELECT rowid, bm25(transcripts, ?, ?) AS score FROM transcripts "
+                "    WHERE transcripts MATCH ? ORDER BY rowid DESC LIMIT ?"
+                ") ORDER BY score LIMIT ?",
+                (TITLE_WEIGHT, TRANSCRIPT_WEIGHT, query, self.candidates, limit)
+            ).fetchall()
+        else:
+            top = conn.execute(
+                "SELECT rowid, bm25(transcripts, ?, ?) AS score FROM transcripts "
+                "WHERE transcripts MATCH ? ORDER BY score LIMIT ?",
+                (TITLE_WEIGHT, TRANSCRIPT_WEIGHT, query, limit)
+            ).fetchall()
+
+        results = []
+        for rowid, score in top:
+            row = conn.execute(
+                "SELECT d.video_id, d.title, "
+                "snippet(transcripts, 1, '**', '**', '…', ?) AS snippet "
+                "FROM transcripts JOIN documents d ON d.id = transcripts.rowid "
+                "WHERE transcripts MATCH ? AND transcripts.rowid = ?",
+                (snippet_tokens, query, rowid)
+            ).fetchone()
+            if row is not None:
+                results.append(dict(row, score=score))
+        return results
+
+    def count(self):
+        """Number of indexed videos."""
+        return self._connect().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+
+def init_app(app):
+    """Attach a SearchIndex in ``DATA_DIR/search.sqlite3`` when search is enabled."""
+    app.extensions['search_index'] = None
+    if not app.config.get('SEARCH_ENABLED', True):
+        return
+    if not has_fts5():
+        print("⚠️ SQLite was built without FTS5; transcript search is disabled")
+        return
+    app.extensions['search_index'] = SearchIndex(
+        os.path.join(app.config['DATA_DIR'], 'search.sqlite3'),
+        batch_size=app.config['SEARCH_BATCH_SIZE'],
+        candidates=app.config['SEARCH_CANDIDATES']
+    )
@@ -0,0 +1,173 @@
+'''Timestamped transcript segments, stored in a compact columnar file.
+
+A segments file holds a 16 byte header (magic and segment count) followed by
+three little-endian columns and the text:
+
+    starts   float64 x n   segment start times in seconds, ascending
+    ends     float64 x n   segment end times in seconds
+    offsets  uint64 x n+1  byte offsets of each segment's text in the text block
+    text     UTF-8         every segment's text, each followed by a newline
+
+Opening a file reads only the columns (24 bytes a segment); the text is read
+for the segments a query returns, and searched through a memory map, so a
+long transcript is never loaded as a whole.
+'''
+import mmap
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+MAGIC = b'YTASEG01'
+HEADER = struct.Struct('<8sQ')
+
+
+class Transcript(str):
+    """A transcript's text, carrying the timed segments it was made from.
+
+    Behaves exactly like the text, so code that only needs the text is
+    unaffected; ``segments`` is a list of ``(start, end, text)`` tuples, empty
+    when the engine reported no timing.
+    """
+
+    def __new__(cls, text, segments=()):
+        transcript = super().__new__(cls, text)
+        transcript.segments = list(segments)
+        return transcript
+
+
+def segments_of(response):
+    """Return ``(start, end, text)`` tuples for the segments of a Whisper response.
+
+    Accepts the API's verbose_json response and faster-whisper segments;
+    anything without timing yields an empty list.
+    """
+    segments = getattr(response, 'segments', response)
+    if not isinstance(segments, (list, tuple)):
+        return []
+    result = []
+    for segment in segments:
+        if isinstance(segment, dict):
+            start, end, text = segment.get('start'), segment.get('end'), segment.get('text')
+        else:
+            start, end = getattr(segment, 'start', None), getattr(segment, 'end', None)
+            text = getattr(segment, 'text', None)
+        if isinstance(start, (int, float)) and isinstance(end, (int, float)) and text:
+            result.append((float(start), float(end), ' '.join(str(text).split())))
+    return result
+
+
+def shift_segments(parts):
+    """Join the segments of consecutive pieces of audio onto one timeline.
+
+    ``parts`` holds ``(offset, segments)`` pairs in order, ``offset`` being
+    where the piece starts in the full audio. Where pieces overlap, segments
+    starting before the end of the last one kept are dropped, as the text of
+    the overlap is only transcribed once.
+    """
+    result = []
+    for offset, segments in parts:
+        for start, end, text in segments:
+            start, end = start + offset, end + offset
+            if result and start < result[-1][1] - 0.01:
+                continue
+            result.append((start, end, text))
+    return result
+
+
+def _column(typecode, values):
+    column = array(typecode, values)
+    if sys.byteorder != 'little':
+        column.byteswap()
+    return column
+
+
+def encode(segments):
+    """Return the segments file for ``(start, end, text)`` segments (sorted by start)."""
+    segments = sorted(segments, key=lambda segment: segment[0])
+    texts = [(' '.join(text.split()) + '\n').encode('utf-8') for _, _, text in segments]
+    offsets = [0]
+    for text in texts:
+        offsets.append(offsets[-1] + len(text))
+    return b''.join([
+        HEADER.pack(MAGIC, len(segments)),
+        _column('d', (start for start, _, _ in segments)).tobytes(),
+        _column('d', (end for _, end, _ in segments)).tobytes(),
+        _column('Q', offsets).tobytes(),
+        *texts
+    ])
+
+
+class SegmentIndex:
+    """Time range, paging and search queries over one segments file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, count = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"Not a segments file: {path}")
+            self.starts, self.ends, self.offsets = array('d'), array('d'), array('Q')
+            for column, size in ((self.starts, count), (self.ends, count),
+                                 (self.offsets, count + 1)):
+                column.fromfile(f, size)
+                if sys.byteorder != 'little':
+                    column.byteswap()
+        self.text_start = HEADER.size + 8 * (3 * count + 1)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _segments(self, lo, hi):
+        """Return segments ``lo`` to ``hi`` (exclusive) as dicts, reading only their text."""
+        if lo >= hi:
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(self.text_start + self.offsets[lo])
+            block = f.read(self.offsets[hi] - self.offsets[lo])
+        base = self.offsets[lo]
+        return [{
+            'index': i,
+            'start': self.starts[i],
+            'end': self.ends[i],
+            'text': block[self.offsets[i] - base:self.offsets[i + 1] - base]
+                    .decode('utf-8').rstrip('\n')
+        } for i in range(lo, hi)]
+
+    def page(self, offset, limit):
+        """Return up to ``limit`` segments starting with segment number ``offset``."""
+        offset = max(0, offset)
+        return self._segments(offset, min(len(self), offset + max(0, limit)))
+
+    def between(self, start, end, limit):
+        """Return up to ``limit`` segments overlapping the ``start``-``end`` seconds window."""
+        lo = max(0, bisect_right(self.starts, start) - 1)
+        if lo < len(self) and self.ends[lo] <= start:
+            lo += 1
+        hi = bisect_left(self.starts, end) if end is not None else len(self)
+        return self._segments(lo, min(hi, lo + max(0, limit)))
+
+    def search(self, query, limit):
+        """Return up to ``limit`` segments containing ``query``, in order.
+
+        Matching ignores case for ASCII letters only, as it runs on the
+        encoded text without decoding it.
+        """
+        query = ' '.join(query.split())
+        if not query or len(self) == 0:
+            return []
+        pattern = re.compile(re.escape(query.encode('utf-8')), re.IGNORECASE)
+        found = []
+        with open(self.path, 'rb') as f, \
+             mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as text:
+            position = self.text_start
+            while len(found) < limit:
+                match = pattern.search(text, position)
+                if not match:
+                    break
+                index = bisect_right(self.offsets, match.start() - self.text_start) - 1
+                found.append(index)
+                # One hit per segment: continue after the segment that matched.
+                position = self.text_start + self.offsets[index + 1]
+        return [self._segments(index, index + 1)[0] for index in found]
@@ -0,0 +1,373 @@
+'''State shared by every instance of the app: finished results and per-video leases.
+
+Each instance keeps its own cache and artifacts on local disk. When several
+instances run behind one router, SHARED_BACKEND_URL points them at a common
+store, so a video is processed by whichever instance claims it first while
+the others wait for its result instead of repeating the work.
+
+``redis://`` and ``rediss://`` URLs use Redis (or anything speaking its
+protocol) through the optional redis package. ``memory://name`` keeps the
+state in this process, shared by every app configured with the same name,
+for tests and single-instance development.
+'''
+import asyncio
+import json
+import threading
+import time
+import uuid
+
+from website.segments import Transcript
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+
+class MemoryBackend:
+    """In-process stand-in for Redis: expiring keys, leases and publish/subscribe."""
+
+    def __init__(self):
+        self._values = {}
+        self._messages = {}
+        self._cond = threading.Condition()
+
+    def _live(self, key):
+        """Return the unexpired value of ``key``; call with the lock held."""
+        value, expires = self._values.get(key, (None, None))
+        if expires is not None and expires <= time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    @staticmethod
+    def _expiry(ttl):
+        return time.monotonic() + ttl if ttl else None
+
+    def get(self, key):
+        """Return the value stored at ``key``, or None."""
+        with self._cond:
+            return self._live(key)
+
+    def set(self, key, value, ttl=None):
+        """Store ``value`` at ``key``, expiring after ``ttl`` seconds if given."""
+        with self._cond:
+            self._values[key] = (value, self._expiry(ttl))
+
+    def acquire(self, key, token, ttl):
+        """Set ``key`` to ``token`` for ``ttl`` seconds unless it is held; return whether it was."""
+        with self._cond:
+            if self._live(key) is not None:
+                return False
+            self._values[key] = (token, self._expiry(ttl))
+            return True
+
+    def renew(self, key, token, ttl):
+        """Extend a lease still held by ``token``; return whether it was."""
+        with self._cond:
+            if self._live(key) != token:
+                return False
+            self._values[key] = (token, self._expiry(ttl))
+            return True
+
+    def release(self, key, token):
+        """Delete a lease still held by ``token``; return whether it was."""
+        with self._cond:
+            if self._live(key) != token:
+                return False
+            del self._values[key]
+            return True
+
+    def publish(self, channel, message):
+        """Wake every subscriber of ``channel`` with ``message``."""
+        with self._cond:
+            count, _ = self._messages.get(channel, (0, None))
+            self._messages[channel] = (count + 1, message)
+            self._cond.notify_all()
+
+    def subscribe(self, channel):
+        """Return a subscription receiving messages published to ``channel`` from now on."""
+        return _MemorySubscription(self, channel)
+
+
+class _MemorySubscription:
+    def __init__(self, backend, channel):
+        self._backend = backend
+        self._channel = channel
+        with backend._cond: #pylint: disable=protected-access
+            self._seen = backend._messages.get(channel, (0, None))[0] #pylint: disable=protected-access
+
+    def wait(self, timeout):
+        """Return the latest message published since the last call, or None after ``timeout``."""
+        backend = self._backend
+        with backend._cond: #pylint: disable=protected-access
+            messages = backend._messages #pylint: disable=protected-access
+            if not backend._cond.wait_for( #pylint: disable=protected-access
+                    lambda: messages.get(self._channel, (0, None))[0] != self._seen, timeout):
+                return None
+            self._seen, message = messages[self._channel]
+            return message
+
+    def close(self):
+        """Stop receiving messages."""
+
+
+class RedisBackend:
+    """The backend interface on a Redis server; leases are ``SET NX PX`` keys."""
+
+    # Renew or delete a lease only while it still holds the caller's token.
+    RENEW_SCRIPT = ("if redis.call('get', KEYS[1]) == ARGV[1] then "
+                    "return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end")
+    RELEASE_SCRIPT = ("if redis.call('get', KEYS[1]) == ARGV[1] then "
+                      "return redis.call('del', KEYS[1]) else return 0 end")
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("A redis:// SHARED_BACKEND_URL requires the redis package")
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._renew = self._redis.register_script(self.RENEW_SCRIPT)
+        self._release = self._redis.register_script(self.RELEASE_SCRIPT)
+
+    def get(self, key):
+        """Return the value stored at ``key``, or None."""
+        return self._redis.get(key)
+
+    def set(self, key, value, ttl=None):
+        """Store ``value`` at ``key``, expiring after ``ttl`` seconds if given."""
+        self._redis.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def acquire(self, key, token, ttl):
+        """Set ``key`` to ``token`` for ``ttl`` seconds unless it is held; return whether it was."""
+        return bool(self._redis.set(key, token, nx=True, px=int(ttl * 1000)))
+
+    def renew(self, key, token, ttl):
+        """Extend a lease still held by ``token``; return whether it was."""
+        return bool(self._renew(keys=[key], args=[token, int(ttl * 1000)]))
+
+    def release(self, key, token):
+        """Delete a lease still held by ``token``; return whether it was."""
+        return bool(self._release(keys=[key], args=[token]))
+
+    def publish(self, channel, message):
+        """Send ``message`` to every subscriber of ``channel``."""
+        self._redis.publish(channel, message)
+
+    def subscribe(self, channel):
+        """Return a subscription receiving messages published to ``channel`` from now on."""
+        return _RedisSubscription(self._redis.pubsub(ignore_subscribe_messages=True), channel)
+
+
+class _RedisSubscription:
+    def __init__(self, pubsub, channel):
+        self._pubsub = pubsub
+        pubsub.subscribe(channel)
+
+    def wait(self, timeout):
+        """Return the next message on the channel, or None after ``timeout``."""
+        deadline = time.monotonic() + timeout
+        remaining = timeout
+        while remaining > 0:
+            message = self._pubsub.get_message(timeout=remaining)
+            if message and message['type'] == 'message':
+                return message['data']
+            remaining = deadline - time.monotonic()
+        return None
+
+    def close(self):
+        """Unsubscribe and return the connection to the pool."""
+        self._pubsub.close()
+
+
+_memory_backends = {}
+_memory_lock = threading.Lock()
+
+
+def connect(url):
+    """Return the backend for a SHARED_BACKEND_URL."""
+    if url.startswith('memory://'):
+        with _memory_lock:
+            return _memory_backends.setdefault(url, MemoryBackend())
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported SHARED_BACKEND_URL: {url}")
+
+
+def encode_result(title, transcript, source, summary):
+    """Serialize a finished video, keeping the transcript's timed segments."""
+    return json.dumps({'title': title, 'transcript': str(transcript),
+                       'segments': getattr(transcript, 'segments', []),
+                       'source': source, 'summary': summary})
+
+
+def decode_result(data):
+    """Return ``(title, transcript, source, summary)`` from :func:`encode_result` output."""
+    result = json.loads(data)
+    segments = [tuple(segment) for segment in result.get('segments') or ()]
+    return (result['title'], Transcript(result['transcript'], segments), result['source'],
+            result['summary'])
+
+
+class Lease:
+    """Exclusive right to process one video, kept alive while the work runs.
+
+    A daemon thread renews the lease every third of ``ttl``, so it only
+    lapses, letting another instance take over, if this one stops.
+    """
+
+    def __init__(self, coordinator, key):
+        self._coordinator = coordinator
+        self.key = key
+        self.token = uuid.uuid4().hex
+        self._stop = threading.Event()
+        self._renewer = None
+
+    def start(self):
+        """Begin renewing the lease in the background."""
+        self._renewer = threading.Thread(target=self._renew_loop, name='lease-renewer',
+                                         daemon=True)
+        self._renewer.start()
+
+    def _renew_loop(self):
+        coordinator = self._coordinator
+        while not self._stop.wait(coordinator.lease_ttl / 3):
+            try:
+                if not coordinator.backend.renew(coordinator.lease_key(self.key), self.token,
+                                                 coordinator.lease_ttl):
+                    print(f"⚠️ Lost the lease on {self.key}; another instance may redo it")
+                    return
+            except Exception as e: #pylint: disable=broad-except
+                print(f"⚠️ Error renewing the lease on {self.key}: {e}")
+
+    def publish(self, title, transcript, source, summary):
+        """Store the finished result for every instance and wake those waiting on it."""
+        coordinator = self._coordinator
+        try:
+            coordinator.backend.set(coordinator.result_key(self.key),
+                                    encode_result(title, transcript, source, summary),
+                                    coordinator.result_ttl)
+            coordinator.backend.publish(coordinator.channel(self.key), 'done')
+        except Exception as e: #pylint: disable=broad-except
+            print(f"⚠️ Error sharing the result for {self.key}: {e}")
+
+    def release(self):
+        """Stop renewing and give the lease up, waking waiters to check for a result."""
+        self._stop.set()
+        coordinator = self._coordinator
+        try:
+            coordinator.backend.release(coordinator.lease_key(self.key), self.token)
+            coordinator.backend.publish(coordinator.channel(self.key), 'released')
+        except Exception as e: #pylint: disable=broad-except
+            print(f"⚠️ Error releasing the lease on {self.key}: {e}")
+
+
+class Coordinator:
+    """Decides which instance processes a video, through a shared backend.
+
+    Keys are namespaced by ``prefix``; results are kept ``result_ttl``
+    seconds. An instance waits at most ``wait_timeout`` seconds for another
+    to finish before doing the work itself.
+    """
+
+    def __init__(self, backend, prefix='yta:', lease_ttl=60, result_ttl=7 * 24 * 3600,
+                 wait_timeout=1800):
+        self.backend = backend
+        self.prefix = prefix
+        self.lease_ttl = lease_ttl
+        self.result_ttl = result_ttl
+        self.wait_timeout = wait_timeout
+
+    def result_key(self, key):
+        """Backend key of the shared result for ``key``."""
+        return f"{self.prefix}result:{key}"
+
+    def lease_key(self, key):
+        """Backend key of the lease for ``key``."""
+        return f"{self.prefix}lease:{key}"
+
+    def channel(self, key):
+        """Channel announcing that the lease for ``key`` was released."""
+        return f"{self.prefix}events:{key}"
+
+    def result(self, key):
+        """Return the shared ``(title, transcript, source, summary)`` for ``key``, or None."""
+        data = self.backend.get(self.result_key(key))
+        return decode_result(data) if data else None
+
+    def claim(self, key):
+        """Return ``(result, lease)`` once this instance may proceed with ``key``.
+
+        ``result`` is set when another instance has finished it. Otherwise
+        ``lease`` is held (or None if the backend failed or the wait timed
+        out) and the caller does the work, then calls ``lease.publish`` and
+        ``lease.release``. Blocks while another instance holds the lease.
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        subscription = None
+        try:
+            subscription = self.backend.subscribe(self.channel(key))
+            while True:
+                claimed = self._try_claim(key)
+                if claimed is not None:
+                    return claimed
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print(f"⚠️ Gave up waiting for another instance to process {key}")
+                    return None, None
+                # Re-check at least once per lease period in case its holder died.
+                subscription.wait(min(remaining, self.lease_ttl))
+        except Exception as e: #pylint: disable=broad-except
+            print(f"⚠️ Shared backend unavailable, processing {key} locally: {e}")
+            return None, None
+        finally:
+            if subscription is not None:
+                subscription.close()
+
+    async def aclaim(self, key, poll_interval=1.0):
+        """Coroutine version of claim, for the asyncio job backend.
+
+        Instead of blocking on a subscription it checks again every
+        ``poll_interval`` seconds, so a wait holds no thread; only the
+        backend calls themselves run in the loop's pool.
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        try:
+            while True:
+                claimed = await asyncio.to_thread(self._try_claim, key)
+                if claimed is not None:
+                    return claimed
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print(f"⚠️ Gave up waiting for another instance to process {key}")
+                    return None, None
+                await asyncio.sleep(min(remaining, poll_interval))
+        except Exception as e: #pylint: disable=broad-except
+            print(f"⚠️ Shared backend unavailable, processing {key} locally: {e}")
+            return None, None
+
+    def _try_claim(self, key):
+        """Return claim's ``(result, lease)`` if it can be had now, or None to keep waiting."""
+        result = self.result(key)
+        if result is not None:
+            return result, None
+        lease = Lease(self, key)
+        if not self.backend.acquire(self.lease_key(key), lease.token, self.lease_ttl):
+            return None
+        # The holder may have published and released since the check above.
+        result = self.result(key)
+        if result is not None:
+            lease.release()
+            return result, None
+        lease.start()
+        return None, lease
+
+
+def init_app(app):
+    """Attach a Coordinator when SHARED_BACKEND_URL is set."""
+    url = app.config.get('SHARED_BACKEND_URL')
+    app.extensions['coordinator'] = Coordinator(
+        connect(url),
+        prefix=app.config['SHARED_KEY_PREFIX'],
+        lease_ttl=app.config['SHARED_LEASE_TTL'],
+        result_ttl=app.config['RESULT_CACHE_TTL'],
+        wait_timeout=app.config['SHARED_WAIT_TIMEOUT']
+    ) if url else None
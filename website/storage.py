@@ -0,0 +1,377 @@
+'''Per-video artifact storage with atomic writes, and compressed content-addressed blobs.'''
+import glob
+import gzip
+import hashlib
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+import click
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+VIDEO_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+BLOB_NAME_RE = re.compile(r'^([0-9a-f]{64})\.(?:d(\d+)\.)?(gz|zst)$')
+
+TRANSCRIPT = 'transcript.txt'
+# One "[HH:MM:SS] text" line per caption cue or transcribed segment.
+TIMESTAMPED_TRANSCRIPT = 'transcript.timestamps.txt'
+# Segment start/end times and text in the columnar format of website/segments.py.
+SEGMENTS = 'segments.bin'
+# Text artifacts kept as compressed blobs when the store has a BlobStore.
+COMPRESSED_ARTIFACTS = (TRANSCRIPT, TIMESTAMPED_TRANSCRIPT)
+# Suffix of the per-video file naming the blob that holds an artifact.
+REF_SUFFIX = '.ref'
+
+GZIP_LEVEL = 9
+ZSTD_LEVEL = 19
+
+StoredBlob = namedtuple('StoredBlob', 'path digest encoding')
+StoredBlob.__doc__ = """A blob on disk: its path, the SHA-256 of its content, and the HTTP
+Content-Encoding its bytes can be served with as they are (None if they cannot)."""
+
+
+def atomic_write(path, data):
+    """Write ``data`` to ``path`` through a renamed temporary file and return the path.
+
+    Readers never see a partial file and concurrent writers cannot interleave.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.",
+                                    suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+class BlobStore:
+    """Compressed blobs under ``root/<aa>/<sha256>.<ext>``, keyed by the SHA-256 of their content.
+
+    Identical content is stored once, whichever videos it belongs to.
+    ``codec`` "zstd" compresses with zstandard, using the dictionary trained
+    by :meth:`train_dictionary` once there is one; "gzip" uses the standard
+    library. Blobs already written keep their codec, so either can be read.
+    """
+
+    def __init__(self, root, codec='zstd'):
+        if codec == 'zstd' and zstandard is None:
+            print("⚠️ ARTIFACT_CODEC zstd requires the zstandard package; using gzip")
+            codec = 'gzip'
+        if codec not in ('zstd', 'gzip'):
+            raise ValueError(f"Unsupported artifact codec: {codec}")
+        self.root = root
+        self.codec = codec
+        self._dictionaries = {}
+        self._lock = threading.Lock()
+        # Compressors are costly to set up with a dictionary and not safe to share across threads.
+        self._local = threading.local()
+
+    def _dictionary_dir(self):
+        return os.path.join(self.root, 'dictionaries')
+
+    def _dictionary(self, dict_id):
+        """Return the zstd dictionary with ``dict_id``, loading it once."""
+        with self._lock:
+            if dict_id not in self._dictionaries:
+                path = os.path.join(self._dictionary_dir(), f"{dict_id}.dict")
+                with open(path, 'rb') as f:
+                    self._dictionaries[dict_id] = zstandard.ZstdCompressionDict(f.read())
+            return self._dictionaries[dict_id]
+
+    def current_dictionary(self):
+        """Return the ID of the dictionary new zstd blobs are compressed with, or None."""
+        try:
+            with open(os.path.join(self._dictionary_dir(), 'current'), encoding='utf-8') as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def path(self, name):
+        """Return the path of the blob called ``name``; raise ValueError for anything else."""
+        if not BLOB_NAME_RE.match(name or ''):
+            raise ValueError(f"Invalid blob name: {name!r}")
+        return os.path.join(self.root, name[:2], name)
+
+    def find(self, digest):
+        """Return the name of a blob holding content with ``digest``, in any codec, or None."""
+        matches = glob.glob(os.path.join(self.root, digest[:2], f"{digest}.*"))
+        names = [os.path.basename(path) for path in matches]
+        return next((name for name in sorted(names) if BLOB_NAME_RE.match(name)), None)
+
+    def _compressor(self, dict_id):
+        """Return this thread's zstd compressor for ``dict_id`` (None for no dictionary)."""
+        compressors = self._local.__dict__.setdefault('compressors', {})
+        if dict_id not in compressors:
+            dictionary = self._dictionary(dict_id) if dict_id is not None else None
+            compressors[dict_id] = zstandard.ZstdCompressor(level=ZSTD_LEVEL,
+                                                            dict_data=dictionary)
+        return compressors[dict_id]
+
+    def put(self, data):
+        """Store ``data``, unless identical content already is, and return its blob name."""
+        digest = hashlib.sha256(data).hexdigest()
+        existing = self.find(digest)
+        if existing:
+            try:
+                # A fresh mtime keeps sweep from deleting it before the new reference is written.
+                os.utime(self.path(existing))
+                return existing
+            except FileNotFoundError:
+                pass
+        if self.codec == 'gzip':
+            name, blob = f"{digest}.gz", gzip.compress(data, GZIP_LEVEL, mtime=0)
+        else:
+            dict_id = self.current_dictionary()
+            name = f"{digest}.zst" if dict_id is None else f"{digest}.d{dict_id}.zst"
+            blob = self._compressor(dict_id).compress(data)
+        atomic_write(self.path(name), blob)
+        return name
+
+    def get(self, name):
+        """Return the decompressed content of a blob, or None if it does not exist."""
+        try:
+            with open(self.path(name), 'rb') as f:
+                blob = f.read()
+        except FileNotFoundError:
+            return None
+        _, dict_id, ext = BLOB_NAME_RE.match(name).groups()
+        if ext == 'gz':
+            return gzip.decompress(blob)
+        if zstandard is None:
+            raise RuntimeError(f"Reading {name} requires the zstandard package")
+        if dict_id is None:
+            return zstandard.ZstdDecompressor().decompress(blob)
+        return zstandard.ZstdDecompressor(dict_data=self._dictionary(int(dict_id))).decompress(blob)
+
+    def stored(self, name):
+        """Return the StoredBlob for ``name``."""
+        digest, dict_id, ext = BLOB_NAME_RE.match(name).groups()
+        encoding = 'gzip' if ext == 'gz' else ('zstd' if dict_id is None else None)
+        return StoredBlob(self.path(name), digest, encoding)
+
+    def gzip_copy(self, name):
+        """Return the StoredBlob of blob ``name``'s content in gzip, writing it the first time.
+
+        Serves zstd content to clients that only accept gzip without
+        decompressing it on every request. Returns None if ``name`` is gone.
+        """
+        digest, _, ext = BLOB_NAME_RE.match(name).groups()
+        copy = f"{digest}.gz"
+        if ext != 'gz' and not os.path.exists(self.path(copy)):
+            data = self.get(name)
+            if data is None:
+                return None
+            atomic_write(self.path(copy), gzip.compress(data, GZIP_LEVEL, mtime=0))
+        return self.stored(copy)
+
+    def names(self):
+        """Yield the name of every blob in the store."""
+        for path in glob.glob(os.path.join(glob.escape(self.root), '??', '*')):
+            name = os.path.basename(path)
+            if BLOB_NAME_RE.match(name):
+                yield name
+
+    def sweep(self, referenced, min_age=3600):
+        """Delete blobs whose content no name in ``referenced`` holds; return ``(blobs, bytes)``.
+
+        Copies of referenced content in another codec, such as those of
+        gzip_copy, are kept. Blobs modified less than ``min_age`` seconds ago
+        are kept too, since a blob is written before the reference to it.
+        """
+        cutoff = time.time() - min_age
+        digests = {match.group(1) for match in map(BLOB_NAME_RE.match, referenced) if match}
+        removed, freed = 0, 0
+        for name in self.names():
+            if BLOB_NAME_RE.match(name).group(1) in digests:
+                continue
+            path = self.path(name)
+            try:
+                stat = os.stat(path)
+                if stat.st_mtime > cutoff:
+                    continue
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            removed, freed = removed + 1, freed + stat.st_size
+        return removed, freed
+
+    def train_dictionary(self, samples, size=112640):
+        """Train a zstd dictionary on ``samples`` (bytes) and use it for new blobs.
+
+        Returns the new dictionary's ID. Blobs written before keep theirs.
+        """
+        if zstandard is None:
+            raise RuntimeError("Training a dictionary requires the zstandard package")
+        dictionary = zstandard.train_dictionary(size, list(samples), level=ZSTD_LEVEL)
+        dict_id = dictionary.dict_id()
+        directory = self._dictionary_dir()
+        atomic_write(os.path.join(directory, f"{dict_id}.dict"), dictionary.as_bytes())
+        atomic_write(os.path.join(directory, 'current'), str(dict_id).encode('ascii'))
+        return dict_id
+
+
+class ArtifactStore:
+    """Stores the files produced for each video under ``root/<video_id>/``.
+
+    Writes go to a temporary file in the same directory and are renamed into
+    place, so readers never see a partial file and concurrent writers of the
+    same artifact cannot interleave.
+
+    With a BlobStore, the text artifacts in COMPRESSED_ARTIFACTS are kept in
+    it instead, and the video's directory holds a small ``<name>.ref`` file
+    naming the blob. Artifacts written as plain files before are still read.
+    """
+
+    def __init__(self, root, blobs=None):
+        self.root = root
+        self.blobs = blobs
+
+    def path(self, video_id, name):
+        """Return the path of an artifact; raise ValueError for unsafe video IDs."""
+        if not VIDEO_ID_RE.match(video_id or ''):
+            raise ValueError(f"Invalid video ID: {video_id!r}")
+        return os.path.join(self.root, video_id, name)
+
+    def _compressed(self, name):
+        return self.blobs is not None and name in COMPRESSED_ARTIFACTS
+
+    def _blob_name(self, video_id, name):
+        """Return the name of the blob holding an artifact, or None."""
+        try:
+            with open(self.path(video_id, name) + REF_SUFFIX, encoding='ascii') as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, video_id, name):
+        """Whether an artifact has been written."""
+        path = self.path(video_id, name)
+        return os.path.exists(path) or (self._compressed(name) and
+                                        os.path.exists(path + REF_SUFFIX))
+
+    def write_bytes(self, video_id, name, data):
+        """Atomically write ``data`` as an artifact and return its path."""
+        path = self.path(video_id, name)
+        if not self._compressed(name):
+            return atomic_write(path, data)
+        atomic_write(path + REF_SUFFIX, self.blobs.put(data).encode('ascii'))
+        if os.path.exists(path):
+            os.remove(path)
+        return path + REF_SUFFIX
+
+    def write_text(self, video_id, name, text):
+        """Atomically write UTF-8 text as an artifact and return its path."""
+        return self.write_bytes(video_id, name, text.encode('utf-8'))
+
+    def read_bytes(self, video_id, name):
+        """Return an artifact's content, or None if it has not been written."""
+        blob_name = self._blob_name(video_id, name) if self._compressed(name) else None
+        if blob_name:
+            return self.blobs.get(blob_name)
+        try:
+            with open(self.path(video_id, name), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def read_text(self, video_id, name):
+        """Return an artifact's text, or None if it has not been written."""
+        data = self.read_bytes(video_id, name)
+        return data.decode('utf-8') if data is not None else None
+
+    def stored_blob(self, video_id, name):
+        """Return the StoredBlob holding an artifact, or None if it is not in the BlobStore."""
+        blob_name = self._blob_name(video_id, name) if self._compressed(name) else None
+        return self.blobs.stored(blob_name) if blob_name else None
+
+    def gzip_blob(self, video_id, name):
+        """Return the StoredBlob of a gzip copy of an artifact, or None if it is not a blob."""
+        blob_name = self._blob_name(video_id, name) if self._compressed(name) else None
+        return self.blobs.gzip_copy(blob_name) if blob_name else None
+
+    def _video_ids(self):
+        return [entry for entry in os.listdir(self.root)
+                if VIDEO_ID_RE.match(entry)] if os.path.isdir(self.root) else []
+
+    def referenced_blobs(self):
+        """Return the names of the blobs some video's artifact refers to."""
+        referenced = set()
+        for video_id in self._video_ids():
+            for name in COMPRESSED_ARTIFACTS:
+                blob_name = self._blob_name(video_id, name)
+                if blob_name:
+                    referenced.add(blob_name)
+        return referenced
+
+    def collect_garbage(self, min_age=3600):
+        """Delete the blobs no artifact refers to any more; return ``(blobs, bytes)`` removed.
+
+        Rewriting an artifact points it at a new blob and leaves the old one,
+        which other videos with identical content may still share.
+        """
+        if self.blobs is None:
+            return 0, 0
+        return self.blobs.sweep(self.referenced_blobs(), min_age)
+
+    def sample(self, name, limit):
+        """Return the content of up to ``limit`` randomly chosen ``name`` artifacts."""
+        video_ids = self._video_ids()
+        random.shuffle(video_ids)
+        samples = []
+        for video_id in video_ids:
+            data = self.read_bytes(video_id, name)
+            if data:
+                samples.append(data)
+                if len(samples) >= limit:
+                    break
+        return samples
+
+
+def init_app(app):
+    """Attach an ArtifactStore rooted in ``DATA_DIR/artifacts`` to the application.
+
+    Unless ARTIFACT_CODEC is "none", transcripts go to a BlobStore in
+    ``DATA_DIR/blobs``. ``flask train-artifact-dictionary`` trains a zstd
+    dictionary on the transcripts stored so far, and ``flask
+    collect-artifact-blobs`` deletes blobs left behind by rewritten
+    transcripts; run it periodically, e.g. from cron.
+    """
+    codec = app.config['ARTIFACT_CODEC']
+    blobs = BlobStore(os.path.join(app.config['DATA_DIR'], 'blobs'), codec) \
+        if codec != 'none' else None
+    store = ArtifactStore(os.path.join(app.config['DATA_DIR'], 'artifacts'), blobs)
+    app.extensions['artifact_store'] = store
+
+    @app.cli.command('train-artifact-dictionary')
+    def train_artifact_dictionary():
+        """Train a zstd dictionary on stored transcripts for new transcript blobs."""
+        samples = store.sample(TRANSCRIPT, app.config['ARTIFACT_DICTIONARY_SAMPLES'])
+        if blobs is None or blobs.codec != 'zstd' or len(samples) < 8:
+            print("❌ Needs ARTIFACT_CODEC zstd and at least 8 stored transcripts")
+            return
+        dict_id = blobs.train_dictionary(samples, app.config['ARTIFACT_DICTIONARY_SIZE'])
+        print(f"✅ Trained dictionary {dict_id} on {len(samples)} transcripts")
+
+    @app.cli.command('collect-artifact-blobs')
+    @click.option('--min-age', default=3600, show_default=True,
+                  help='Keep unreferenced blobs younger than this many seconds.')
+    def collect_artifact_blobs(min_age):
+        """Delete transcript blobs that no video refers to any more."""
+        removed, freed = store.collect_garbage(min_age)
+        print(f"✅ Removed {removed} unreferenced blobs ({freed} bytes)")
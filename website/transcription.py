@@ -0,0 +1,83 @@
+'''Local transcription engine built on faster-whisper, and engine selection.'''
+import threading
+from website.segments import Transcript, segments_of
+
+try:
+    import faster_whisper
+except ImportError:  # pragma: no cover - optional dependency
+    faster_whisper = None
+
+ENGINES = ('openai', 'local', 'auto')
+
+
+class LocalWhisperEngine: #pylint: disable=too-few-public-methods
+    """Transcribes audio on this machine with a faster-whisper (CTranslate2) model.
+
+    The model is loaded once, on first use, and kept warm for the life of the
+    process. Up to ``workers`` files are transcribed at once, sharing the one
+    model; further callers wait for a slot. Within a file, speech windows are
+    decoded ``batch_size`` at a time.
+    """
+
+    def __init__(self, model_size='small', device='cpu', compute_type='int8', workers=2,
+                 batch_size=8):
+        if faster_whisper is None:
+            raise RuntimeError("The local transcription engine requires the faster-whisper package")
+        self.model_size = model_size
+        self.batch_size = batch_size
+        self._model_options = {'device': device, 'compute_type': compute_type,
+                               'num_workers': max(1, workers)}
+        self._slots = threading.BoundedSemaphore(max(1, workers))
+        self._pipeline = None
+        self._batched = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._pipeline is None:
+                model = faster_whisper.WhisperModel(self.model_size, **self._model_options)
+                # Older faster-whisper releases have no batched pipeline.
+                batched = getattr(faster_whisper, 'BatchedInferencePipeline', None)
+                self._batched = batched is not None and self.batch_size > 1
+                self._pipeline = batched(model=model) if self._batched else model
+            return self._pipeline
+
+    def transcribe(self, audio_file):
+        """Return the text of an audio file, as a Transcript carrying its timed segments."""
+        pipeline = self._load()
+        options = {'batch_size': self.batch_size} if self._batched else {}
+        with self._slots:
+            segments, _ = pipeline.transcribe(audio_file, **options)
+            # Segments are decoded lazily, so the work happens while collecting them.
+            segments = list(segments)
+        text = " ".join(segment.text.strip() for segment in segments).strip()
+        return Transcript(text, segments_of(segments))
+
+
+_engine = {}
+_engine_lock = threading.Lock()
+
+
+def get_local_engine(model_size, compute_type='int8', workers=2, batch_size=8):
+    """Return the process-wide local engine for these settings, creating it on first use."""
+    key = (model_size, compute_type, workers, batch_size)
+    with _engine_lock:
+        if key not in _engine:
+            _engine[key] = LocalWhisperEngine(model_size, compute_type=compute_type,
+                                              workers=workers, batch_size=batch_size)
+        return _engine[key]
+
+
+def choose_engine(setting, size, local_max_bytes):
+    """Pick "openai" or "local" for a file of ``size`` bytes.
+
+    ``setting`` is TRANSCRIBE_ENGINE. "auto" sends files up to
+    ``local_max_bytes`` to the local engine, where the saved round trip
+    matters most, and longer audio (or everything, when faster-whisper is
+    not installed) to the API.
+    """
+    if setting not in ENGINES:
+        raise ValueError(f"Unknown transcription engine: {setting!r}")
+    if setting == 'auto':
+        return 'local' if faster_whisper is not None and size <= local_max_bytes else 'openai'
+    return setting
@@ -0,0 +1,90 @@
+'''Parsing YouTube links into a video ID, playlist ID and start time.
+
+The two shapes nearly every shared link takes, ``watch?v=`` and ``youtu.be/``
+with at most a ``t=``, are matched whole by one expression first. Other links
+are matched by one precompiled expression, anchored at the start, that
+recognises the host and any ID in the path; the query string and fragment
+are then scanned once for ``v``, ``list``, ``t`` and ``start``.
+'''
+import re
+from collections import namedtuple
+
+VIDEO_ID_RE = re.compile(r'[A-Za-z0-9_-]{11}')
+PLAYLIST_ID_RE = re.compile(r'[A-Za-z0-9_-]{2,64}')
+# "90", "90s", "1m30s", "1h2m3s"
+TIMESTAMP_RE = re.compile(r'(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s?)?')
+
+COMMON_LINK_RE = re.compile(r'(?:https://)?(?:www\.)?(?:youtube\.com/watch\?v=|youtu\.be/)'
+                            r'([A-Za-z0-9_-]{11})(?:[?&]t=(\d+)s?)?')
+LINK_RE = re.compile(r'''
+    (?i:https?://)?
+    (?i:
+        (?:www\.)?youtu\.be/(?!videoseries)(?P<short>[A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])
+      | (?:(?:www|m|music)\.)?youtube\.com/
+      | (?:www\.)?youtube-nocookie\.com/
+    )
+    (?:(?:shorts|live|embed|v|e)/(?!videoseries)(?P<path>[A-Za-z0-9_-]{11})(?![A-Za-z0-9_-]))?
+    (?P<rest>[^\s]*)
+''', re.VERBOSE)
+PARAM_RE = re.compile(r'[?&#](v|list|t|start)=([^&#]*)')
+
+VideoRef = namedtuple('VideoRef', 'video_id playlist_id start')
+VideoRef.__doc__ = """A parsed link: video ID, playlist ID and start second, each None if absent."""
+
+
+def parse_timestamp(value):
+    """Return a ``t=`` value such as "90", "90s" or "1h2m3s" in seconds, or None."""
+    match = TIMESTAMP_RE.fullmatch(value or '')
+    if not match or not any(match.groups()):
+        return None
+    hours, minutes, seconds = (int(group or 0) for group in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def parse_video_url(url): #pylint: disable=too-many-return-statements
+    """Parse a YouTube link, or a bare 11 character video ID, into a VideoRef.
+
+    Understands youtu.be links and watch, shorts, live, embed and /v/ paths on
+    www., m. and music.youtube.com and youtube-nocookie.com, with or without a
+    scheme. Query parameters may come in any order; the first of each wins.
+    A video ID must be exactly 11 characters: a longer ``v=`` value or path
+    segment is rejected rather than cut short. Returns None for anything
+    else, or when the link names neither a video nor a playlist.
+    """
+    if not isinstance(url, str):
+        return None
+    match = COMMON_LINK_RE.fullmatch(url)
+    if match:
+        start = match[2]
+        return VideoRef(match[1], None, int(start) if start else None)
+    url = url.strip()
+    if VIDEO_ID_RE.fullmatch(url):
+        return VideoRef(url, None, None)
+    match = LINK_RE.fullmatch(url)
+    if match is None:
+        return None
+
+    video_id, rest = match['short'] or match['path'], match['rest']
+    if not rest:
+        return VideoRef(video_id, None, None) if video_id else None
+
+    params = {}
+    for name, value in PARAM_RE.findall(rest):
+        params.setdefault(name, value)
+    if video_id is None:
+        video_id = params.get('v')
+        if video_id is not None and not VIDEO_ID_RE.fullmatch(video_id):
+            video_id = None
+    playlist_id = params.get('list')
+    if playlist_id is not None and not PLAYLIST_ID_RE.fullmatch(playlist_id):
+        playlist_id = None
+    if video_id is None and playlist_id is None:
+        return None
+
+    start = params.get('t') or params.get('start')
+    return VideoRef(video_id, playlist_id, parse_timestamp(start) if start else None)
+
+
+def playlist_url(playlist_id):
+    """Return the canonical URL of a playlist."""
+    return f"https://www.youtube.com/playlist?list={playlist_id}"